@@ -0,0 +1,206 @@
+"""
+Header-only reader for AMReX plotfiles.
+
+Parses the plotfile ``Header``, the per-level ``Cell_H`` files and the particle
+``Header`` files, without yt and without building a grid index, so dataset panels
+(fields, domain, time, refinement levels, particles) can be filled immediately.
+Results are cached per plotfile and Header mtime. Anything that does not look like
+a plotfile raises ValueError, and callers fall back to yt.
+"""
+
+import os
+import re
+import threading
+
+from export_manifest import source_mtime
+
+_BOX_RE = re.compile(r"\(\(([-\d,\s]+)\)\s*\(([-\d,\s]+)\)\s*\(([-\d,\s]+)\)\)")
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _ints(text):
+    return [int(v) for v in text.replace(",", " ").split()]
+
+
+def _floats(line):
+    return [float(v) for v in line.split()]
+
+
+def _parse_boxes(line):
+    return [(_ints(lo), _ints(hi)) for lo, hi, _ in _BOX_RE.findall(line)]
+
+
+def _read_lines(path):
+    with open(path) as f:
+        return [line.strip() for line in f]
+
+
+def parse_header(lines):
+    """Plotfile metadata from the lines of a plotfile Header"""
+    if not lines or not lines[0].startswith("HyperCLaw"):
+        raise ValueError("not an AMReX plotfile Header")
+    try:
+        n_fields = int(lines[1])
+        fields = lines[2:2 + n_fields]
+        i = 2 + n_fields
+        dim = int(lines[i])
+        time = float(lines[i + 1])
+        finest_level = int(lines[i + 2])
+        prob_lo = _floats(lines[i + 3])
+        prob_hi = _floats(lines[i + 4])
+        ref_ratio = _ints(lines[i + 5]) if finest_level > 0 else []
+        domains = _parse_boxes(lines[i + 6])
+        i += 7
+        level_steps = _ints(lines[i])
+        i += 1
+        cell_sizes = [_floats(lines[i + lev]) for lev in range(finest_level + 1)]
+        i += finest_level + 1
+        coord_sys = int(lines[i])
+        i += 2  # coordinate system, boundary width
+        n_boxes = []
+        for _ in range(finest_level + 1):
+            n_grids = int(lines[i].split()[1])
+            n_boxes.append(n_grids)
+            # level line, step, one line per dimension per box, then the Cell path
+            i += 2 + n_grids * dim + 1
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"malformed AMReX plotfile Header: {e}")
+    domain_dimensions = [hi - lo + 1 for lo, hi in zip(*domains[0])] if domains else None
+    return {
+        "fields": fields,
+        "dimensionality": dim,
+        "time": time,
+        "max_level": finest_level,
+        "domain_left_edge": prob_lo,
+        "domain_right_edge": prob_hi,
+        "domain_dimensions": domain_dimensions,
+        "refine_by": ref_ratio,
+        "level_steps": level_steps,
+        "cell_sizes": cell_sizes,
+        "geometry": {0: "cartesian", 1: "cylindrical", 2: "spherical"}.get(coord_sys, str(coord_sys)),
+        "boxes_per_level": n_boxes,
+    }
+
+
+def parse_cell_header(lines):
+    """
+    Number of components and cells and, when present (recent AMReX versions), the
+    minimum and maximum of each component over all boxes of a level, from its Cell_H
+    """
+    try:
+        n_comp = int(lines[2])
+        n_boxes = int(lines[4].lstrip("(").split()[0])
+        n_cells = 0
+        for lo, hi in _parse_boxes(" ".join(lines[5:5 + n_boxes])):
+            cells = 1
+            for l, h in zip(lo, hi):
+                cells *= h - l + 1
+            n_cells += cells
+        # box list, ")", FabOnDisk count, FabOnDisk lines
+        i = 5 + n_boxes + 2 + n_boxes
+        blocks = []
+        while len(blocks) < 2:
+            while i < len(lines) and not lines[i]:
+                i += 1
+            if i >= len(lines):
+                return {"n_comp": n_comp, "n_cells": n_cells, "min": None, "max": None}
+            i += 1  # "n_boxes,n_comp"
+            blocks.append([[float(v) for v in lines[i + b].rstrip(",").split(",")] for b in range(n_boxes)])
+            i += n_boxes
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"malformed Cell_H: {e}")
+    minima, maxima = blocks
+    return {"n_comp": n_comp, "n_cells": n_cells,
+            "min": [min(row[c] for row in minima) for c in range(n_comp)],
+            "max": [max(row[c] for row in maxima) for c in range(n_comp)]}
+
+
+def parse_particle_header(lines):
+    """Particle component names and total count from a particle Header"""
+    try:
+        if not lines[0].startswith("Version_"):
+            raise ValueError(f"unknown particle Header version {lines[0]}")
+        dim = int(lines[1])
+        n_real = int(lines[2])
+        real_names = lines[3:3 + n_real]
+        i = 3 + n_real
+        n_int = int(lines[i])
+        int_names = lines[i + 1:i + 1 + n_int]
+        i += 1 + n_int
+        is_checkpoint = bool(int(lines[i]))
+        count = int(lines[i + 1])
+    except (IndexError, ValueError) as e:
+        raise ValueError(f"malformed particle Header: {e}")
+    positions = [f"particle_position_{ax}" for ax in "xyz"[:dim]]
+    return {"count": count, "fields": positions + real_names + int_names, "is_checkpoint": is_checkpoint}
+
+
+def read_plotfile(plotfile_dir):
+    """
+    Metadata of an AMReX plotfile, from its header files only:
+    fields, dimensionality, time (code units), max_level, domain_left_edge,
+    domain_right_edge, domain_dimensions, refine_by, boxes_per_level, cells_per_level,
+    field_min / field_max (extrema of the stored components in code units, when the
+    Cell_H files have them, else None), particles {type: {count, fields}}.
+    """
+    key = (os.path.abspath(plotfile_dir), source_mtime(plotfile_dir))
+    with _lock:
+        info = _cache.get(key)
+    if info is not None:
+        return info
+
+    try:
+        info = _read_plotfile(plotfile_dir)
+    except OSError as e:
+        raise ValueError(f"cannot read plotfile headers of {plotfile_dir}: {e}")
+    with _lock:
+        _cache[key] = info
+    return info
+
+
+def _read_plotfile(plotfile_dir):
+    info = parse_header(_read_lines(os.path.join(plotfile_dir, "Header")))
+
+    info["field_min"] = info["field_max"] = None
+    levels = [parse_cell_header(_read_lines(os.path.join(plotfile_dir, f"Level_{lev}", "Cell_H")))
+              for lev in range(info["max_level"] + 1)]
+    info["cells_per_level"] = [cells["n_cells"] for cells in levels]
+    if all(cells["min"] is not None and cells["n_comp"] == len(info["fields"]) for cells in levels):
+        info["field_min"] = {f: min(cells["min"][c] for cells in levels) for c, f in enumerate(info["fields"])}
+        info["field_max"] = {f: max(cells["max"][c] for cells in levels) for c, f in enumerate(info["fields"])}
+
+    particles = {}
+    for entry in sorted(os.listdir(plotfile_dir)):
+        particle_header = os.path.join(plotfile_dir, entry, "Header")
+        if entry.startswith("Level_") or not os.path.isfile(particle_header):
+            continue
+        try:
+            particles[entry] = parse_particle_header(_read_lines(particle_header))
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read particle header {particle_header}: {e}")
+    info["particles"] = particles
+    return info
+
+
+def field_layout(info):
+    """Key that is the same for plotfiles with the same fields and particle types (e.g. one run)"""
+    return tuple(info["fields"]), tuple(sorted(info["particles"]))
+
+
+def summary(info):
+    """JSON-friendly subset for dataset panels"""
+    return {
+        "time": info["time"],
+        "domain_dimensions": info["domain_dimensions"],
+        "domain_left_edge": info["domain_left_edge"],
+        "domain_right_edge": info["domain_right_edge"],
+        "max_level": info["max_level"],
+        "refine_by": info["refine_by"],
+        "boxes_per_level": info["boxes_per_level"],
+        "geometry": info["geometry"],
+        "raw_fields": info["fields"],
+        "particles": {ptype: {"count": p["count"], "fields": p["fields"]}
+                      for ptype, p in info["particles"].items()},
+    }
@@ -0,0 +1,80 @@
+"""
+Metadata catalog: small per-snapshot facts cached in a SQLite database.
+
+Values are keyed on the plotfile path and stored with the plotfile's Header mtime
+(see export_manifest.source_mtime), so entries of a rewritten snapshot are ignored
+and replaced. The database can live on a shared filesystem and be used by several
+processes at once; every call opens its own short-lived connection.
+"""
+
+import os
+import sqlite3
+from contextlib import closing
+
+from export_manifest import source_mtime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    path TEXT PRIMARY KEY,
+    source_mtime REAL NOT NULL,
+    sim_time REAL  -- current_time of the snapshot in seconds
+);
+CREATE TABLE IF NOT EXISTS quantities (
+    path TEXT NOT NULL,
+    quantity TEXT NOT NULL,
+    source_mtime REAL NOT NULL,
+    value REAL,
+    units TEXT,
+    PRIMARY KEY (path, quantity)
+);
+"""
+
+
+class Catalog:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_quantities(self, plotfile_dir, quantities):
+        """
+        Cached values of quantities for an unchanged snapshot.
+        Returns (current_time or None, {quantity: (value, units)}) with missing quantities left out.
+        """
+        path = os.path.abspath(plotfile_dir)
+        mtime = source_mtime(plotfile_dir)
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT sim_time FROM snapshots WHERE path = ? AND source_mtime = ?",
+                               (path, mtime)).fetchone()
+            if row is None:
+                return None, {}
+            placeholders = ",".join("?" * len(quantities))
+            rows = conn.execute(
+                f"SELECT quantity, value, units FROM quantities WHERE path = ? AND source_mtime = ? "
+                f"AND quantity IN ({placeholders})", (path, mtime, *quantities)).fetchall()
+        return row[0], {q: (value, units) for q, value, units in rows}
+
+    def put_quantities(self, plotfile_dir, current_time, values, mtime=None):
+        """
+        Store {quantity: (value, units)} for a snapshot. mtime is the source mtime the values
+        were computed from (default: the current one). Entries of an older version of the
+        snapshot are dropped.
+        """
+        path = os.path.abspath(plotfile_dir)
+        mtime = source_mtime(plotfile_dir) if mtime is None else mtime
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM quantities WHERE path = ? AND source_mtime != ?", (path, mtime))
+            conn.execute("INSERT OR REPLACE INTO snapshots (path, source_mtime, sim_time) VALUES (?, ?, ?)",
+                         (path, mtime, current_time))
+            conn.executemany(
+                "INSERT OR REPLACE INTO quantities (path, quantity, source_mtime, value, units) VALUES (?, ?, ?, ?, ?)",
+                [(path, q, mtime, value, units) for q, (value, units) in values.items()])
+
+
+def get_catalog():
+    from settings import get_settings
+    return Catalog(get_settings().catalog_file())
@@ -0,0 +1,139 @@
+"""
+Comparison images between two snapshots or runs.
+
+Both datasets are resampled onto the same fixed-resolution buffer (FRB): the
+same physical region (in cm, so runs with different code units line up) and the
+same pixel grid. The buffers are plain arrays that callers can cache, so switching
+between side-by-side panels, the difference A - B and the ratio A / B only
+re-draws the figure. They can be kept in float32 to halve the cache footprint;
+sums over them are accumulated in float64.
+"""
+
+import io
+
+import numpy as np
+from matplotlib.colors import LogNorm, Normalize, SymLogNorm
+from matplotlib.figure import Figure
+
+COMPARE_MODES = ("side", "diff", "ratio")
+
+
+def frb_shape(bounds, resolution):
+    """Pixels (nx, ny) for bounds (x0, x1, y0, y1) with resolution pixels along the long side"""
+    wx = bounds[1] - bounds[0]
+    wy = bounds[3] - bounds[2]
+    if wx >= wy:
+        return resolution, max(1, int(round(resolution * wy / wx)))
+    return max(1, int(round(resolution * wx / wy))), resolution
+
+
+def fixed_resolution(ds, kind, axis, field, weight, coord, bounds, shape, dtype=np.float64):
+    """
+    Slice (kind="slc", at coord) or projection (kind="prj") of field resampled onto an
+    FRB of shape (nx, ny). coord and bounds are in cm. Returns (image [ny, nx] of dtype, units).
+    """
+    axis_id = ds.coordinates.axis_id[axis]
+    if kind == "slc":
+        source = ds.slice(axis_id, ds.quan(coord, "cm"))
+    elif kind == "prj":
+        source = ds.proj(field, axis_id, weight_field=weight)
+    else:
+        raise ValueError(f"Comparisons support kind 'slc' or 'prj', got {kind}")
+    frb = source.to_frb(ds.quan(bounds[1] - bounds[0], "cm"), shape,
+                        height=ds.quan(bounds[3] - bounds[2], "cm"),
+                        center=_frb_center(ds, axis_id, bounds))
+    image = frb[field]
+    return np.asarray(image.d, dtype=dtype), str(image.units)
+
+
+def _frb_center(ds, axis_id, bounds):
+    center = ds.domain_center.to("cm").d.copy()
+    center[ds.coordinates.x_axis[axis_id]] = 0.5 * (bounds[0] + bounds[1])
+    center[ds.coordinates.y_axis[axis_id]] = 0.5 * (bounds[2] + bounds[3])
+    return ds.arr(center, "cm")
+
+
+def difference_stats(a, b):
+    """Summary of how much two images differ, for validating runs against each other"""
+    diff = a - b
+    finite = np.isfinite(diff)
+    scale = np.abs(a[finite]).sum(dtype=np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rel = np.abs(diff) / np.maximum(np.abs(a), np.abs(b))
+    return {
+        "identical": bool(np.array_equal(a, b)),
+        "max_abs_diff": float(np.abs(diff[finite]).max()) if finite.any() else None,
+        "max_rel_diff": float(np.nanmax(rel)) if np.isfinite(rel).any() else None,
+        "l1_rel_diff": float(np.abs(diff[finite]).sum(dtype=np.float64) / scale) if scale > 0 else None,
+    }
+
+
+def plot_compare(a, b, mode, extent, labels, field_label, cmap="viridis", diff_cmap="RdBu_r",
+                 log_scale=True, vmin=None, vmax=None, show_colorbar=True, show_axes=False,
+                 axis_labels=("x", "y"), short_size=3.6, font_size=12, dpi=150):
+    """
+    PNG bytes comparing images a and b ([ny, nx], same units):
+    "side" shows A | B with a shared colorbar, "diff" A - B and "ratio" A / B
+    on a diverging colormap centered on 0 and 1 respectively.
+    """
+    if mode not in COMPARE_MODES:
+        raise ValueError(f"Unknown compare mode: {mode}. Use one of {COMPARE_MODES}")
+    if mode == "side":
+        panels = [a, b]
+        titles = list(labels)
+        finite = np.concatenate([a[np.isfinite(a)], b[np.isfinite(b)]])
+        if log_scale:
+            finite = finite[finite > 0]
+            panels = [np.ma.masked_less_equal(p, 0) for p in panels]
+        lo = vmin if vmin is not None else (finite.min() if len(finite) else None)
+        hi = vmax if vmax is not None else (finite.max() if len(finite) else None)
+        norm = LogNorm(vmin=lo, vmax=hi) if log_scale else Normalize(vmin=lo, vmax=hi)
+        colormap = cmap
+        cbar_label = field_label
+    elif mode == "diff":
+        diff = a - b
+        panels = [diff]
+        titles = [f"{labels[0]} - {labels[1]}"]
+        limit = vmax if vmax is not None else np.nanmax(np.abs(diff))
+        limit = limit if limit > 0 else 1.0
+        if log_scale:
+            # Symmetric log scale, linear within 1e-3 of the largest difference
+            norm = SymLogNorm(linthresh=1e-3 * limit, vmin=-limit, vmax=limit)
+        else:
+            norm = Normalize(vmin=-limit, vmax=limit)
+        colormap = diff_cmap
+        cbar_label = f"$\\Delta$ {field_label}"
+    else:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            ratio = a / b
+        panels = [np.ma.masked_invalid(np.ma.masked_less_equal(ratio, 0))]
+        titles = [f"{labels[0]} / {labels[1]}"]
+        log_ratio = np.abs(np.log10(panels[0].compressed())) if panels[0].count() else np.array([0.0])
+        limit = vmax if vmax is not None else 10 ** max(log_ratio.max(), 1e-6)
+        norm = LogNorm(vmin=1.0 / limit, vmax=limit)
+        colormap = diff_cmap
+        cbar_label = "ratio"
+
+    ny, nx = a.shape
+    panel_width = short_size * nx / min(nx, ny)
+    panel_height = short_size * ny / min(nx, ny)
+    # matplotlib.figure.Figure instead of pyplot: requests are served from several threads
+    fig = Figure(figsize=(panel_width * len(panels) + (0.6 if show_colorbar else 0), panel_height + 0.4))
+    axes = fig.subplots(1, len(panels), squeeze=False)[0]
+    for ax, panel, title in zip(axes, panels, titles):
+        im = ax.imshow(panel, origin="lower", extent=extent, cmap=colormap, norm=norm, interpolation="nearest")
+        ax.set_title(title, fontsize=font_size)
+        if show_axes:
+            ax.set_xlabel(axis_labels[0], fontsize=font_size)
+            ax.set_ylabel(axis_labels[1], fontsize=font_size)
+            ax.tick_params(labelsize=font_size * 0.8)
+        else:
+            ax.set_xticks([])
+            ax.set_yticks([])
+    if show_colorbar:
+        cbar = fig.colorbar(im, ax=list(axes), fraction=0.046 / len(panels), pad=0.02)
+        cbar.set_label(cbar_label, fontsize=font_size)
+        cbar.ax.tick_params(labelsize=font_size * 0.8)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight", pad_inches=0.05)
+    return buf.getvalue()
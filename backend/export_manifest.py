@@ -0,0 +1,90 @@
+"""
+Manifests for persistent, resumable frame output.
+
+An output directory holds rendered frames plus one small JSON record per frame in
+<output_dir>/.manifest/. A record stores the hash of the render parameters and the
+modification time of the source plotfile, so a frame is reused only if it was
+rendered with the same parameters from the same (unchanged) snapshot. Records are
+written atomically by whichever process rendered the frame, so several workers can
+fill one directory concurrently and an interrupted export loses at most the frames
+that were in flight.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+MANIFEST_DIRNAME = ".manifest"
+
+
+def params_hash(params):
+    """Stable short hash of a JSON-serializable parameter dict"""
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def source_mtime(plotfile_dir):
+    """
+    Modification time of a plotfile. AMReX writes the Header last, so its mtime
+    changes whenever the snapshot is rewritten.
+    """
+    header = os.path.join(plotfile_dir, "Header")
+    try:
+        return os.path.getmtime(header)
+    except OSError:
+        return os.path.getmtime(plotfile_dir)
+
+
+class FrameManifest:
+    """Per-frame records of what was rendered into output_dir and from which source"""
+
+    def __init__(self, output_dir, params):
+        self.output_dir = output_dir
+        self.params_hash = params_hash(params)
+        self.manifest_dir = os.path.join(output_dir, MANIFEST_DIRNAME)
+
+    def _record_path(self, frame_file):
+        return os.path.join(self.manifest_dir, frame_file + ".json")
+
+    def is_current(self, frame_file, plotfile_dir):
+        """True if frame_file exists and was rendered with these params from the current plotfile"""
+        if not os.path.exists(os.path.join(self.output_dir, frame_file)):
+            return False
+        try:
+            with open(self._record_path(frame_file), "r") as f:
+                record = json.load(f)
+            return (record.get("params_hash") == self.params_hash
+                    and record.get("source_mtime") == source_mtime(plotfile_dir))
+        except (OSError, ValueError):
+            return False
+
+    def record(self, frame_file, plotfile_dir):
+        """Record that frame_file was just rendered from plotfile_dir"""
+        os.makedirs(self.manifest_dir, exist_ok=True)
+        path = self._record_path(frame_file)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({
+                "params_hash": self.params_hash,
+                "source": os.path.abspath(plotfile_dir),
+                "source_mtime": source_mtime(plotfile_dir),
+                "rendered_at": time.time(),
+            }, f)
+        os.replace(tmp_path, path)
+
+
+def prune_export_dirs(root, max_age_days):
+    """Remove export directories under root that have not been used for max_age_days"""
+    if not max_age_days or not os.path.isdir(root):
+        return
+    cutoff = time.time() - max_age_days * 86400
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        try:
+            if os.path.isdir(path) and os.path.getmtime(path) < cutoff:
+                print(f"Removing unused export directory: {path}")
+                shutil.rmtree(path, ignore_errors=True)
+        except OSError:
+            continue
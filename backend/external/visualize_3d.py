@@ -21,6 +21,9 @@ Resolution      Quality         Render Time     File Size    Use Case
 (4096, 4096)    Very High       ~10-20 min      ~3 MB        High-end publications
 (8192, 8192)    Ultra           ~30-60 min      ~10 MB       Posters, presentations
 
+Render times are for a single core; volume renderings cast rays on all cores by
+default (workers=0), so they drop roughly with the number of cores.
+
 Example usage:
     create_volume_rendering(ds, field="density", resolution=(2048, 2048))
     create_rotating_volume_rendering(ds, field="density", resolution=(1024, 1024))
@@ -36,6 +39,15 @@ import os
 import matplotlib
 matplotlib.rcParams['savefig.dpi'] = 600
 
+# multi-core ray casting is shared with the web backend (backend/parallel_volume.py)
+import sys
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), ".."))
+try:
+    import parallel_volume
+except ImportError:
+    print("parallel_volume not found; volume renderings will use a single core")
+    parallel_volume = None
+
 # Configuration
 DATA_PATH = "data/plt348192"
 OUTPUT_DIR = "output"
@@ -56,7 +68,14 @@ def load_dataset():
         print(f"  - {field}")
     return ds
 
-def create_volume_rendering(ds, field="density", camera_dir=[1, 1, 1], width=1.0, resolution=(1024, 1024)):
+def create_scene(ds, field, workers=0):
+    """Volume rendering scene casting rays with `workers` threads (0 = all cores)."""
+    if parallel_volume is None:
+        return yt.create_scene(ds, field=("gas", field))
+    return parallel_volume.create_scene(ds, ("gas", field), workers=workers)
+
+def create_volume_rendering(ds, field="density", camera_dir=[1, 1, 1], width=1.0, resolution=(1024, 1024),
+                            workers=0):
     """
     Create a 3D volume rendering of the specified field.
     
@@ -73,11 +92,13 @@ def create_volume_rendering(ds, field="density", camera_dir=[1, 1, 1], width=1.0
     resolution : tuple
         Resolution of the output image (width, height) in pixels
         Default: (1024, 1024). Use (2048, 2048) or (4096, 4096) for higher quality
+    workers : int
+        Threads casting rays in parallel (default: 0 = all cores, 1 = serial)
     """
     print(f"\nCreating volume rendering for {field}...")
     
     # Create a scene
-    sc = yt.create_scene(ds, field=("gas", field))
+    sc = create_scene(ds, field, workers)
     
     # Get the source (volume rendering)
     source = sc[0]
@@ -134,7 +155,8 @@ def create_volume_rendering(ds, field="density", camera_dir=[1, 1, 1], width=1.0
     
     return sc
 
-def create_rotating_volume_rendering(ds, field="density", n_frames=36, width=1.0, resolution=(1024, 1024)):
+def create_rotating_volume_rendering(ds, field="density", n_frames=36, width=1.0, resolution=(1024, 1024),
+                                     workers=0):
     """
     Create a rotating volume rendering animation.
     
@@ -151,10 +173,12 @@ def create_rotating_volume_rendering(ds, field="density", n_frames=36, width=1.0
     resolution : tuple
         Resolution of the output image (width, height) in pixels
         Default: (1024, 1024). Use (2048, 2048) or higher for better quality
+    workers : int
+        Threads casting rays in parallel (default: 0 = all cores, 1 = serial)
     """
     print(f"\nCreating rotating volume rendering for {field}...")
     
-    sc = yt.create_scene(ds, field=("gas", field))
+    sc = create_scene(ds, field, workers)
     source = sc[0]
     
     # Set up transfer function
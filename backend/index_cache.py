@@ -0,0 +1,172 @@
+"""
+Persistent grid index sidecars for AMReX plotfiles.
+
+Building yt's grid index for a plotfile parses every box of the Header and of the
+level Cell_H files and then searches the children of every grid, which takes
+seconds for ~10^5 boxes and is repeated by every process that opens the snapshot.
+Once built, the index arrays (grid edges, dimensions, start indices, levels, file
+names and offsets, parent/child relations) are written to a binary .npz sidecar in
+a cache directory; later loads of the unchanged plotfile (same Header mtime) fill
+the index from it instead.
+
+install() patches yt's BoxlibHierarchy, so it covers yt.load everywhere in the
+process. A missing, stale or unreadable sidecar falls back to yt's own parsing.
+"""
+
+import hashlib
+import os
+
+import numpy as np
+
+from export_manifest import source_mtime
+
+SIDECAR_VERSION = 1
+
+_config = {"cache_dir": None, "min_grids": 0}
+_originals = {}
+
+
+def sidecar_path(cache_dir, plotfile_dir):
+    digest = hashlib.sha1(os.path.abspath(plotfile_dir).encode("utf-8")).hexdigest()[:20]
+    return os.path.join(cache_dir, f"{digest}.npz")
+
+
+def _load(index):
+    # Sidecar arrays for index's plotfile, or None if there is no valid sidecar
+    path = sidecar_path(_config["cache_dir"], index.directory)
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            sidecar = {key: data[key] for key in data.files}
+    except (OSError, ValueError, KeyError):
+        return None
+    if (int(sidecar["version"]) != SIDECAR_VERSION
+            or float(sidecar["source_mtime"]) != source_mtime(index.directory)
+            or int(sidecar["num_grids"]) != index.num_grids
+            or int(sidecar["max_level"]) != index.dataset._max_level):
+        return None
+    return sidecar
+
+
+def _parse_index(self):
+    self._index_sidecar = _load(self) if _config["cache_dir"] else None
+    if self._index_sidecar is not None:
+        try:
+            return _fill_from_sidecar(self, self._index_sidecar)
+        except Exception as e:
+            # e.g. yt internals that differ from what the sidecar fill expects
+            print(f"Warning: Ignoring grid index sidecar for {self.directory}: {e}")
+            self._index_sidecar = None
+    return _originals["_parse_index"](self)
+
+
+def _fill_from_sidecar(self, sidecar):
+    # Same state as BoxlibHierarchy._parse_index
+    self.max_level = self.dataset._max_level
+    self.dimensionality = self.dataset.dimensionality
+    self.level_dds = sidecar["level_dds"]
+    self.grid_left_edge[:] = sidecar["grid_left_edge"]
+    self.grid_right_edge[:] = sidecar["grid_right_edge"]
+    self.grid_dimensions[:] = sidecar["grid_dimensions"]
+    self.grid_start_index[:] = sidecar["grid_start_index"]
+    self.grid_levels[:] = sidecar["grid_levels"]
+    filenames = [os.path.join(self.directory, str(name)) for name in sidecar["filenames"]]
+    grids = []
+    for i, (file_id, offset, level) in enumerate(zip(sidecar["file_ids"].tolist(), sidecar["offsets"].tolist(),
+                                                     sidecar["grid_levels"][:, 0].tolist())):
+        grid = self.grid(i, offset, filenames[file_id], self)
+        grid.Level = level
+        grids.append(grid)
+    self.grids = grids
+    self.float_type = "float64"
+
+
+def _reconstruct_parent_child(self):
+    sidecar = getattr(self, "_index_sidecar", None)
+    if sidecar is None:
+        _originals["_reconstruct_parent_child"](self)
+        if _config["cache_dir"] and self.num_grids >= _config["min_grids"]:
+            try:
+                _save(self)
+            except Exception as e:
+                print(f"Warning: Could not write grid index sidecar for {self.directory}: {e}")
+        return
+
+    self._index_sidecar = None
+    try:
+        child_ptr, child_ids = sidecar["child_ptr"], sidecar["child_ids"]
+        parent_ptr, parent_ids = sidecar["parent_ptr"], sidecar["parent_ids"]
+        for i, grid in enumerate(self.grids):
+            grid._children_ids = child_ids[child_ptr[i]:child_ptr[i + 1]] + grid._id_offset
+            grid._parent_id = (parent_ids[parent_ptr[i]:parent_ptr[i + 1]] + grid._id_offset).tolist()
+    except Exception as e:
+        print(f"Warning: Ignoring grid relations of the sidecar for {self.directory}: {e}")
+        _originals["_reconstruct_parent_child"](self)
+
+
+def _save(index):
+    grids = index.grids
+    offset = grids[0]._id_offset if len(grids) else 0
+    filenames, file_ids = np.unique([os.path.relpath(g.filename, index.directory) for g in grids],
+                                    return_inverse=True)
+    children = [np.asarray(g._children_ids, dtype=np.int64) - offset for g in grids]
+    parents = [np.asarray(g._parent_id, dtype=np.int64) - offset for g in grids]
+    cache_dir = _config["cache_dir"]
+    os.makedirs(cache_dir, exist_ok=True)
+    path = sidecar_path(cache_dir, index.directory)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    try:
+        np.savez(
+            tmp_path,
+            version=SIDECAR_VERSION,
+            source=os.path.abspath(index.directory),
+            source_mtime=source_mtime(index.directory),
+            num_grids=index.num_grids,
+            max_level=index.dataset._max_level,
+            level_dds=np.asarray(index.level_dds),
+            grid_left_edge=np.asarray(index.grid_left_edge.d),
+            grid_right_edge=np.asarray(index.grid_right_edge.d),
+            grid_dimensions=np.asarray(index.grid_dimensions),
+            grid_start_index=np.asarray(index.grid_start_index),
+            grid_levels=np.asarray(index.grid_levels),
+            filenames=filenames,
+            file_ids=file_ids.astype(np.int32),
+            offsets=np.array([g._base_offset for g in grids], dtype=np.int64),
+            child_ptr=np.concatenate([[0], np.cumsum([len(c) for c in children])]).astype(np.int64),
+            child_ids=np.concatenate(children) if children else np.empty(0, np.int64),
+            parent_ptr=np.concatenate([[0], np.cumsum([len(p) for p in parents])]).astype(np.int64),
+            parent_ids=np.concatenate(parents) if parents else np.empty(0, np.int64),
+        )
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    os.replace(tmp_path, path)
+
+
+def install(cache_dir, min_grids=0):
+    """
+    Use sidecars in cache_dir for every AMReX plotfile loaded by yt in this process
+    (cache_dir None: yt's own parsing only). Sidecars are written for plotfiles with
+    at least min_grids grids. Can be called again to change the settings.
+    """
+    _config["cache_dir"] = cache_dir
+    _config["min_grids"] = min_grids
+    if _originals:
+        return
+    # The patch relies on BoxlibHierarchy internals; a yt without them keeps its own parsing
+    try:
+        from yt.frontends.amrex.data_structures import BoxlibHierarchy
+        originals = {"_parse_index": BoxlibHierarchy._parse_index,
+                     "_reconstruct_parent_child": BoxlibHierarchy._reconstruct_parent_child}
+    except Exception as e:
+        print(f"Warning: Grid index sidecars are disabled, yt's AMReX frontend is not as expected: {e}")
+        return
+    _originals.update(originals)
+    BoxlibHierarchy._parse_index = _parse_index
+    BoxlibHierarchy._reconstruct_parent_child = _reconstruct_parent_child
+
+
+def install_from_settings():
+    from settings import get_settings
+    settings = get_settings()
+    install(settings.index_dir() if settings.index_cache else None, settings.index_cache_min_grids)
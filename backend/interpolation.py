@@ -0,0 +1,108 @@
+"""
+Interpolated movie frames between snapshots.
+
+Simulations write snapshots at irregular and often sparse times. A movie at a fixed
+frame rate needs frames at regular times t = n * interval, most of which fall
+between two snapshots. Instead of repeating the last snapshot before each frame,
+the frame is blended from the fixed-resolution buffers (FRBs, see compare.py) of
+the snapshots A before and B after it:
+
+    linear   (1 - w) A + w B
+    log      A^(1 - w) B^w, linear in log space (densities, temperatures), falling
+             back to linear where A or B is not positive
+
+with w = (t - t_A) / (t_B - t_A). The FRB of each snapshot is read once; blending
+and plotting the frames in between reads no data.
+"""
+
+import io
+import math
+
+import numpy as np
+from matplotlib.colors import LogNorm, Normalize
+from matplotlib.figure import Figure
+
+INTERPOLATION_MODES = ("linear", "log")
+
+
+def frame_times(times, interval):
+    """
+    Frames at the multiples of interval from the first to the last of the sorted
+    snapshot times. Returns [(t, i, w)]: the frame at time t is blended from snapshots
+    i and i + 1 with weight w of snapshot i + 1 (w = 0: snapshot i alone).
+    """
+    if interval <= 0:
+        raise ValueError(f"The time interval must be positive, got {interval}")
+    times = np.asarray(times, dtype=np.float64)
+    if len(times) == 0:
+        return []
+    # Tolerance for frames that land on a snapshot time up to rounding
+    eps = 1e-9 * max(abs(times[-1]), interval)
+    frames = []
+    for n in range(math.ceil((times[0] - eps) / interval), math.floor((times[-1] + eps) / interval) + 1):
+        t = n * interval
+        i = min(max(int(np.searchsorted(times, t + eps, side="right")) - 1, 0), len(times) - 1)
+        gap = times[i + 1] - times[i] if i + 1 < len(times) else 0.0
+        w = min(max((t - times[i]) / gap, 0.0), 1.0) if gap > 0 else 0.0
+        frames.append((float(t), i, 0.0 if w * gap <= eps else float(w)))
+    return frames
+
+
+def blend(a, b, w, mode="linear"):
+    """Image between a (w = 0) and b (w = 1), interpolated linearly or in log space"""
+    if mode not in INTERPOLATION_MODES:
+        raise ValueError(f"Unknown interpolation mode: {mode}. Use one of {INTERPOLATION_MODES}")
+    if w <= 0 or b is None:
+        return a
+    if w >= 1:
+        return b
+    linear = (1.0 - w) * a + w * b
+    if mode == "linear":
+        return linear
+    positive = (a > 0) & (b > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        logs = np.exp((1.0 - w) * np.log(a) + w * np.log(b))
+    return np.where(positive, logs, linear).astype(linear.dtype, copy=False)
+
+
+def plot_frame(image, extent, field_label, cmap="viridis", log_scale=True, vmin=None, vmax=None,
+               show_colorbar=True, show_axes=False, axis_labels=("x", "y"), timestamp=None,
+               top_left_text=None, top_right_text=None, short_size=3.6, font_size=12, dpi=150):
+    """PNG bytes of image ([ny, nx]) covering extent, with an optional timestamp and corner texts"""
+    finite = image[np.isfinite(image)]
+    if log_scale:
+        finite = finite[finite > 0]
+        image = np.ma.masked_less_equal(image, 0)
+    lo = vmin if vmin is not None else (finite.min() if len(finite) else None)
+    hi = vmax if vmax is not None else (finite.max() if len(finite) else None)
+    norm = LogNorm(vmin=lo, vmax=hi) if log_scale else Normalize(vmin=lo, vmax=hi)
+
+    ny, nx = image.shape
+    width = short_size * nx / min(nx, ny)
+    height = short_size * ny / min(nx, ny)
+    # matplotlib.figure.Figure instead of pyplot: requests are served from several threads
+    fig = Figure(figsize=(width + (0.6 if show_colorbar else 0), height))
+    ax = fig.subplots()
+    ax.set_facecolor("black")
+    im = ax.imshow(image, origin="lower", extent=extent, cmap=cmap, norm=norm, interpolation="nearest")
+    if show_axes:
+        ax.set_xlabel(axis_labels[0], fontsize=font_size)
+        ax.set_ylabel(axis_labels[1], fontsize=font_size)
+        ax.tick_params(labelsize=font_size * 0.8)
+    else:
+        ax.set_xticks([])
+        ax.set_yticks([])
+    text_args = {"transform": ax.transAxes, "color": "white", "fontsize": font_size}
+    if top_left_text:
+        ax.text(0.02, 0.98, top_left_text, ha="left", va="top", **text_args)
+    if top_right_text:
+        ax.text(0.98, 0.98, top_right_text, ha="right", va="top", **text_args)
+    if timestamp:
+        ax.text(0.02, 0.02, timestamp, ha="left", va="bottom", **text_args)
+    if show_colorbar:
+        cbar = fig.colorbar(im, ax=ax, fraction=0.046, pad=0.02)
+        cbar.set_label(field_label, fontsize=font_size)
+        cbar.ax.tick_params(labelsize=font_size * 0.8)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight", pad_inches=0.05)
+    return buf.getvalue()
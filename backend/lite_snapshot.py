@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+"""
+Coarsened "lite" copies of AMReX plotfiles for fast browsing.
+
+A lite copy holds selected fields of a plotfile on a uniform grid of at most
+max_cells cells along each side, in float32. It is the finest AMR level that fits
+(read through yt's covering grid; AMReX stores coarse levels averaged down from the
+finer ones), block-averaged further if even level 0 is too large. Fields are written
+slab by slab, so memory stays bounded, as .npy files of planes along x:
+
+    <lite_dir>/<name>-<hash>/
+        lite.json               source identity, domain, units, fields, level, coarsening
+        <field>.<slab>.npy      float32, shape (planes, ny, nz)
+
+The backend renders previews (interactive volume renderings, preview slices and
+projections, thumbnails) from the lite copy when there is an up-to-date one holding
+the fields of the view; final renders and exports always read the full plotfile.
+
+Command line:
+    python lite_snapshot.py plt* -f density temperature -j 8
+    python lite_snapshot.py /data/run --watch    # lite copies of new plotfiles as they land
+"""
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import traceback
+
+import numpy as np
+
+from export_manifest import source_mtime
+import index_cache
+
+LITE_VERSION = 1
+
+# Cells of the full-resolution slab read at a time
+SLAB_CELLS = 2 ** 26
+
+
+def lite_path(lite_dir, plotfile_dir):
+    """Directory of the lite copy of plotfile_dir"""
+    plotfile_dir = os.path.abspath(plotfile_dir)
+    digest = hashlib.sha1(plotfile_dir.encode("utf-8")).hexdigest()[:12]
+    return os.path.join(lite_dir, f"{os.path.basename(plotfile_dir)}-{digest}")
+
+
+def read_meta(path):
+    """Metadata of the lite copy in path, or None"""
+    try:
+        with open(os.path.join(path, "lite.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def current(lite_dir, plotfile_dir):
+    """Metadata of the lite copy of plotfile_dir if it is up to date, else None"""
+    meta = read_meta(lite_path(lite_dir, plotfile_dir))
+    if (meta is None or meta.get("version") != LITE_VERSION
+            or meta.get("source_mtime") != source_mtime(plotfile_dir)):
+        return None
+    return meta
+
+
+def choose_grid(domain_dimensions, refine_by, max_level, max_cells):
+    """
+    (level, factor, dims): the finest level up to max_level whose grid has at most
+    max_cells cells along each side, the block-averaging factor that brings it there
+    if level 0 is already too large (1 otherwise), and the resulting dimensions
+    """
+    dims = np.asarray(domain_dimensions, dtype=np.int64)
+    level = 0
+    for ratio in refine_by[:max_level]:
+        finer = dims * np.where(dims > 1, ratio, 1)
+        if finer.max() > max_cells:
+            break
+        dims = finer
+        level += 1
+    factor = 1
+    if dims.max() > max_cells:
+        # Smallest factor dividing every (non-flat) dimension
+        factor = -(-int(dims.max()) // max_cells)
+        while any(d % factor for d in dims if d > 1):
+            factor += 1
+    return level, factor, [int(d // factor) if d > 1 else 1 for d in dims]
+
+
+def _block_average(values, factors):
+    nx, ny, nz = values.shape
+    fx, fy, fz = factors
+    return values.reshape(nx // fx, fx, ny // fy, fy, nz // fz, fz).mean(axis=(1, 3, 5))
+
+
+def create(plotfile_dir, lite_dir, fields, max_cells=256, max_level=None, setup_fields=None):
+    """
+    Write the lite copy of plotfile_dir (fields: names of ("gas", name) fields; names
+    the dataset does not have are skipped) and return its metadata
+    """
+    import yt
+
+    ds = yt.load(plotfile_dir)
+    if setup_fields is not None:
+        setup_fields(ds)
+    available = set(ds.derived_field_list) | set(ds.field_list)
+    names = [f for f in fields if ("gas", f) in available]
+    for name in fields:
+        if name not in names:
+            print(f"Warning: {os.path.basename(plotfile_dir)} has no field {name}, not in its lite copy")
+    if not names:
+        raise ValueError(f"None of the fields {fields} in {plotfile_dir}")
+
+    finest = ds.index.max_level if max_level is None else min(max_level, ds.index.max_level)
+    refine_by = [int(ds.refine_by)] * ds.index.max_level
+    level, factor, dims = choose_grid(ds.domain_dimensions, refine_by, finest, max_cells)
+    level_dims = [int(d) * int(ds.refine_by) ** level if d > 1 else 1 for d in ds.domain_dimensions]
+    factors = [factor if d > 1 else 1 for d in level_dims]
+    dx = (ds.domain_width / ds.arr(level_dims, "dimensionless")).to("code_length")
+
+    # Slabs of whole output planes along x, at most SLAB_CELLS full-resolution cells each
+    plane_cells = factors[0] * level_dims[1] * level_dims[2]
+    slab_planes = max(1, min(dims[0], SLAB_CELLS // plane_cells))
+
+    path = lite_path(lite_dir, plotfile_dir)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    units = {}
+    n_slabs = 0
+    try:
+        for start in range(0, dims[0], slab_planes):
+            planes = min(slab_planes, dims[0] - start)
+            left = ds.domain_left_edge.to("code_length").copy()
+            left[0] += start * factors[0] * dx[0]
+            cg = ds.covering_grid(level, left_edge=left,
+                                  dims=[planes * factors[0], level_dims[1], level_dims[2]])
+            for name in names:
+                values = cg["gas", name]
+                units[name] = str(values.units)
+                coarse = _block_average(values.d, factors).astype(np.float32)
+                np.save(os.path.join(tmp_path, f"{name}.{n_slabs:04d}.npy"), coarse)
+            n_slabs += 1
+            del cg
+        meta = {
+            "version": LITE_VERSION,
+            "source": os.path.abspath(plotfile_dir),
+            "source_mtime": source_mtime(plotfile_dir),
+            "level": level,
+            "factor": factor,
+            "dimensions": dims,
+            "slabs": n_slabs,
+            "fields": units,
+            "domain_left_edge": ds.domain_left_edge.to("code_length").d.tolist(),
+            "domain_right_edge": ds.domain_right_edge.to("code_length").d.tolist(),
+            "current_time": float(ds.current_time.to("code_time").d),
+            "length_unit": float(ds.length_unit.to("cm").d),
+            "mass_unit": float(ds.mass_unit.to("g").d),
+            "time_unit": float(ds.time_unit.to("s").d),
+            "periodicity": [bool(p) for p in ds.periodicity],
+        }
+        with open(os.path.join(tmp_path, "lite.json"), "w") as f:
+            json.dump(meta, f, indent=1)
+        shutil.rmtree(path, ignore_errors=True)
+        os.replace(tmp_path, path)
+    except BaseException:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    return meta
+
+
+def load(path):
+    """yt dataset of the lite copy in path, with ("gas", name) fields"""
+    import yt
+
+    meta = read_meta(path)
+    if meta is None:
+        raise ValueError(f"No lite copy in {path}")
+    data = {}
+    for name, units in meta["fields"].items():
+        slabs = [np.load(os.path.join(path, f"{name}.{i:04d}.npy")) for i in range(meta["slabs"])]
+        data[name] = (np.concatenate(slabs), units)
+    bbox = np.array([meta["domain_left_edge"], meta["domain_right_edge"]]).T
+    ds = yt.load_uniform_grid(
+        data, meta["dimensions"], bbox=bbox, nprocs=1,
+        length_unit=meta["length_unit"], mass_unit=meta["mass_unit"], time_unit=meta["time_unit"],
+        sim_time=meta["current_time"], periodicity=tuple(meta["periodicity"]),
+    )
+    # Same field names as the full plotfile
+    for name, units in meta["fields"].items():
+        def _stored(field, data, name=name):
+            return data["stream", name]
+        ds.add_field(("gas", name), function=_stored, units=units, sampling_type="cell", force_override=True)
+    return ds
+
+
+def _create_task(task):
+    # Runs in pool workers; errors are returned so one bad snapshot doesn't stop the others
+    plotfile_dir, lite_dir, fields, max_cells, max_level, setup_fields = task
+    try:
+        create(plotfile_dir, lite_dir, fields, max_cells, max_level, setup_fields)
+        return plotfile_dir, None
+    except Exception as e:
+        traceback.print_exc()
+        return plotfile_dir, str(e)
+
+
+def create_lite_snapshots(plotfile_dirs, lite_dir, fields, max_cells=256, max_level=None, n_processes=1,
+                          setup_fields=None, refresh=False, on_result=None):
+    """
+    Write lite copies of the plotfiles that have no up-to-date one (all with refresh).
+    on_result(plotfile_dir, error) is called as plotfiles finish. Returns
+    {"created", "current", "errors"}.
+    """
+    tasks = []
+    for plotfile_dir in plotfile_dirs:
+        meta = None if refresh else current(lite_dir, plotfile_dir)
+        if meta is None or not set(fields) <= set(meta["fields"]):
+            tasks.append((plotfile_dir, lite_dir, list(fields), max_cells, max_level, setup_fields))
+    errors = {}
+
+    def collect(result):
+        plotfile_dir, error = result
+        if error is not None:
+            errors[os.path.basename(plotfile_dir)] = error
+        if on_result is not None:
+            on_result(plotfile_dir, error)
+
+    os.makedirs(lite_dir, exist_ok=True)
+    n_processes = min(n_processes, len(tasks))
+    if n_processes > 1:
+        # spawn: safe to start from the threaded web server
+        with multiprocessing.get_context("spawn").Pool(n_processes, initializer=index_cache.install_from_settings) as pool:
+            for result in pool.imap_unordered(_create_task, tasks):
+                collect(result)
+    else:
+        for task in tasks:
+            collect(_create_task(task))
+    return {"created": len(tasks) - len(errors), "current": len(plotfile_dirs) - len(tasks), "errors": errors}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Coarsened float32 copies of QUOKKA plotfiles for fast browsing")
+    parser.add_argument("pltdirs", type=str, nargs="+",
+                        help="Plotfile directories, e.g. plt* (with --watch: run directories). "
+                             "Files with .old. in the name will be ignored.")
+    parser.add_argument("-f", "--fields", type=str, nargs="+", default=None,
+                        help="Fields to keep. Default: lite_fields from config.yaml")
+    parser.add_argument("--max_cells", type=int, default=None,
+                        help="Cells along the longest side. Default: lite_max_cells from config.yaml")
+    parser.add_argument("--max_level", type=int, default=None,
+                        help="Finest AMR level to use. Default: lite_max_level from config.yaml")
+    parser.add_argument("-o", "--lite_dir", type=str, default=None,
+                        help="Output directory. Default: lite_dir from config.yaml")
+    parser.add_argument("-j", "--n_processes", type=int, default=1, help="Number of processes. Default: 1")
+    parser.add_argument("--refresh", action="store_true", help="Rewrite up-to-date lite copies")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and write lite copies of new plotfiles in the given run directories")
+    parser.add_argument("--watch_prefix", type=str, default="plt", help="Plotfile name prefix for --watch")
+    parser.add_argument("--watch_interval", type=float, default=5.0,
+                        help="Seconds between checks for new plotfiles with --watch. Default: 5")
+    return parser.parse_args()
+
+
+def main(args):
+    from settings import get_settings
+    from main import _add_derived_fields
+
+    settings = get_settings()
+    index_cache.install_from_settings()
+    lite_dir = args.lite_dir or settings.lite_snapshot_dir()
+    options = {
+        "fields": args.fields or settings.lite_fields,
+        "max_cells": args.max_cells or settings.lite_max_cells,
+        "max_level": args.max_level if args.max_level is not None else settings.lite_max_level,
+        "n_processes": args.n_processes,
+        "setup_fields": _add_derived_fields,
+        "refresh": args.refresh,
+        "on_result": lambda p, error: print(f"{os.path.basename(p)}: {'failed: ' + error if error else 'done'}"),
+    }
+
+    if not args.watch:
+        pltdirs = sorted(p for p in args.pltdirs if os.path.isdir(p) and ".old." not in os.path.basename(p))
+        info = create_lite_snapshots(pltdirs, lite_dir, **options)
+        print(f"{info['created']} lite copies written, {info['current']} up to date, "
+              f"{len(info['errors'])} failed, in {lite_dir}")
+        return
+
+    from plotfile_watch import PlotfileWatcher
+    watcher = PlotfileWatcher(args.pltdirs, prefix=args.watch_prefix, poll_interval=args.watch_interval)
+    print(f"Watching {', '.join(args.pltdirs)} for new plotfiles (Ctrl-C to stop)")
+    try:
+        while True:
+            new = [p for p in watcher.wait() if ".old." not in os.path.basename(p)]
+            if new:
+                create_lite_snapshots(new, lite_dir, **options)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main(parse_args())
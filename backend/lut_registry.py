@@ -0,0 +1,248 @@
+"""
+Colormap lookup tables and volume-rendering transfer functions.
+
+Colormaps are resampled once into RGBA tables: 256 entries for 2D images
+(matplotlib's own resolution) and 4096 for the colors of transfer-function layers.
+Transfer functions are built once per (cmap, bounds, log, n_layers, grey_opacity)
+and kept in an LRU cache, so re-rendering a volume with the same styling does not
+re-sample the colormap, and restyling a slice, comparison, phase plot or particle
+image reuses the same colormap object.
+
+Custom transfer functions are stored by name as JSON files in a directory, so they
+persist across sessions and are shared by every backend using that directory. They
+are selected anywhere a colormap name is accepted with cmap="tf:<name>"; volume
+renderings use their layers and 2D images their base colormap. A definition looks
+like
+
+    {"cmap": "inferno", "grey_opacity": false,
+     "layers": [{"position": 0.3, "width": 0.01, "alpha": 0.2},
+                {"position": 0.8, "width": 0.02, "alpha": 0.8, "color": [1.0, 1.0, 1.0]}]}
+
+where positions and widths are fractions of the transfer-function bounds (in log
+space for log scaling) and layers without a color take it from cmap. Without
+"layers", n_layers evenly spaced layers of cmap are used, as for a plain colormap;
+without "grey_opacity", the render's own setting is used.
+"""
+
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import matplotlib
+import numpy as np
+import yt
+from matplotlib.colors import ListedColormap
+
+CUSTOM_PREFIX = "tf:"
+COLORMAP_ENTRIES = 256
+TF_COLOR_ENTRIES = 4096
+
+_NAME_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+_tables = {}
+_colormaps = {}
+_transfer_functions = OrderedDict()
+_custom = {}
+_lock = threading.Lock()
+
+
+def is_custom(cmap):
+    return cmap.startswith(CUSTOM_PREFIX)
+
+
+def _check_name(name):
+    if not _NAME_RE.match(name):
+        raise ValueError(f"Invalid transfer function name: {name!r} "
+                         "(letters, digits, '_', '.' and '-', at most 64 characters)")
+
+
+def _custom_path(directory, name):
+    _check_name(name)
+    return os.path.join(directory, f"{name}.json")
+
+
+def _check_colormap(cmap):
+    if cmap not in matplotlib.colormaps:
+        raise ValueError(f"Unknown colormap: {cmap}")
+
+
+def validate_custom(definition):
+    """Normalized copy of a custom transfer function definition (ValueError if invalid)"""
+    if not isinstance(definition, dict):
+        raise ValueError("A transfer function definition must be a JSON object")
+    cmap = definition.get("cmap", "viridis")
+    _check_colormap(cmap)
+    layers = []
+    for layer in definition.get("layers") or []:
+        try:
+            position = float(layer["position"])
+            width = float(layer.get("width", 0.01))
+            alpha = float(layer.get("alpha", 1.0))
+            color = layer.get("color")
+            color = None if color is None else [float(c) for c in color]
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Invalid layer {layer!r}: needs a numeric 'position' and optional "
+                             "'width', 'alpha' and 'color' [r, g, b]")
+        if not 0.0 <= position <= 1.0 or width <= 0 or not 0.0 <= alpha <= 1.0:
+            raise ValueError(f"Invalid layer {layer!r}: position and alpha must be in [0, 1], width > 0")
+        if color is not None and (len(color) != 3 or not all(0.0 <= c <= 1.0 for c in color)):
+            raise ValueError(f"Invalid layer color {color!r}: expected [r, g, b] in [0, 1]")
+        layers.append({"position": position, "width": width, "alpha": alpha, "color": color})
+    grey_opacity = definition.get("grey_opacity")
+    return {"cmap": cmap, "grey_opacity": None if grey_opacity is None else bool(grey_opacity), "layers": layers}
+
+
+def save_custom(directory, name, definition):
+    """Validate and store a custom transfer function; returns the stored definition"""
+    definition = validate_custom(definition)
+    path = _custom_path(directory, name)
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(definition, f, indent=2)
+    os.replace(tmp_path, path)
+    return definition
+
+
+def _load_custom(directory, name):
+    # (modification time, definition), re-read only when the file changed
+    path = _custom_path(directory, name)
+    try:
+        mtime = os.stat(path).st_mtime
+    except FileNotFoundError:
+        raise KeyError(f"Transfer function not found: {name}")
+    with _lock:
+        cached = _custom.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached
+    with open(path) as f:
+        cached = (mtime, validate_custom(json.load(f)))
+    with _lock:
+        _custom[path] = cached
+    return cached
+
+
+def load_custom(directory, name):
+    """Stored definition of a custom transfer function (KeyError if there is none)"""
+    return _load_custom(directory, name)[1]
+
+
+def delete_custom(directory, name):
+    try:
+        os.remove(_custom_path(directory, name))
+    except FileNotFoundError:
+        raise KeyError(f"Transfer function not found: {name}")
+
+
+def list_custom(directory):
+    if not os.path.isdir(directory):
+        return []
+    return sorted(f[:-len(".json")] for f in os.listdir(directory)
+                  if f.endswith(".json") and _NAME_RE.match(f[:-len(".json")]))
+
+
+def base_colormap(cmap, directory):
+    """Matplotlib colormap name behind cmap (the base colormap of a custom transfer function)"""
+    if is_custom(cmap):
+        return load_custom(directory, cmap[len(CUSTOM_PREFIX):])["cmap"]
+    return cmap
+
+
+def rgba_table(cmap, entries=COLORMAP_ENTRIES):
+    """Read-only (entries, 4) RGBA table sampled evenly from a matplotlib colormap"""
+    key = (cmap, entries)
+    with _lock:
+        table = _tables.get(key)
+    if table is None:
+        _check_colormap(cmap)
+        table = matplotlib.colormaps[cmap](np.linspace(0.0, 1.0, entries))
+        table.setflags(write=False)
+        with _lock:
+            _tables[key] = table
+    return table
+
+
+def colormap(cmap, directory):
+    """
+    Shared matplotlib colormap for 2D images. Callers that change its
+    bad/under/over colors must work on a copy.
+    """
+    name = base_colormap(cmap, directory)
+    with _lock:
+        colors = _colormaps.get(name)
+    if colors is None:
+        # Colormaps with fewer colors (e.g. qualitative ones) keep their own entries
+        entries = min(COLORMAP_ENTRIES, matplotlib.colormaps[name].N)
+        colors = ListedColormap(rgba_table(name, entries), name=name)
+        with _lock:
+            _colormaps[name] = colors
+    return colors
+
+
+def _lookup(table, rel):
+    return table[int(np.clip(round(rel * (len(table) - 1)), 0, len(table) - 1))]
+
+
+def transfer_function(cmap, bounds, log, n_layers, grey_opacity, directory, max_entries):
+    """
+    ColorTransferFunction for a volume rendering of values within bounds (data units).
+    The returned object is shared between renders and must not be modified.
+    """
+    version = None
+    if is_custom(cmap):
+        version, definition = _load_custom(directory, cmap[len(CUSTOM_PREFIX):])
+        if definition["grey_opacity"] is not None:
+            grey_opacity = definition["grey_opacity"]
+        if definition["layers"]:
+            n_layers = None  # the stored layers replace the evenly spaced ones
+    real_bounds = (float(np.log10(bounds[0])), float(np.log10(bounds[1]))) if log \
+        else (float(bounds[0]), float(bounds[1]))
+    key = (cmap, version, real_bounds, n_layers, bool(grey_opacity))
+    with _lock:
+        tf = _transfer_functions.get(key)
+        if tf is not None:
+            _transfer_functions.move_to_end(key)
+            return tf
+
+    tf = yt.ColorTransferFunction(real_bounds, grey_opacity=grey_opacity)
+    if is_custom(cmap) and n_layers is None:
+        _add_custom_layers(tf, definition, real_bounds)
+    else:
+        _add_layers(tf, rgba_table(base_colormap(cmap, directory), TF_COLOR_ENTRIES), n_layers)
+
+    if max_entries > 0:
+        with _lock:
+            _transfer_functions[key] = tf
+            while len(_transfer_functions) > max_entries:
+                _transfer_functions.popitem(last=False)
+    return tf
+
+
+def _add_layers(tf, table, n_layers):
+    # Same layers as ColorTransferFunction.add_layers(n_layers, colormap=...)
+    lo, hi = tf.x_bounds
+    dist = hi - lo
+    mi = lo + dist / (10.0 * n_layers)
+    ma = hi - dist / (10.0 * n_layers)
+    w = max(0.001 * (ma - mi) / n_layers, 1.0 / tf.nbins)
+    alphas = np.ones(n_layers) if tf.grey_opacity else np.logspace(-3, 0, n_layers)
+    for v, alpha in zip(np.mgrid[mi:ma:n_layers * 1j], alphas):
+        r, g, b, _ = _lookup(table, (v - lo) / dist)
+        tf.add_gaussian(v, w, [r, g, b, alpha])
+
+
+def _add_custom_layers(tf, definition, real_bounds):
+    table = rgba_table(definition["cmap"], TF_COLOR_ENTRIES)
+    lo, hi = real_bounds
+    for layer in definition["layers"]:
+        r, g, b = layer["color"] if layer["color"] is not None else _lookup(table, layer["position"])[:3]
+        tf.add_gaussian(lo + layer["position"] * (hi - lo), max(layer["width"] * (hi - lo), 1.0 / tf.nbins),
+                        [r, g, b, layer["alpha"]])
+
+
+def clear_cache():
+    with _lock:
+        _transfer_functions.clear()
+        _custom.clear()
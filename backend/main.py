@@ -16,22 +16,47 @@ matplotlib.rcParams['path.simplify_threshold'] = 1.0
 matplotlib.rcParams['agg.path.chunksize'] = 10000
 import matplotlib.pyplot as plt
 import numpy as np
-import yaml
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 from mpl_toolkits.axes_grid1.anchored_artists import AnchoredSizeBar
 import matplotlib.font_manager as fm
+import matplotlib.colors
+import matplotlib.figure
 import logging
 import sys
 import traceback
 import socket
-import subprocess
 import tempfile
 import zipfile
 from datetime import datetime
 import shutil
+import time
+import threading
 
 from fastapi.middleware.cors import CORSMiddleware
 
+from settings import get_settings
+import render_queue
+import export_manifest
+import video_encoder
+import particle_cache
+import particle_deposit
+import catalog
+import timeseries
+import profiles
+import compare
+import offaxis
+import volume_quality
+import parallel_volume
+import lut_registry
+import amrex_header
+import index_cache
+import render_cache
+import render_scheduler
+import render_memory
+import lite_snapshot
+import region_views
+import interpolation
+
 
 
 # Configure logging
@@ -47,19 +72,9 @@ logger = logging.getLogger(__name__)
 
 yt.set_log_level(40) # 40 = Error
 
-def load_config():
-    config_path = os.path.join(os.path.dirname(__file__), "config.yaml")
-    with open(config_path, "r") as f:
-        return yaml.safe_load(f)
-
-# Initial load to set defaults if needed, or just rely on load_config in endpoints
-# We can keep defaults as fallback
-DEFAULT_CONFIG = {
-    "short_size": 3.6,
-    "font_size": 20,
-    "scale_bar_height_fraction": 15,
-    "default_dpi": 300
-}
+# Grid indexes of plotfiles loaded before are read from sidecar files (also in render workers,
+# which import this module)
+index_cache.install_from_settings()
 
 app = FastAPI()
 
@@ -95,6 +110,8 @@ app.add_middleware(
 # Global variable to hold the loaded dataset
 ds = None
 current_dataset_path = None
+# Field lists by plotfile layout (raw fields, particle types), see get_fields
+_fields_by_layout = {}
 
 # Default data directory
 backend_dir = os.path.dirname(os.path.abspath(__file__))
@@ -285,19 +302,44 @@ def load_dataset(filename: str = "plt00500"):
         raise HTTPException(status_code=404, detail=f"Dataset not found: {path}")
     
     try:
+        # yt.load only parses the Header; the grid index is built on first use (usually the first render)
         ds = yt.load(path)
         global current_dataset_path
         current_dataset_path = path
-        return {"message": f"Dataset loaded: {path}", "domain_dimensions": ds.domain_dimensions.tolist()}
+        result = {"message": f"Dataset loaded: {path}", "domain_dimensions": ds.domain_dimensions.tolist()}
+        try:
+            result.update(amrex_header.summary(amrex_header.read_plotfile(path)))
+        except ValueError as e:
+            print(f"Warning: Could not read plotfile headers of {path}: {e}")
+        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/dataset_info")
+def get_dataset_info(filename: str):
+    """Fields, domain, time, levels and particles of a dataset from its header files, without loading it"""
+    path = _resolve_dataset_path(filename)
+    try:
+        return amrex_header.summary(amrex_header.read_plotfile(path))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/api/fields")
 def get_fields():
     global ds
     if ds is None:
         raise HTTPException(status_code=400, detail="No dataset loaded")
     
+    # Listing fields through yt builds the grid index. Plotfiles with the same raw fields and
+    # particle types (e.g. all snapshots of a run) have the same field list, so it is only
+    # computed once per layout and the index of later snapshots waits for the first render.
+    try:
+        layout = amrex_header.field_layout(amrex_header.read_plotfile(current_dataset_path))
+    except ValueError:
+        layout = None
+    if layout in _fields_by_layout:
+        return {"fields": _fields_by_layout[layout]}
+    
     # Add derived fields if not already present
     if ("gas", "temperature") not in ds.derived_field_list:
         _add_derived_fields(ds)
@@ -314,15 +356,189 @@ def get_fields():
     all_fields = list(set(fields + derived_fields))
     all_fields.sort()
     
+    if layout is not None:
+        _fields_by_layout[layout] = all_fields
     return {"fields": all_fields}
 
 
-# Load config for cache size
-try:
-    _config = load_config()
-    CACHE_MAX_SIZE = _config.get("cache_max_size", 32)
-except Exception:
-    CACHE_MAX_SIZE = 32
+# Cache size is fixed when the module is imported (changing it requires a restart)
+CACHE_MAX_SIZE = get_settings().cache_max_size
+PROFILE_CACHE_SIZE = get_settings().profile_cache_size
+FRB_CACHE_SIZE = get_settings().frb_cache_size
+COMPARE_DATASET_CACHE_SIZE = get_settings().compare_dataset_cache_size
+LITE_CACHE_SIZE = get_settings().lite_cache_size
+
+# Interactive renders go before prefetches and export frames (see render_scheduler.py)
+scheduler = render_scheduler.RenderScheduler(get_settings().render_slots, get_settings().render_max_queued)
+
+def _memory_budget_bytes(settings):
+    if settings.render_memory_budget_mb is None:
+        return render_memory.default_budget_bytes()
+    return int(settings.render_memory_budget_mb * render_memory.MB)
+
+# Renders wait while their estimated memory does not fit (see render_memory.py)
+memory_budget = render_memory.MemoryBudget(_memory_budget_bytes(get_settings()))
+
+def _field_tuple(field):
+    """yt field tuple for a field or weight name (with the custom yt fork, fields are ("gas", name))"""
+    if field == "cell_volume":
+        return ("index", "cell_volume")  # Standard yt field for cell volume
+    return ("gas", field)
+
+# ========================================
+# Particle Image Rendering
+# ========================================
+def _generate_particle_image(
+    ds, dataset_path, axis, weight_field, vmin, vmax, show_colorbar, log_scale,
+    colorbar_label, cmap, dpi, show_scale_bar, scale_bar_size, scale_bar_unit,
+    width_value, width_unit, particles, timestamp, top_left_text, top_right_text,
+    short_size, font_size, show_axes
+):
+    """
+    Render particles on their own (kind="part"): all particles along the line of sight
+    are deposited onto a 2D image (see particle_deposit.py), weighted by
+    particle_<weight_field> (mass by default) where the particle type has that field,
+    or by number otherwise. Positions and weights come from the particle cache.
+    """
+    settings = get_settings()
+    
+    # Requested particle types, or all particle types listed in config.yaml
+    ptypes = list(particles) if particles else [f"{p}_particles" for p in settings.particle_types]
+    ptypes = [p for p in ptypes if particle_cache.particle_count(ds, p)]
+    if not ptypes:
+        raise ValueError("No particles of the requested types in this dataset")
+    if axis not in ("x", "y", "z"):
+        raise ValueError("Particle images need axis x, y or z")
+    
+    axis_id = ds.coordinates.axis_id[axis]
+    xax = ds.coordinates.x_axis[axis_id]
+    yax = ds.coordinates.y_axis[axis_id]
+    center = ds.domain_center.to("code_length").d
+    if width_value is not None and width_unit is not None:
+        half_width = 0.5 * ds.quan(width_value, width_unit).to("code_length").d
+        extent = (center[xax] - half_width, center[xax] + half_width,
+                  center[yax] - half_width, center[yax] + half_width)
+    else:
+        left = ds.domain_left_edge.to("code_length").d
+        right = ds.domain_right_edge.to("code_length").d
+        extent = (left[xax], right[xax], left[yax], right[yax])
+    Wx = extent[1] - extent[0]
+    Wy = extent[3] - extent[2]
+    
+    # One image pixel per figure pixel along the short side
+    n_short = int(short_size * dpi)
+    if Wy > Wx:
+        shape = (n_short, int(round(n_short * Wy / Wx)))
+    else:
+        shape = (int(round(n_short * Wx / Wy)), n_short)
+    
+    indexes = [particle_cache.get_particle_index(ds, dataset_path, p, settings.particle_cache_max_mb,
+                                                 settings.field_precision)
+               for p in ptypes]
+    if weight_field in (None, "None"):
+        weight_field = "mass"
+    weight = None if weight_field == "count" else f"particle_{weight_field}"
+    if weight is not None:
+        weighted = [index for index in indexes if index.has_field(ds, weight)]
+        if not weighted:
+            print(f"Warning: No particle type has field {weight}, depositing particle counts")
+            weight = None
+        else:
+            for index in indexes:
+                if index not in weighted:
+                    print(f"Warning: {index.ptype} has no field {weight}, skipping")
+            indexes = weighted
+    
+    image = np.zeros(shape)
+    units = None
+    for index in indexes:
+        values = None
+        if weight is not None:
+            values, units = index.field(ds, weight)
+        particle_deposit.deposit(
+            index.positions[:, xax], index.positions[:, yax], values, extent, shape,
+            method=settings.particle_deposit_method,
+            chunk_size=settings.particle_deposit_chunk_size,
+            out=image,
+        )
+    
+    # Surface density: deposited sum per pixel area
+    pixel_area = ds.quan(Wx * Wy / (shape[0] * shape[1]), "code_length**2").in_cgs().d
+    image /= pixel_area
+    if weight is None:
+        default_label = r"Particle number surface density (cm$^{-2}$)"
+    else:
+        default_label = f"Projected particle {weight_field} ({units}/cm$^{{2}}$)"
+    
+    # Plot in the width unit (or a readable length unit), centered on the domain center
+    if width_unit:
+        length_unit = width_unit
+    else:
+        length_unit = str(ds.get_smallest_appropriate_unit(ds.quan(max(Wx, Wy), "code_length")))
+    to_unit = ds.quan(1.0, "code_length").to(length_unit).d
+    plot_extent = [(extent[0] - center[xax]) * to_unit, (extent[1] - center[xax]) * to_unit,
+                   (extent[2] - center[yax]) * to_unit, (extent[3] - center[yax]) * to_unit]
+    
+    if log_scale:
+        data = np.ma.masked_less_equal(image.T, 0)
+        norm = matplotlib.colors.LogNorm(vmin=vmin, vmax=vmax)
+    else:
+        data = image.T
+        norm = matplotlib.colors.Normalize(vmin=vmin, vmax=vmax)
+    colormap = lut_registry.colormap(cmap, get_settings().transfer_functions_dir()).copy()
+    colormap.set_bad("black")
+    
+    # Same figure sizing as slices: short side = short_size, close-to-square plots made bigger
+    fig_scale = 1.5 if 3.0 / 4.1 < Wy / Wx < 4.1 / 3 else 1.0
+    fig_width = short_size * fig_scale * shape[0] / n_short
+    fig_height = short_size * fig_scale * shape[1] / n_short
+    # matplotlib.figure.Figure instead of pyplot: requests are served from several threads
+    fig = matplotlib.figure.Figure(figsize=(fig_width, fig_height))
+    ax = fig.add_subplot()
+    im = ax.imshow(data, origin="lower", extent=plot_extent, cmap=colormap, norm=norm, interpolation="nearest")
+    
+    axis_names = ds.coordinates.axis_name
+    if show_axes:
+        ax.set_xlabel(f"{axis_names[xax]} ({length_unit})", fontsize=font_size)
+        ax.set_ylabel(f"{axis_names[yax]} ({length_unit})", fontsize=font_size)
+        ax.tick_params(labelsize=font_size * 0.8)
+    else:
+        ax.set_xticks([])
+        ax.set_yticks([])
+    
+    if show_colorbar:
+        cax = make_axes_locatable(ax).append_axes("right", size="5%", pad=0.05)
+        cbar = fig.colorbar(im, cax=cax)
+        cbar.set_label(colorbar_label or default_label, fontsize=font_size)
+        cbar.ax.tick_params(labelsize=font_size * 0.8)
+    
+    bar_length = None
+    if scale_bar_size is not None and scale_bar_unit is not None:
+        bar_length = ds.quan(scale_bar_size, scale_bar_unit).to(length_unit).d
+        bar_label = f"{scale_bar_size:g} {scale_bar_unit}"
+    elif show_scale_bar:
+        # Round 20% of the width down to a power of ten
+        bar_length = 10 ** np.floor(np.log10(0.2 * (plot_extent[1] - plot_extent[0])))
+        bar_label = f"{bar_length:g} {length_unit}"
+    if bar_length is not None:
+        ax.add_artist(AnchoredSizeBar(
+            ax.transData, bar_length, bar_label, "lower left", pad=0.55, sep=8, borderpad=1,
+            color="w", frameon=False, size_vertical=(plot_extent[3] - plot_extent[2]) / 150,
+            fontproperties=fm.FontProperties(size=font_size * 0.8),
+        ))
+    
+    text_args = {"color": "white", "fontsize": font_size * 0.8, "verticalalignment": "top", "transform": ax.transAxes}
+    if timestamp:
+        ax.text(0.02, 0.98, f"t = {ds.current_time.to('yr').d:.3g} yr", horizontalalignment="left", **text_args)
+    elif top_left_text:
+        ax.text(0.02, 0.98, top_left_text, horizontalalignment="left", **text_args)
+    if top_right_text:
+        ax.text(0.98, 0.98, top_right_text, horizontalalignment="right", **text_args)
+    
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight", pad_inches=0.05)
+    return buf.getvalue()
+
 
 # Core implementation without caching
 def _generate_plot_image_impl(
@@ -369,19 +585,26 @@ def _generate_plot_image_impl(
     show_box_frame: bool,
     use_perspective_camera: bool
 ):
-    # Ensure global ds matches dataset_path
-    global ds
-    if ds is None or current_dataset_path != dataset_path:
-        if os.path.exists(dataset_path):
-            ds = yt.load(dataset_path)
-            _add_derived_fields(ds)
+    # Previews come from the lite copy of the snapshot when it has the fields (see lite_snapshot.py);
+    # caches keyed on the snapshot path use the lite copy's path for them
+    lite = _lite_dataset(dataset_path, kind, field, weight_field, particles, grids) if preview else None
+    if lite is not None:
+        render_ds, source_path = lite
+    else:
+        if not os.path.exists(dataset_path):
+            raise Exception(f"Dataset not found: {dataset_path}")
+        if ds is not None and current_dataset_path == dataset_path:
+            render_ds = ds
         else:
-            raise Exception(f"Dataset not found or mismatch: {dataset_path}")
+            # Other snapshots (export frames, quick_plot --engine web) are loaded per path,
+            # leaving the loaded dataset to /api/slice
+            render_ds = _load_dataset_cached(dataset_path, export_manifest.source_mtime(dataset_path))
 
-    # Add derived fields if they are not already present (in case ds was loaded but fields not added)
-    # This check is cheap
-    if ("gas", "temperature") not in ds.derived_field_list:
-         _add_derived_fields(ds)
+        # Add derived fields if they are not already present (in case ds was loaded but fields not added)
+        # This check is cheap
+        if ("gas", "temperature") not in render_ds.derived_field_list:
+             _add_derived_fields(render_ds)
+        source_path = dataset_path
 
     # With the custom yt fork, all fields are defined as ("gas", field_name)
     field_tuple = ("gas", field)
@@ -389,24 +612,56 @@ def _generate_plot_image_impl(
     # Handle weight field for projections
     weight = None
     if kind == "prj" and weight_field and weight_field != "None":
-        if weight_field == "density":
-            weight = ("gas", "density")
-        elif weight_field == "cell_volume":
-            weight = ("index", "cell_volume")  # Standard yt field for cell volume
-        elif weight_field == "cell_mass":
-            weight = ("gas", "cell_mass")
-        else:
-            weight = ("gas", weight_field)
+        weight = _field_tuple(weight_field)
 
+    # Off-axis slices and projections look along the camera direction (see offaxis.py)
+    off_axis = axis == "off" and kind in ("slc", "prj")
+    zoomed = width_value is not None and width_unit is not None
+    if off_axis:
+        normal, north = offaxis.view_vectors(camera_theta, camera_phi)
+        buff_size = (256, 256) if preview else (800, 800)
+    
     # Create plot object
-    if kind == "slc":
-        slc = yt.SlicePlot(ds, axis, field_tuple, center=ds.domain_center)
+    if kind == "slc" and off_axis:
+        # Cached cutting plane: its grid list and field values are reused
+        cut = offaxis.get_cutting_plane(render_ds, source_path, normal, north,
+                                        get_settings().off_axis_plane_cache_size)
+        slc = cut.to_pw(fields=[field_tuple])
+        slc.set_buff_size(buff_size)
+    elif kind in ("slc", "prj") and zoomed:
+        # Only the grids around the window are read; zooming further in reuses them (see region_views.py)
+        view = region_views.get_view(render_ds, source_path, kind, axis, field_tuple, weight,
+                                     (width_value, width_unit), get_settings().region_margin,
+                                     get_settings().region_view_cache_size)
+        slc = view.to_pw(fields=[field_tuple], center=render_ds.domain_center, width=(width_value, width_unit))
+    elif kind == "slc":
+        slc = yt.SlicePlot(render_ds, axis, field_tuple, center=render_ds.domain_center)
+    elif kind == "prj" and off_axis:
+        width = (width_value, width_unit) if width_value is not None and width_unit is not None else None
+        slc = yt.OffAxisProjectionPlot(render_ds, normal, field_tuple, weight_field=weight, center=render_ds.domain_center,
+                                       width=width, north_vector=north, buff_size=buff_size)
+        if log_scale and vmin is None:
+            # Pixels outside the domain are 0 in off-axis projections: start the log
+            # scale at the smallest positive value instead
+            image = slc.frb[field_tuple]
+            positive = image[image > 0]
+            if positive.size:
+                vmin = positive.min()
+                slc.set_zlim(field_tuple, vmin, 'max' if vmax is None else vmax)
     elif kind == "prj":
-        slc = yt.ProjectionPlot(ds, axis, field_tuple, weight_field=weight, center=ds.domain_center)
+        slc = yt.ProjectionPlot(render_ds, axis, field_tuple, weight_field=weight, center=render_ds.domain_center)
     elif kind == "vol":
         # Volume rendering
         # We handle this separately because it returns a scene, not a plot container like SlicePlot
         pass
+    elif kind == "part":
+        # Particle-only image, rendered directly with matplotlib
+        return _generate_particle_image(
+            render_ds, dataset_path, axis, weight_field, vmin, vmax, show_colorbar, log_scale,
+            colorbar_label, cmap, dpi, show_scale_bar, scale_bar_size, scale_bar_unit,
+            width_value, width_unit, particles, timestamp, top_left_text, top_right_text,
+            short_size, font_size, show_axes
+        )
     else:
         raise ValueError(f"Unknown plot kind: {kind}")
     
@@ -415,27 +670,51 @@ def _generate_plot_image_impl(
     # ========================================
     if kind == "vol":
         print(f"Creating volume rendering for {field}...")
-        sc = yt.create_scene(ds, field=field_tuple)
+        render_start = time.time()
+        # Quality ladder: interactive (preview) renders fit the latency budget, the final
+        # pass renders at full quality (see volume_quality.py)
+        final_res_px = int(short_size * dpi * 2.0)
+        # Previews also stay within the memory budget (see render_memory.py)
+        level_cap = _volume_level_cap(dataset_path, {
+            "kind": kind, "field": field, "weight_field": weight_field, "axis": axis, "dpi": dpi,
+            "short_size": short_size, "particles": particles, "preview": True,
+        }) if preview else None
+        quality = volume_quality.choose(render_ds, source_path, preview, final_res_px, n_layers,
+                                        get_settings().volume_latency_budget, level_cap)
+        data_source = render_ds.all_data()
+        if zoomed and not use_perspective_camera:
+            # Plane-parallel rays only cross the cube of the camera width (see region_views.py)
+            data_source = region_views.view_cube(render_ds, render_ds.domain_center, (width_value, width_unit),
+                                                 get_settings().region_margin)
+        if quality["max_level"] is not None:
+            # Coarser AMR levels only: the kd-tree stops at this level
+            data_source.max_level = quality["max_level"]
+        # Rays are cast through runs of kd-tree bricks in a thread pool
+        sc = parallel_volume.create_scene(data_source, field_tuple,
+                                          workers=get_settings().volume_render_workers)
         source = sc[0]
+        source.num_samples = quality["num_samples"]
         
         # Set up transfer function
-        data_bounds = ds.all_data().quantities.extrema(field_tuple)
-        
-        # Use provided vmin/vmax or fall back to data extrema
+        # Use provided vmin/vmax or fall back to data extrema (cached in the metadata catalog)
+        if vmin is None or vmax is None:
+            if zoomed and not use_perspective_camera:
+                # Extrema of the viewed region, like zoomed slices
+                data_bounds = profiles.field_extrema(render_ds, [field_tuple], data_source=data_source)[field]
+            else:
+                data_bounds = profiles.field_extrema(render_ds, [field_tuple], catalog.get_catalog(),
+                                                     source_path)[field]
         t_min = float(vmin) if vmin is not None else float(data_bounds[0])
         t_max = float(vmax) if vmax is not None else float(data_bounds[1])
         bounds = [t_min, t_max]
         
-        if log_scale:
-            real_bounds = [np.log10(t_min), np.log10(t_max)]
-        else:
-            real_bounds = bounds
-            
-        tf = yt.ColorTransferFunction(real_bounds, grey_opacity=grey_opacity)
+        # Transfer functions (and the colormap tables they sample) are shared between renders
         # More control 
         # tf.add_layers(n_layers, w=0.02, colormap=cmap, alpha=np.logspace(np.log10(alpha_min), np.log10(alpha_max), n_layers))
-        # Simple default
-        tf.add_layers(n_layers, colormap=cmap)
+        settings = get_settings()
+        tf = lut_registry.transfer_function(cmap, bounds, log_scale, quality["n_layers"], grey_opacity,
+                                            settings.transfer_functions_dir(),
+                                            settings.transfer_function_cache_size)
         
         source.tfh.tf = tf
         source.tfh.bounds = bounds
@@ -445,43 +724,18 @@ def _generate_plot_image_impl(
         # use_perspective_camera is passed as a parameter
         
         if use_perspective_camera:
-            cam = sc.add_camera(ds, lens_type="perspective")
+            cam = sc.add_camera(render_ds, lens_type="perspective")
         else:
             cam = sc.camera
             
-        # Resolution: use a fixed reasonable size or base on short_size * dpi?
-        # visualize_3d uses (1024, 1024) as standard.
-        # Let's use dpi * short_size roughly
-        if preview:
-            res_px = 512
-        else:
-            vol_res_scale_up = 2.0
-            res_px = int(short_size * dpi * vol_res_scale_up)
+        # Resolution: 2 * dpi * short_size for the final pass, lower for interactive renders
+        res_px = quality["resolution"]
         cam.resolution = (res_px, res_px)
         
-        # Camera direction
-        # Convert spherical (theta, phi) to cartesian (x, y, z)
+        # Camera direction from spherical angles
         # Theta: Polar angle (0-180)
         # Phi: Azimuthal angle (0-360)
-        theta_rad = np.radians(camera_theta)
-        phi_rad = np.radians(camera_phi)
-        
-        cx = np.sin(theta_rad) * np.cos(phi_rad)
-        cy = np.sin(theta_rad) * np.sin(phi_rad)
-        cz = np.cos(theta_rad)
-        
-        view_dir = np.array([cx, cy, cz], dtype=float)
-        norm = np.linalg.norm(view_dir)
-        if norm == 0:
-            view_dir = np.array([1.0, 0.0, 0.0])
-        else:
-            view_dir = view_dir / norm
-            
-        # North vector
-        if abs(view_dir[2]) > 0.9:
-            north = np.array([0, 1, 0])
-        else:
-            north = np.array([0, 0, 1])
+        view_dir, north = offaxis.view_vectors(camera_theta, camera_phi)
             
         # Width
         # Default width is 1.0 * domain_width if not specified
@@ -492,7 +746,7 @@ def _generate_plot_image_impl(
         else:
              # Smart width logic:
              # 1. Find the longest side
-             domain_width = ds.domain_width
+             domain_width = render_ds.domain_width
              max_dim_idx = np.argmax(domain_width)
              max_width = domain_width[max_dim_idx]
              
@@ -510,7 +764,7 @@ def _generate_plot_image_impl(
         # Position and orientation
         # For perspective camera, we need to set position explicitly
         # Standing at a position, looking at the domain center
-        cam.set_focus(ds.domain_center)
+        cam.set_focus(render_ds.domain_center)
         cam.switch_orientation(normal_vector=view_dir, north_vector=north)
         
         # Adjust position: move camera back from focus point
@@ -525,7 +779,7 @@ def _generate_plot_image_impl(
             distance = 1.5 * current_width
             # Use ds.arr() to create a proper unit array for the offset
             offset = view_dir * distance
-            cam.position = ds.domain_center - offset
+            cam.position = render_ds.domain_center - offset
         
         # Add box frame if requested
         if show_box_frame:
@@ -533,8 +787,8 @@ def _generate_plot_image_impl(
             # sc.annotate_domain() uses BoxSource internally but let's be explicit
             from yt.visualization.volume_rendering.api import BoxSource
             box_source = BoxSource(
-                ds.domain_left_edge,
-                ds.domain_right_edge,
+                render_ds.domain_left_edge,
+                render_ds.domain_right_edge,
                 color=[0.2, 0.2, 0.2, 0.1] # Fully opaque white lines
             )
             sc.add_source(box_source)
@@ -553,7 +807,8 @@ def _generate_plot_image_impl(
         finally:
             if os.path.exists(tmp_path):
                 os.unlink(tmp_path)
-                
+        
+        volume_quality.record(render_ds, source_path, quality, time.time() - render_start)
         return image_bytes
 
     # ========================================
@@ -566,14 +821,15 @@ def _generate_plot_image_impl(
         except Exception as e:
             print(f"Warning: Could not set unit '{field_unit}' for field {field_tuple}: {e}")
     
-    slc.set_cmap(field_tuple, cmap)
+    slc.set_cmap(field_tuple, lut_registry.colormap(cmap, get_settings().transfer_functions_dir()))
     slc.set_log(field_tuple, log_scale)
     slc.set_background_color(field_tuple, 'black')
     
     # Set width if provided
     is_squared = False
     if width_value is not None and width_unit is not None:
-        slc.set_width((width_value, width_unit))
+        if not (kind == "prj" and off_axis):  # already projected at this width
+            slc.set_width((width_value, width_unit))
         is_squared = True
     
     # Set colorbar label only if user provides a custom one
@@ -595,35 +851,55 @@ def _generate_plot_image_impl(
     if particles:
         # Check if particles exist in the dataset
         # Following quick_plot logic: check particle_info and verify particles exist
-        if 'particles' in ds.parameters.keys():
-            ad = ds.all_data()
-            Lx = ds.domain_right_edge[0] - ds.domain_left_edge[0]
+        if 'particles' in render_ds.parameters.keys():
+            # Particles within a slab of depth 0.1 * boxsize around the slice plane,
+            # selected from the cached positions (see particle_cache.py)
+            center = render_ds.domain_center.to("code_length").d
+            Lx = (render_ds.domain_right_edge[0] - render_ds.domain_left_edge[0]).to("code_length").d
+            half_width = None
+            if width_value is not None and width_unit is not None:
+                half_width = 0.5 * render_ds.quan(width_value, width_unit).to("code_length").d
+            max_mb = get_settings().particle_cache_max_mb
+            precision = get_settings().field_precision
             for p_type in particles:
                 # Check if particle type exists in particle_info
-                if p_type not in ds['particle_info'].keys():
+                num_particles = particle_cache.particle_count(render_ds, p_type)
+                if num_particles is None:
                     print(f"Warning: Particle type {p_type} not found in particle_info")
                     continue
                 
-                num_particles = ds['particle_info'][p_type]['num_particles']
                 if num_particles == 0:
                     print(f"Warning: No {p_type} particles in dataset")
                     continue
                 
-                # Verify particle position field exists
                 try:
-                    pos = ad[(p_type, "particle_position_x")]
-                    if len(pos) > 0:
-                        # Annotate particles at a depth of 0.1 * boxsize
-                        slc.annotate_particles(Lx * 0.1, p_size=particle_size, col=particle_color, marker='o', ptype=p_type)
-                    else:
-                        print(f"Warning: No {p_type} particles found in all_data()")
+                    index = particle_cache.get_particle_index(render_ds, dataset_path, p_type, max_mb, precision)
                 except yt.utilities.exceptions.YTFieldNotFound:
                     print(f"Warning: Particle position field not found for {p_type}")
                     continue
+                
+                if off_axis:
+                    pos = index.positions[offaxis.plane_slab(index.positions, center, normal, 0.05 * Lx)]
+                else:
+                    axis_id = render_ds.coordinates.axis_id[axis]
+                    xax = render_ds.coordinates.x_axis[axis_id]
+                    yax = render_ds.coordinates.y_axis[axis_id]
+                    pos = index.slab(axis_id, center[axis_id] - 0.05 * Lx, center[axis_id] + 0.05 * Lx)
+                if half_width is not None and not off_axis:
+                    in_view = ((np.abs(pos[:, xax] - center[xax]) <= half_width)
+                               & (np.abs(pos[:, yax] - center[yax]) <= half_width))
+                    pos = pos[in_view]
+                if len(pos) > 0:
+                    slc.annotate_marker(pos.T, marker='o', coord_system='data',
+                                        s=particle_size, color=particle_color, edgecolors='None')
+                else:
+                    print(f"Warning: No {p_type} particles near the slice plane")
         else:
             print("Warning: No particles in ds.parameters")
     
-    if grids:
+    if grids and off_axis:
+        print("Warning: Grid annotations are not available for off-axis plots")
+    elif grids:
         slc.annotate_grids(edgecolors='white', linewidth=1)
     
     if timestamp:
@@ -633,13 +909,17 @@ def _generate_plot_image_impl(
     # Configure figure properties
     # ========================================
     # Calculate figure size based on aspect ratio and SHORT_SIZE
-    axis_id = ds.coordinates.axis_id[axis]
-    x_ax_id = ds.coordinates.x_axis[axis_id]
-    y_ax_id = ds.coordinates.y_axis[axis_id]
-    
-    Wx = ds.domain_width[x_ax_id].v
-    Wy = ds.domain_width[y_ax_id].v
-    aspect = float(Wy / Wx)
+    if off_axis:
+        # Off-axis plots are square
+        aspect = 1.0
+    else:
+        axis_id = render_ds.coordinates.axis_id[axis]
+        x_ax_id = render_ds.coordinates.x_axis[axis_id]
+        y_ax_id = render_ds.coordinates.y_axis[axis_id]
+        
+        Wx = render_ds.domain_width[x_ax_id].v
+        Wy = render_ds.domain_width[y_ax_id].v
+        aspect = float(Wy / Wx)
     real_aspect = aspect if not is_squared else 1.0
     
     scale_bar_x_loc = 0.5 if real_aspect > 1.3 else 0.15
@@ -770,8 +1050,17 @@ def _generate_plot_image_cached(
     show_box_frame: bool,
     use_perspective_camera: bool
 ):
-    """Cached wrapper for _generate_plot_image_impl"""
-    return _generate_plot_image_impl(
+    """Cached wrapper for _generate_plot_image_impl (in memory, then the shared render cache)"""
+    params = dict(locals())
+    settings = get_settings()
+    disk_key = None
+    # Preview renders depend on the measured render speed, so they are not shared
+    if settings.render_cache_max_mb > 0 and not preview:
+        disk_key = render_cache.render_key(_render_cache_params(params, settings), dataset_path)
+        image_bytes = render_cache.get(settings.render_cache_path(), disk_key)
+        if image_bytes is not None:
+            return image_bytes
+    image_bytes = _generate_plot_image_impl(
         dataset_path, kind, axis, field, weight_field, coord,
         vmin, vmax, show_colorbar, log_scale, colorbar_label,
         colorbar_orientation, cmap, dpi, show_scale_bar,
@@ -783,6 +1072,112 @@ def _generate_plot_image_cached(
         alpha_max, grey_opacity, preview, show_box_frame,
         use_perspective_camera
     )
+    # Only store the image under the snapshot it was rendered from (not rewritten meanwhile)
+    if disk_key is not None and disk_key == render_cache.render_key(_render_cache_params(params, settings),
+                                                                    dataset_path):
+        render_cache.put(settings.render_cache_path(), disk_key, image_bytes, settings.render_cache_max_mb)
+    return image_bytes
+
+def _render_cache_params(params, settings):
+    """Parameters identifying an image in the shared render cache"""
+    params = dict(params)
+    params.pop("dataset_path", None)
+    # Slices and projections are always centered on the domain center
+    params.pop("coord", None)
+    if lut_registry.is_custom(params["cmap"]):
+        # A redefined transfer function gives a different image
+        params["cmap_definition"] = lut_registry.load_custom(settings.transfer_functions_dir(),
+                                                             params["cmap"][len(lut_registry.CUSTOM_PREFIX):])
+    if not params["particles"] and params["kind"] != "part":
+        # Marker styling only matters when particles are drawn
+        del params["particle_size"], params["particle_color"]
+    if params["kind"] == "part":
+        params["particle_deposit_method"] = settings.particle_deposit_method
+    return params
+
+def _image_cache_headers(dataset_path, params, use_cache):
+    """
+    HTTP caching headers for an image: a strong ETag from the render cache key (render
+    parameters plus snapshot path and mtime), so revalidation needs no rendering.
+    Uncached and preview renders are not stored by the browser.
+    """
+    if not use_cache or params["preview"]:
+        return {"Cache-Control": "no-store"}
+    settings = get_settings()
+    params = dict(params)
+    if params["axis"] == "off" and params["kind"] in ("slc", "prj"):
+        params["camera_theta"], params["camera_phi"] = offaxis.snap_angles(
+            params["camera_theta"], params["camera_phi"], settings.off_axis_angle_step)
+    key = render_cache.render_key(_render_cache_params(params, settings), dataset_path)
+    # /api/slice URLs do not name the dataset: the browser keeps the image but revalidates it
+    return {"ETag": f'"{key}"', "Cache-Control": "private, no-cache"}
+
+def _etag_matches(request, etag):
+    """True if the request's If-None-Match header matches etag"""
+    header = request.headers.get("if-none-match")
+    if not header or etag is None:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+def _client_id(request):
+    """Client a render is scheduled for (fairness between users of one backend)"""
+    return request.headers.get("x-client-id") or (request.client.host if request.client else "local")
+
+def _volume_workers():
+    return get_settings().volume_render_workers or os.cpu_count() or 1
+
+def _cache_value_bytes():
+    return np.dtype(get_settings().field_precision).itemsize
+
+def _memory_estimate(dataset_path, params, max_level=None):
+    """Estimated peak memory of a render in bytes (0 if the snapshot's headers cannot be read)"""
+    try:
+        info = amrex_header.read_plotfile(dataset_path)
+    except ValueError:
+        return 0
+    return render_memory.estimate_bytes(info, params, max_level, _volume_workers(), _cache_value_bytes())
+
+def _fit_memory_budget(dataset_path, params):
+    """
+    Params of an interactive render, downgraded if its estimated memory exceeds the
+    budget: volume renderings become previews (coarser levels, smaller image). Returns
+    (params, downgrade or None); other renders keep their params and run alone.
+    """
+    if (params["kind"] != "vol" or params["preview"] or not get_settings().render_memory_downgrade
+            or memory_budget.fits(_memory_estimate(dataset_path, params))):
+        return params, None
+    print(f"Volume rendering of {params['field']} exceeds the memory budget, rendering a preview")
+    return {**params, "preview": True}, "preview"
+
+def _volume_level_cap(dataset_path, params):
+    """Deepest AMR level a volume preview may traverse within the memory budget (None: all)"""
+    try:
+        info = amrex_header.read_plotfile(dataset_path)
+    except ValueError:
+        return None
+    return memory_budget.max_level(info, params, _volume_workers(), _cache_value_bytes())
+
+def _memory_reservation(dataset_path, params):
+    """Context holding the estimated memory of a render (waits until it fits the budget)"""
+    # Volume previews traverse only the levels that fit (see _generate_plot_image_impl)
+    max_level = _volume_level_cap(dataset_path, params) if params["kind"] == "vol" and params["preview"] else None
+    label = f"{params['kind']} {params['field']} {os.path.basename(dataset_path)} dpi={params['dpi']}"
+    return memory_budget.reserve(_memory_estimate(dataset_path, params, max_level), label)
+
+def _render_scheduled(request, dataset_path, params, coord, use_cache, headers, priority):
+    """
+    Render an image in a slot of the render scheduler, once its estimated memory fits
+    the budget. Images already in the render cache are returned without waiting.
+    """
+    settings = get_settings()
+    etag = headers.get("ETag")
+    if etag is not None and settings.render_cache_max_mb > 0:
+        image_bytes = render_cache.get(settings.render_cache_path(), etag.strip('"'))
+        if image_bytes is not None:
+            return image_bytes
+    with scheduler.slot(priority, _client_id(request)), _memory_reservation(dataset_path, params):
+        return _generate_plot_image(dataset_path, coord=coord, use_cache=use_cache, **params)
 
 # Routing function that chooses cached or non-cached version
 def _generate_plot_image(
@@ -833,6 +1228,10 @@ def _generate_plot_image(
     Router function that calls either cached or non-cached version
     based on use_cache parameter.
     """
+    if axis == "off" and kind in ("slc", "prj"):
+        # Nearby angles share one plane (and one cache entry) while the view is rotated
+        camera_theta, camera_phi = offaxis.snap_angles(camera_theta, camera_phi,
+                                                       get_settings().off_axis_angle_step)
     if use_cache:
         return _generate_plot_image_cached(
             dataset_path, kind, axis, field, weight_field, coord,
@@ -956,6 +1355,7 @@ def _add_derived_fields(ds):
 
 @app.get("/api/slice")
 def get_slice(
+    request: Request,
     axis: str = "z", 
     field: str = "density", 
     kind: str = "slc",
@@ -991,21 +1391,22 @@ def get_slice(
         grey_opacity: bool = False,
         preview: bool = False,
         show_box_frame: bool = False,
-        use_cache: bool = True
+        use_cache: bool = True,
+        prefetch: bool = False
 ):
     global ds, current_dataset_path
     if ds is None:
         raise HTTPException(status_code=400, detail="No dataset loaded")
     
-    # Load configuration
-    config = load_config()
-    SHORT_SIZE = config.get("short_size", 3.6)
-    FONT_SIZE = config.get("font_size", 20)
-    SCALE_BAR_HEIGHT_FRACTION = config.get("scale_bar_height_fraction", 15)
-    COLORMAP_FRACTION = config.get("colormap_fraction", 0.1)
-    SHOW_AXES = config.get("show_axes", False)
-    DEFAULT_PARTICLE_SIZE = config.get("default_particle_size", 10)
-    USE_PERSPECTIVE_CAMERA = config.get("use_perspective_camera", True)
+    # Load configuration (cached, re-read only when config.yaml changes)
+    settings = get_settings()
+    SHORT_SIZE = settings.short_size
+    FONT_SIZE = settings.font_size
+    SCALE_BAR_HEIGHT_FRACTION = settings.scale_bar_height_fraction
+    COLORMAP_FRACTION = settings.colormap_fraction
+    SHOW_AXES = settings.show_axes
+    DEFAULT_PARTICLE_SIZE = settings.default_particle_size
+    USE_PERSPECTIVE_CAMERA = settings.use_perspective_camera
 
     # Parse particles
     particle_list = tuple(p.strip() for p in particles.split(',')) if particles else ()
@@ -1014,57 +1415,43 @@ def get_slice(
     p_size = particle_size if particle_size is not None else DEFAULT_PARTICLE_SIZE
 
     try:
-        if coord is None:
+        if coord is None and axis != "off":
             coord = ds.domain_center[ds.coordinates.axis_id[axis]]
             coord = float(coord)
         
-        image_bytes = _generate_plot_image(
-            current_dataset_path,
-            kind,
-            axis,
-            field,
-            weight_field,
-            coord,
-            vmin,
-            vmax,
-            show_colorbar,
-            log_scale,
-            colorbar_label,
-            colorbar_orientation,
-            cmap,
-            dpi,
-            show_scale_bar,
-            scale_bar_size,
-            scale_bar_unit,
-            width_value,
-            width_unit,
-            particle_list,
-            p_size,
-            particle_color,
-            grids,
-            timestamp,
-            top_left_text,
-            top_right_text,
-            SHORT_SIZE,
-            FONT_SIZE,
-            SCALE_BAR_HEIGHT_FRACTION,
-            COLORMAP_FRACTION,
-            SHOW_AXES,
-            field_unit,
-            camera_theta,
-            camera_phi,
-            n_layers,
-            alpha_min,
-            alpha_max,
-            grey_opacity,
-            preview,
-            show_box_frame,
-            USE_PERSPECTIVE_CAMERA,
-            use_cache
-        )
+        params = {
+            "kind": kind, "axis": axis, "field": field, "weight_field": weight_field,
+            "vmin": vmin, "vmax": vmax, "show_colorbar": show_colorbar, "log_scale": log_scale,
+            "colorbar_label": colorbar_label, "colorbar_orientation": colorbar_orientation,
+            "cmap": cmap, "dpi": dpi, "show_scale_bar": show_scale_bar,
+            "scale_bar_size": scale_bar_size, "scale_bar_unit": scale_bar_unit,
+            "width_value": width_value, "width_unit": width_unit,
+            "particles": particle_list, "particle_size": p_size, "particle_color": particle_color,
+            "grids": grids, "timestamp": timestamp,
+            "top_left_text": top_left_text, "top_right_text": top_right_text,
+            "short_size": SHORT_SIZE, "font_size": FONT_SIZE,
+            "scale_bar_height_fraction": SCALE_BAR_HEIGHT_FRACTION,
+            "colormap_fraction": COLORMAP_FRACTION, "show_axes": SHOW_AXES, "field_unit": field_unit,
+            "camera_theta": camera_theta, "camera_phi": camera_phi, "n_layers": n_layers,
+            "alpha_min": alpha_min, "alpha_max": alpha_max, "grey_opacity": grey_opacity,
+            "preview": preview, "show_box_frame": show_box_frame,
+            "use_perspective_camera": USE_PERSPECTIVE_CAMERA,
+        }
+        params, downgrade = _fit_memory_budget(current_dataset_path, params)
+        # Answer revalidations (If-None-Match) before any render work
+        headers = _image_cache_headers(current_dataset_path, params, use_cache)
+        if downgrade:
+            headers["X-Render-Downgraded"] = downgrade
+        if _etag_matches(request, headers.get("ETag")):
+            return Response(status_code=304, headers=headers)
+
+        priority = render_scheduler.PREFETCH if prefetch else render_scheduler.INTERACTIVE
+        image_bytes = _render_scheduled(request, current_dataset_path, params, coord, use_cache, headers, priority)
         
-        return Response(content=image_bytes, media_type="image/png")
+        return Response(content=image_bytes, media_type="image/png", headers=headers)
 
+    except render_scheduler.QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"Error generating plot: {e}")
         traceback.print_exc()
@@ -1100,26 +1487,522 @@ def get_particle_types():
     Each type is returned with '_particles' appended (e.g., 'Rad' -> 'Rad_particles')
     Also returns the default particle size.
     """
+    # get_settings() falls back to the default particle types if config.yaml can't be loaded
+    settings = get_settings()
+    # Append '_particles' to each type
+    particle_types_with_suffix = [f"{ptype}_particles" for ptype in settings.particle_types]
+    return {
+        "particle_types": particle_types_with_suffix,
+        "default_particle_size": settings.default_particle_size
+    }
+
+@app.get("/api/scheduler")
+def get_scheduler_stats():
+    """Running and queued renders and recent wait times per priority class and client"""
+    return scheduler.stats()
+
+@app.get("/api/memory")
+def get_memory_stats():
+    """Memory budget, running and waiting renders, and recent estimates next to measured peak RSS"""
+    return memory_budget.stats()
+
+@app.get("/api/config")
+def get_config():
+    """Return the active (validated) configuration"""
+    return get_settings().model_dump()
+
+# ========================================
+# Custom Transfer Functions
+# ========================================
+# Named transfer functions stored as JSON (see lut_registry.py), selected with
+# cmap="tf:<name>" in any plot request.
+@app.get("/api/transfer_functions")
+def list_transfer_functions():
+    return {"transfer_functions": lut_registry.list_custom(get_settings().transfer_functions_dir())}
+
+@app.get("/api/transfer_functions/{name}")
+def get_transfer_function(name: str):
     try:
-        config = load_config()
-        particle_types = config.get("particle_types", [])
-        default_particle_size = config.get("default_particle_size", 10)
-        # Append '_particles' to each type
-        particle_types_with_suffix = [f"{ptype}_particles" for ptype in particle_types]
-        return {
-            "particle_types": particle_types_with_suffix,
-            "default_particle_size": default_particle_size
-        }
+        return lut_registry.load_custom(get_settings().transfer_functions_dir(), name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.put("/api/transfer_functions/{name}")
+def save_transfer_function(name: str, definition: dict):
+    """Create or replace a custom transfer function (see lut_registry.py for the format)"""
+    try:
+        saved = lut_registry.save_custom(get_settings().transfer_functions_dir(), name, definition)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    # Images rendered with the previous definition are stale
+    _generate_plot_image_cached.cache_clear()
+    return saved
+
+@app.delete("/api/transfer_functions/{name}")
+def delete_transfer_function(name: str):
+    try:
+        lut_registry.delete_custom(get_settings().transfer_functions_dir(), name)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _generate_plot_image_cached.cache_clear()
+    return {"deleted": name}
+
+# ========================================
+# Radial Profiles and Phase Plots
+# ========================================
+# Binned arrays are cached separately from the rendered images, so changing the
+# colormap or the plotted range only re-draws the figure. source_mtime is part of
+# the key, so a rewritten snapshot is binned again.
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def _binned_profile_cached(dataset_path, source_mtime, field, weight_field, center, n_bins, log_bins):
+    weight = _field_tuple(weight_field) if weight_field and weight_field != "None" else None
+    return profiles.radial_profile(ds, _field_tuple(field), weight, center, n_bins, log_bins)
+
+@lru_cache(maxsize=PROFILE_CACHE_SIZE)
+def _binned_phase_cached(dataset_path, source_mtime, x_field, y_field, z_field, weight_field,
+                         x_range, y_range, n_bins, x_log, y_log):
+    weight = _field_tuple(weight_field) if weight_field and weight_field != "None" else None
+    fields = [_field_tuple(f) for f in (x_field, y_field)]
+    if x_range is None or y_range is None:
+        extrema = profiles.field_extrema(ds, fields, catalog.get_catalog(), dataset_path)
+        x_range = x_range or extrema[x_field]
+        y_range = y_range or extrema[y_field]
+    # Fields that are not positive everywhere (e.g. velocities) can't use log bins
+    if x_log and x_range[0] <= 0:
+        print(f"Warning: {x_field} has values <= 0, using linear bins")
+        x_log = False
+    if y_log and y_range[0] <= 0:
+        print(f"Warning: {y_field} has values <= 0, using linear bins")
+        y_log = False
+    return profiles.phase(ds, fields[0], fields[1], _field_tuple(z_field), weight,
+                          x_range, y_range, n_bins, x_log, y_log)
+
+def _require_dataset():
+    if ds is None:
+        raise HTTPException(status_code=400, detail="No dataset loaded")
+    if ("gas", "temperature") not in ds.derived_field_list:
+        _add_derived_fields(ds)
+
+@app.get("/api/profile")
+def get_profile(
+    field: str = "density",
+    weight_field: Optional[str] = "cell_mass",
+    n_bins: int = Query(64, ge=1, le=4096),
+    log_bins: bool = True,
+    center: Optional[str] = None,
+    radius_unit: Optional[str] = None,
+    log_scale: bool = True,
+    vmin: Optional[float] = None,
+    vmax: Optional[float] = None,
+    dpi: int = 150,
+    format: str = "png",
+):
+    """
+    Radial profile of field around center (comma separated, code units; default: domain center)
+    for the loaded dataset, averaged with weight_field ("None" sums the field in each bin).
+    format: png or json.
+    """
+    _require_dataset()
+    center_tuple = (tuple(float(c) for c in center.split(',')) if center
+                    else tuple(ds.domain_center.to("code_length").d.tolist()))
+    try:
+        binned = _binned_profile_cached(
+            current_dataset_path, export_manifest.source_mtime(current_dataset_path),
+            field, weight_field, center_tuple, n_bins, log_bins)
+        if radius_unit is None:
+            radius_unit = str(ds.get_smallest_appropriate_unit(ds.domain_width.max()))
+        radius_scale = float(ds.quan(1.0, "code_length").to(radius_unit).d)
+        if format == "json":
+            return profiles.to_json(binned, radius_scale, radius_unit)
+        image_bytes = profiles.plot_profile(binned, radius_scale, radius_unit, log_scale=log_scale,
+                                            vmin=vmin, vmax=vmax, font_size=get_settings().font_size * 0.6,
+                                            dpi=dpi)
+        return Response(content=image_bytes, media_type="image/png")
+    except HTTPException:
+        raise
     except Exception as e:
-        print(f"Error loading particle types: {e}")
-        # Return default list if config can't be loaded (with '_particles' suffix)
-        return {
-            "particle_types": ["Rad_particles", "CIC_particles", "CICRad_particles", "StochasticStellarPop_particles", "Sink_particles"],
-            "default_particle_size": 10
-        }
+        print(f"Error generating profile: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/phase")
+def get_phase(
+    x_field: str = "density",
+    y_field: str = "temperature",
+    z_field: str = "cell_mass",
+    weight_field: Optional[str] = None,
+    n_bins: int = Query(128, ge=1, le=2048),
+    x_log: bool = True,
+    y_log: bool = True,
+    x_min: Optional[float] = None,
+    x_max: Optional[float] = None,
+    y_min: Optional[float] = None,
+    y_max: Optional[float] = None,
+    cmap: str = "viridis",
+    log_scale: bool = True,
+    vmin: Optional[float] = None,
+    vmax: Optional[float] = None,
+    show_colorbar: bool = True,
+    dpi: int = 150,
+    format: str = "png",
+):
+    """
+    Phase plot of the loaded dataset: z_field binned over (x_field, y_field), summed in each
+    bin or averaged with weight_field. Bin ranges default to the field extrema.
+    format: png or json.
+    """
+    _require_dataset()
+    try:
+        x_range = y_range = None
+        # Explicit ranges are in the fields' default units
+        if x_min is not None and x_max is not None:
+            x_range = (x_min, x_max, str(ds.field_info[_field_tuple(x_field)].units))
+        if y_min is not None and y_max is not None:
+            y_range = (y_min, y_max, str(ds.field_info[_field_tuple(y_field)].units))
+        binned = _binned_phase_cached(
+            current_dataset_path, export_manifest.source_mtime(current_dataset_path),
+            x_field, y_field, z_field, weight_field, x_range, y_range, n_bins, x_log, y_log)
+        if format == "json":
+            return profiles.to_json(binned)
+        colormap = lut_registry.colormap(cmap, get_settings().transfer_functions_dir())
+        image_bytes = profiles.plot_phase(binned, cmap=colormap, log_scale=log_scale, vmin=vmin, vmax=vmax,
+                                          show_colorbar=show_colorbar,
+                                          font_size=get_settings().font_size * 0.6, dpi=dpi)
+        return Response(content=image_bytes, media_type="image/png")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error generating phase plot: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ========================================
+# Lite Snapshots
+# ========================================
+# Coarsened float32 copies of plotfiles (see lite_snapshot.py). Previews and thumbnails
+# are rendered from them; final renders and exports always read the full plotfile.
+_lite_job = {"running": False, "done": 0, "total": 0, "errors": {}}
+_lite_job_lock = threading.Lock()
+
+@lru_cache(maxsize=LITE_CACHE_SIZE)
+def _load_lite_cached(path, source_mtime):
+    lite_ds = lite_snapshot.load(path)
+    _add_derived_fields(lite_ds)
+    return lite_ds
+
+def _lite_dataset(dataset_path, kind, field, weight_field, particles, grids):
+    """
+    (yt dataset, path) of the up-to-date lite copy of a snapshot if it can render the
+    view (slices, projections and volume renderings of the fields it holds, without
+    particles or grid overlays), else None
+    """
+    settings = get_settings()
+    if not settings.lite_previews or kind not in ("slc", "prj", "vol") or particles or grids:
+        return None
+    meta = lite_snapshot.current(settings.lite_snapshot_dir(), dataset_path)
+    if meta is None:
+        return None
+    needed = {field}
+    if kind == "prj" and weight_field not in (None, "None", "cell_volume"):
+        needed.add(weight_field)
+    if not needed <= set(meta["fields"]):
+        return None
+    path = lite_snapshot.lite_path(settings.lite_snapshot_dir(), dataset_path)
+    return _load_lite_cached(path, meta["source_mtime"]), path
+
+def _run_lite_job(paths, settings):
+    def on_result(plotfile_dir, error):
+        with _lite_job_lock:
+            _lite_job["done"] += 1
+            if error is not None:
+                _lite_job["errors"][os.path.basename(plotfile_dir)] = error
+    try:
+        lite_snapshot.create_lite_snapshots(
+            paths, settings.lite_snapshot_dir(), settings.lite_fields,
+            max_cells=settings.lite_max_cells, max_level=settings.lite_max_level,
+            n_processes=settings.lite_processes, setup_fields=_add_derived_fields, on_result=on_result,
+        )
+    except Exception as e:
+        traceback.print_exc()
+        with _lite_job_lock:
+            _lite_job["errors"]["job"] = str(e)
+    finally:
+        with _lite_job_lock:
+            _lite_job["running"] = False
+
+@app.post("/api/lite")
+def create_lite_copies(datasets: Optional[str] = None, prefix: str = "plt"):
+    """
+    Write lite copies of snapshots in the background (those without an up-to-date one).
+    - datasets: comma separated dataset names; default: all datasets in DATA_DIR starting with prefix
+    """
+    if datasets:
+        names = [d.strip() for d in datasets.split(',') if d.strip()]
+    else:
+        names = get_datasets(prefix)["datasets"]
+    paths = [os.path.join(DATA_DIR, name) for name in names]
+    missing = [name for name, path in zip(names, paths) if not os.path.isdir(path)]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Datasets not found: {missing}")
+    with _lite_job_lock:
+        if _lite_job["running"]:
+            raise HTTPException(status_code=409, detail="Lite copies are already being written")
+        _lite_job.update({"running": True, "done": 0, "total": len(paths), "errors": {}})
+    threading.Thread(target=_run_lite_job, args=(paths, get_settings()), daemon=True).start()
+    return get_lite_status(prefix)
+
+@app.get("/api/lite")
+def get_lite_status(prefix: str = "plt"):
+    """Progress of the lite copy job and the datasets in DATA_DIR that have an up-to-date lite copy"""
+    lite_dir = get_settings().lite_snapshot_dir()
+    names = get_datasets(prefix)["datasets"]
+    available = [name for name in names if lite_snapshot.current(lite_dir, os.path.join(DATA_DIR, name))]
+    with _lite_job_lock:
+        job = {**_lite_job, "errors": dict(_lite_job["errors"])}
+    return {"job": job, "lite_dir": lite_dir, "datasets": len(names), "available": available}
+
+@app.get("/api/thumbnail")
+def get_thumbnail(dataset: str, field: str = "density", axis: str = "z", kind: str = "slc",
+                  cmap: str = "viridis", log_scale: bool = True, dpi: int = 40):
+    """
+    Small image of any dataset in DATA_DIR, rendered from its lite copy only (404 if it
+    has none with the field), so browsing thumbnails never reads full plotfiles
+    """
+    dataset_path = os.path.join(DATA_DIR, dataset)
+    if kind not in ("slc", "prj"):
+        raise HTTPException(status_code=400, detail="Thumbnails are slices (slc) or projections (prj)")
+    if _lite_dataset(dataset_path, kind, field, None, (), False) is None:
+        raise HTTPException(status_code=404, detail=f"No lite copy of {dataset} with field {field}")
+    params = {"kind": kind, "axis": axis, "field": field, "cmap": cmap, "log_scale": log_scale, "dpi": dpi,
+              "show_colorbar": False, "preview": True}
+    try:
+        with scheduler.slot(render_scheduler.PREFETCH, "thumbnails"):
+            image_bytes = render_frame(dataset_path, params)
+    except render_scheduler.QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        print(f"Error generating thumbnail: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+    return Response(content=image_bytes, media_type="image/png")
+
+# ========================================
+# Snapshot Comparison
+# ========================================
+# Two datasets (e.g. a run and its restart) resampled onto the same fixed-resolution
+# buffer. The buffers are cached, so toggling between side-by-side, difference and
+# ratio images (or changing the colormap) doesn't touch the data again.
+@lru_cache(maxsize=COMPARE_DATASET_CACHE_SIZE)
+def _load_dataset_cached(dataset_path, source_mtime):
+    if dataset_path == current_dataset_path and ds is not None:
+        compare_ds = ds
+    else:
+        compare_ds = yt.load(dataset_path)
+    if ("gas", "temperature") not in compare_ds.derived_field_list:
+        _add_derived_fields(compare_ds)
+    return compare_ds
+
+@lru_cache(maxsize=FRB_CACHE_SIZE)
+def _frb_cached(dataset_path, source_mtime, kind, axis, field, weight_field, coord, bounds, shape,
+                precision="float64"):
+    frb_ds = _load_dataset_cached(dataset_path, source_mtime)
+    weight = _field_tuple(weight_field) if kind == "prj" and weight_field and weight_field != "None" else None
+    return compare.fixed_resolution(frb_ds, kind, axis, _field_tuple(field), weight, coord, bounds, shape,
+                                    dtype=precision)
+
+def _frb_region(frb_ds, axis, width_value, width_unit, coord, resolution):
+    """
+    Region of FRBs of frb_ds along axis: bounds (x0, x1, y0, y1) and plane coordinate in
+    cm (so runs with different code units line up), pixel shape with resolution pixels
+    along the long side, and the plot extent and axis labels in a readable length unit,
+    centered on the domain center
+    """
+    axis_id = frb_ds.coordinates.axis_id[axis]
+    xax = frb_ds.coordinates.x_axis[axis_id]
+    yax = frb_ds.coordinates.y_axis[axis_id]
+    center = frb_ds.domain_center.to("cm").d
+    left = frb_ds.domain_left_edge.to("cm").d
+    right = frb_ds.domain_right_edge.to("cm").d
+    if width_value is not None and width_unit is not None:
+        half_width = 0.5 * float(frb_ds.quan(width_value, width_unit).to("cm").d)
+        bounds = (center[xax] - half_width, center[xax] + half_width,
+                  center[yax] - half_width, center[yax] + half_width)
+    else:
+        bounds = (left[xax], right[xax], left[yax], right[yax])
+    bounds = tuple(float(b) for b in bounds)
+    if coord is None:
+        coord_cm = float(center[axis_id])
+    else:
+        coord_cm = float(frb_ds.quan(coord, "code_length").to("cm").d)
+    shape = compare.frb_shape(bounds, resolution)
+    length_unit = width_unit or str(frb_ds.get_smallest_appropriate_unit(
+        frb_ds.quan(max(bounds[1] - bounds[0], bounds[3] - bounds[2]), "cm")))
+    to_unit = float(frb_ds.quan(1.0, "cm").to(length_unit).d)
+    extent = [(bounds[0] - center[xax]) * to_unit, (bounds[1] - center[xax]) * to_unit,
+              (bounds[2] - center[yax]) * to_unit, (bounds[3] - center[yax]) * to_unit]
+    axis_names = frb_ds.coordinates.axis_name
+    axis_labels = (f"{axis_names[xax]} ({length_unit})", f"{axis_names[yax]} ({length_unit})")
+    return bounds, coord_cm, shape, extent, axis_labels
+
+def _resolve_dataset_path(dataset):
+    """Dataset name in the data directory, or a path to a dataset anywhere (e.g. another run)"""
+    path = dataset if os.path.isabs(dataset) else os.path.join(DATA_DIR, dataset)
+    if not os.path.isdir(path):
+        raise HTTPException(status_code=404, detail=f"Dataset not found: {path}")
+    return os.path.normpath(path)
+
+@app.get("/api/compare")
+def get_compare(
+    dataset_b: str,
+    dataset_a: Optional[str] = None,
+    mode: str = "side",
+    axis: str = "z",
+    field: str = "density",
+    kind: str = "slc",
+    weight_field: Optional[str] = None,
+    coord: Optional[float] = None,
+    width_value: Optional[float] = None,
+    width_unit: Optional[str] = None,
+    resolution: Optional[int] = Query(None, ge=16, le=8192),
+    cmap: str = "viridis",
+    diff_cmap: str = "RdBu_r",
+    log_scale: bool = True,
+    vmin: Optional[float] = None,
+    vmax: Optional[float] = None,
+    show_colorbar: bool = True,
+    dpi: int = 300,
+    format: str = "png",
+):
+    """
+    Compare field between two datasets on the same fixed-resolution buffer.
+    dataset_a defaults to the loaded dataset; both may be names in the data directory
+    or absolute paths (e.g. to a run in another directory).
+    mode: "side" (A | B with a shared colorbar), "diff" (A - B) or "ratio" (A / B).
+    format: png, or json for difference statistics.
+    """
+    if dataset_a is None:
+        if current_dataset_path is None:
+            raise HTTPException(status_code=400, detail="No dataset loaded")
+        path_a = current_dataset_path
+    else:
+        path_a = _resolve_dataset_path(dataset_a)
+    path_b = _resolve_dataset_path(dataset_b)
+    if mode not in compare.COMPARE_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown compare mode: {mode}")
+    if axis not in ("x", "y", "z"):
+        raise HTTPException(status_code=400, detail="Comparisons need axis x, y or z")
+    settings = get_settings()
+    
+    try:
+        # The region and pixel grid come from dataset A, in cm so that runs with
+        # different code units are sampled at the same physical positions
+        ds_a = _load_dataset_cached(path_a, export_manifest.source_mtime(path_a))
+        bounds, coord_cm, shape, extent, axis_labels = _frb_region(
+            ds_a, axis, width_value, width_unit, coord, resolution or settings.compare_resolution)
+        
+        images = []
+        units = None
+        for path in (path_a, path_b):
+            image, image_units = _frb_cached(path, export_manifest.source_mtime(path), kind, axis, field,
+                                             weight_field, coord_cm, bounds, shape, settings.field_precision)
+            if units is None:
+                units = image_units
+            elif image_units != units:
+                image = unyt.unyt_array(image, image_units).to(units).d
+            images.append(image)
+        
+        labels = [os.path.basename(path_a), os.path.basename(path_b)]
+        if labels[0] == labels[1]:
+            labels = [os.path.basename(os.path.dirname(p)) + "/" + l for p, l in zip((path_a, path_b), labels)]
+        if format == "json":
+            return {"datasets": labels, "field": field, "units": units, "shape": list(shape),
+                    **compare.difference_stats(images[0], images[1])}
+        
+        image_bytes = compare.plot_compare(
+            images[0], images[1], mode, extent, labels, f"{field} ({units})",
+            cmap=lut_registry.colormap(cmap, settings.transfer_functions_dir()),
+            diff_cmap=lut_registry.colormap(diff_cmap, settings.transfer_functions_dir()),
+            log_scale=log_scale, vmin=vmin, vmax=vmax,
+            show_colorbar=show_colorbar, show_axes=settings.show_axes,
+            axis_labels=axis_labels,
+            short_size=settings.short_size, font_size=settings.font_size * 0.6, dpi=dpi,
+        )
+        return Response(content=image_bytes, media_type="image/png")
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error generating comparison: {e}")
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/timeseries")
+def get_timeseries(
+    quantities: str = "max_density,total_mass",
+    datasets: Optional[str] = None,
+    prefix: str = "plt",
+    format: str = "json",
+    time_unit: str = "Myr",
+    refresh: bool = False,
+):
+    """
+    Scalar reductions (e.g. max_density, total_mass, mass_weighted_temperature or
+    '<op>:<field>', see timeseries.py) over a range of snapshots.
+    - quantities: comma separated
+    - datasets: comma separated dataset names; default: all datasets in DATA_DIR starting with prefix
+    - format: json, csv or png
+    Values are cached in the metadata catalog, so only new or rewritten snapshots are read.
+    """
+    quantity_list = [q.strip() for q in quantities.split(',') if q.strip()]
+    if not quantity_list:
+        raise HTTPException(status_code=400, detail="No quantities given")
+    try:
+        for q in quantity_list:
+            timeseries.parse_quantity(q)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if format not in ("json", "csv", "png"):
+        raise HTTPException(status_code=400, detail=f"Unknown format: {format}. Use json, csv or png")
+    
+    if datasets:
+        names = [d.strip() for d in datasets.split(',') if d.strip()]
+    else:
+        names = get_datasets(prefix)["datasets"]
+    paths = [os.path.join(DATA_DIR, name) for name in names]
+    missing = [name for name, path in zip(names, paths) if not os.path.isdir(path)]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Datasets not found: {missing}")
+    
+    settings = get_settings()
+    series, info = timeseries.compute_timeseries(
+        paths, quantity_list, catalog.get_catalog(),
+        n_processes=settings.timeseries_processes,
+        setup_fields=_add_derived_fields,
+        refresh=refresh,
+    )
+    print(f"Time series: {info['computed']} snapshots computed, {info['cached']} from the catalog")
+    
+    if format == "csv":
+        return Response(content=timeseries.to_csv(series, quantity_list, time_unit), media_type="text/csv")
+    if format == "png":
+        return Response(content=timeseries.plot_timeseries(series, quantity_list, time_unit), media_type="image/png")
+    records, units = timeseries.to_records(series, quantity_list, time_unit)
+    return {
+        "quantities": quantity_list,
+        "units": units,
+        "time_unit": time_unit,
+        "rows": records,
+        **info,
+    }
 
 @app.get("/api/export/current_frame")
 def export_current_frame(
+    request: Request,
     axis: str = "z", 
     field: str = "density", 
     kind: str = "slc",
@@ -1161,15 +2044,15 @@ def export_current_frame(
     if ds is None:
         raise HTTPException(status_code=400, detail="No dataset loaded")
     
-    # Load configuration
-    config = load_config()
-    SHORT_SIZE = config.get("short_size", 3.6)
-    FONT_SIZE = config.get("font_size", 20)
-    SCALE_BAR_HEIGHT_FRACTION = config.get("scale_bar_height_fraction", 15)
-    COLORMAP_FRACTION = config.get("colormap_fraction", 0.1)
-    SHOW_AXES = config.get("show_axes", False)
-    DEFAULT_PARTICLE_SIZE = config.get("default_particle_size", 10)
-    USE_PERSPECTIVE_CAMERA = config.get("use_perspective_camera", True)
+    # Load configuration (cached, re-read only when config.yaml changes)
+    settings = get_settings()
+    SHORT_SIZE = settings.short_size
+    FONT_SIZE = settings.font_size
+    SCALE_BAR_HEIGHT_FRACTION = settings.scale_bar_height_fraction
+    COLORMAP_FRACTION = settings.colormap_fraction
+    SHOW_AXES = settings.show_axes
+    DEFAULT_PARTICLE_SIZE = settings.default_particle_size
+    USE_PERSPECTIVE_CAMERA = settings.use_perspective_camera
 
     # Parse particles
     particle_list = tuple(p.strip() for p in particles.split(',')) if particles else ()
@@ -1178,54 +2061,36 @@ def export_current_frame(
     p_size = particle_size if particle_size is not None else DEFAULT_PARTICLE_SIZE
 
     try:
-        if coord is None:
+        if coord is None and axis != "off":
             coord = ds.domain_center[ds.coordinates.axis_id[axis]]
             coord = float(coord)
         
-        image_bytes = _generate_plot_image(
-            current_dataset_path,
-            kind,
-            axis,
-            field,
-            weight_field,
-            coord,
-            vmin,
-            vmax,
-            show_colorbar,
-            log_scale,
-            colorbar_label,
-            colorbar_orientation,
-            cmap,
-            dpi,
-            show_scale_bar,
-            scale_bar_size,
-            scale_bar_unit,
-            width_value,
-            width_unit,
-            particle_list,
-            p_size,
-            particle_color,
-            grids,
-            timestamp,
-            top_left_text,
-            top_right_text,
-            SHORT_SIZE,
-            FONT_SIZE,
-            SCALE_BAR_HEIGHT_FRACTION,
-            COLORMAP_FRACTION,
-            SHOW_AXES,
-            field_unit,
-            camera_theta,
-            camera_phi,
-            n_layers,
-            alpha_min,
-            alpha_max,
-            grey_opacity,
-            False,  # preview mode always False for export
-            show_box_frame,
-            USE_PERSPECTIVE_CAMERA,
-            use_cache
-        )
+        params = {
+            "kind": kind, "axis": axis, "field": field, "weight_field": weight_field,
+            "vmin": vmin, "vmax": vmax, "show_colorbar": show_colorbar, "log_scale": log_scale,
+            "colorbar_label": colorbar_label, "colorbar_orientation": colorbar_orientation,
+            "cmap": cmap, "dpi": dpi, "show_scale_bar": show_scale_bar,
+            "scale_bar_size": scale_bar_size, "scale_bar_unit": scale_bar_unit,
+            "width_value": width_value, "width_unit": width_unit,
+            "particles": particle_list, "particle_size": p_size, "particle_color": particle_color,
+            "grids": grids, "timestamp": timestamp,
+            "top_left_text": top_left_text, "top_right_text": top_right_text,
+            "short_size": SHORT_SIZE, "font_size": FONT_SIZE,
+            "scale_bar_height_fraction": SCALE_BAR_HEIGHT_FRACTION,
+            "colormap_fraction": COLORMAP_FRACTION, "show_axes": SHOW_AXES, "field_unit": field_unit,
+            "camera_theta": camera_theta, "camera_phi": camera_phi, "n_layers": n_layers,
+            "alpha_min": alpha_min, "alpha_max": alpha_max, "grey_opacity": grey_opacity,
+            "preview": False,  # preview mode always False for export
+            "show_box_frame": show_box_frame,
+            "use_perspective_camera": USE_PERSPECTIVE_CAMERA,
+        }
+        # Answer revalidations (If-None-Match) before any render work
+        headers = _image_cache_headers(current_dataset_path, params, use_cache)
+        if _etag_matches(request, headers.get("ETag")):
+            return Response(status_code=304, headers=headers)
+
+        image_bytes = _render_scheduled(request, current_dataset_path, params, coord, use_cache, headers,
+                                        render_scheduler.INTERACTIVE)
         
         # Get current dataset name
         dataset_name = os.path.basename(current_dataset_path)
@@ -1235,15 +2100,259 @@ def export_current_frame(
             content=image_bytes, 
             media_type="image/png",
             headers={
+                **headers,
                 "Content-Disposition": f"attachment; filename={filename}"
             }
         )
 
+    except render_scheduler.QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         print(f"Error generating plot: {e}")
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+def export_frame_filename(dataset_name, field, axis):
+    return f"{dataset_name}_{field}_{axis}.png"
+
+def default_render_params(settings=None):
+    """Render parameters of /api/slice when none are given, with the styling from config.yaml"""
+    settings = settings or get_settings()
+    return {
+        "kind": "slc", "axis": "z", "field": "density", "weight_field": None,
+        "vmin": None, "vmax": None, "show_colorbar": False, "log_scale": True,
+        "colorbar_label": None, "colorbar_orientation": "right", "cmap": "viridis", "dpi": 300,
+        "show_scale_bar": False, "scale_bar_size": None, "scale_bar_unit": None,
+        "width_value": None, "width_unit": None,
+        "particles": [], "particle_size": settings.default_particle_size, "particle_color": "red",
+        "grids": False, "timestamp": False, "top_left_text": None, "top_right_text": None,
+        "short_size": settings.short_size, "font_size": settings.font_size,
+        "scale_bar_height_fraction": settings.scale_bar_height_fraction,
+        "colormap_fraction": settings.colormap_fraction, "show_axes": settings.show_axes,
+        "field_unit": None, "camera_theta": 0.0, "camera_phi": 0.0, "n_layers": 5,
+        "alpha_min": 0.1, "alpha_max": 1.0, "grey_opacity": False, "preview": False,
+        "show_box_frame": False, "use_perspective_camera": settings.use_perspective_camera,
+    }
+
+def render_frame(dataset_path, params, use_cache=True):
+    """
+    PNG of dataset_path rendered with params (keys as in default_render_params; missing
+    ones take the defaults). This is the renderer behind /api/slice, animation exports
+    and `quick_plot --engine web`, so with use_cache their frames are shared through the
+    render cache.
+    """
+    params = {**default_render_params(), **params}
+    params["particles"] = tuple(params["particles"])
+    return _generate_plot_image(
+        dataset_path,
+        coord=None,  # slices are always centered on the domain center
+        use_cache=use_cache,
+        **params
+    )
+
+def render_export_frame(params, task, frames_dir):
+    """
+    Render one animation frame for the export task queue (see render_queue.py).
+    Writes the PNG into frames_dir, records it in the directory's manifest and
+    returns its file name.
+    """
+    manifest = export_manifest.FrameManifest(frames_dir, params)
+    # One batch slot per frame: interactive renders get the next free slot between frames
+    with scheduler.slot(render_scheduler.BATCH, task.get("client", "export")), \
+            _memory_reservation(task["dataset_path"], {**default_render_params(), **params}):
+        image_bytes = render_frame(task["dataset_path"], params)
+    frame_filename = export_frame_filename(task["dataset"], params["field"], params["axis"])
+    tmp_path = os.path.join(frames_dir, f".{frame_filename}.{os.getpid()}.tmp")
+    with open(tmp_path, 'wb') as f:
+        f.write(image_bytes)
+    os.replace(tmp_path, os.path.join(frames_dir, frame_filename))
+    manifest.record(frame_filename, task["dataset_path"])
+    return frame_filename
+
+def export_frb_filename(dataset_name, field, axis):
+    return f"{dataset_name}_{field}_{axis}.frb.npz"
+
+def interpolated_frame_filename(idx, field, axis, timing):
+    return f"interpolated_{timing}_{idx:05d}_{field}_{axis}.png"
+
+def render_export_frb(params, task, frames_dir):
+    """
+    FRB of one snapshot for an interpolated animation export (see interpolation.py),
+    with the region, plane and pixels in params. Saved as <frame>.frb.npz (image and
+    units) in frames_dir and recorded in the directory's manifest; returns its file name.
+    """
+    manifest = export_manifest.FrameManifest(frames_dir, params)
+    path = task["dataset_path"]
+    with scheduler.slot(render_scheduler.BATCH, task.get("client", "export")), \
+            _memory_reservation(path, {**default_render_params(), "kind": params["kind"], "axis": params["axis"],
+                                       "field": params["field"], "weight_field": params["weight_field"]}):
+        image, units = _frb_cached(path, export_manifest.source_mtime(path), params["kind"], params["axis"],
+                                   params["field"], params["weight_field"], params["coord"],
+                                   tuple(params["bounds"]), tuple(params["shape"]), get_settings().field_precision)
+    frb_filename = export_frb_filename(task["dataset"], params["field"], params["axis"])
+    tmp_path = os.path.join(frames_dir, f".{frb_filename}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, image=image, units=units)
+    os.replace(tmp_path, os.path.join(frames_dir, frb_filename))
+    manifest.record(frb_filename, path)
+    return frb_filename
+
+def render_interpolated_frame(params, task, frames_dir):
+    """
+    One frame of an interpolated animation export: the saved FRBs of the snapshots
+    around the frame time (see render_export_frb), blended with the task's weight and
+    plotted with the export's styling. Reads no snapshot data; returns the file name.
+    """
+    render = params["render"]
+    settings = get_settings()
+    images = []
+    units = None
+    for key in ("frb_a", "frb_b"):
+        if task[key] is None:
+            images.append(None)
+            continue
+        with np.load(os.path.join(frames_dir, task[key])) as data:
+            image, image_units = data["image"], str(data["units"])
+        target_units = render["field_unit"] or units or image_units
+        if image_units != target_units:
+            image = unyt.unyt_array(image, image_units).to(target_units).d
+        units = target_units
+        images.append(image)
+    image = interpolation.blend(images[0], images[1], task["weight"], params["interpolation"])
+    timestamp = f"t = {task['time']:.4g} {params['time_unit']}" if render["timestamp"] else None
+    image_bytes = interpolation.plot_frame(
+        image, params["extent"], render["colorbar_label"] or f"{render['field']} ({units})",
+        cmap=lut_registry.colormap(render["cmap"], settings.transfer_functions_dir()),
+        log_scale=render["log_scale"], vmin=render["vmin"], vmax=render["vmax"],
+        show_colorbar=render["show_colorbar"], show_axes=render["show_axes"],
+        axis_labels=params["axis_labels"], timestamp=timestamp,
+        top_left_text=render["top_left_text"], top_right_text=render["top_right_text"],
+        short_size=render["short_size"], font_size=render["font_size"] * 0.6, dpi=render["dpi"],
+    )
+    frame_filename = interpolated_frame_filename(task["idx"], render["field"], render["axis"], params["timing"])
+    tmp_path = os.path.join(frames_dir, f".{frame_filename}.{os.getpid()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(image_bytes)
+    os.replace(tmp_path, os.path.join(frames_dir, frame_filename))
+    return frame_filename
+
+def _interpolated_export_frames(datasets, render_params, mode, time_interval, time_unit, resolution,
+                                export_dir, queue_dir, client):
+    """
+    Frames of an animation export at every time_interval (in time_unit) from the first
+    to the last of datasets [(idx, name, path)], blended from the FRBs of the snapshots
+    around each frame time (see interpolation.py). Each snapshot's FRB is rendered once
+    and kept in export_dir, so repeated exports and changed intervals read no data.
+    Returns ({frame idx: (dataset name, frame file)}, [(idx, dataset name, error)]).
+    """
+    kind, axis, field = render_params["kind"], render_params["axis"], render_params["field"]
+    if kind not in ("slc", "prj") or axis not in ("x", "y", "z"):
+        raise HTTPException(status_code=400, detail="Interpolated frames need kind slc or prj and axis x, y or z")
+    failed = []
+    snapshots = []
+    for idx, name, path in datasets:
+        try:
+            snapshots.append((amrex_header.read_plotfile(path)["time"], name, path))
+        except ValueError as e:
+            failed.append((idx, name, f"Cannot read the snapshot time: {e}"))
+    if not snapshots:
+        return {}, failed
+    snapshots.sort()
+    first_ds = _load_dataset_cached(snapshots[0][2], export_manifest.source_mtime(snapshots[0][2]))
+    try:
+        to_unit = float(first_ds.quan(1.0, "code_time").to(time_unit).d)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time unit {time_unit}: {e}")
+    bounds, coord_cm, shape, extent, axis_labels = _frb_region(
+        first_ds, axis, render_params["width_value"], render_params["width_unit"], None,
+        resolution or get_settings().interpolation_resolution)
+    
+    # One FRB per snapshot, reused while the snapshot is unchanged
+    frb_params = {"kind": kind, "axis": axis, "field": field, "weight_field": render_params["weight_field"],
+                  "coord": coord_cm, "bounds": list(bounds), "shape": list(shape)}
+    frb_manifest = export_manifest.FrameManifest(export_dir, frb_params)
+    frb_tasks = [{"idx": k, "dataset": name, "dataset_path": path, "client": client}
+                 for k, (_, name, path) in enumerate(snapshots)
+                 if not frb_manifest.is_current(export_frb_filename(name, field, axis), path)]
+    print(f"Interpolated export: reusing {len(snapshots) - len(frb_tasks)} FRBs, rendering {len(frb_tasks)}...")
+    if frb_tasks:
+        frb_bytes = _memory_estimate(frb_tasks[0]["dataset_path"], {**default_render_params(), **render_params})
+        results = _run_export_job(queue_dir, "main:render_export_frb", render_export_frb,
+                                  frb_params, frb_tasks, export_dir, frb_bytes)
+        bad = {k for k, result in results.items() if result["status"] != "ok"}
+        for k in sorted(bad):
+            print(f"Error rendering the FRB of {snapshots[k][1]}: {results[k]['error']}")
+            failed.append((k, snapshots[k][1], results[k]["error"]))
+        snapshots = [snapshot for k, snapshot in enumerate(snapshots) if k not in bad]
+    if not snapshots:
+        return {}, failed
+    
+    # Frames blended from the FRBs around their times
+    frb_files = [export_frb_filename(name, field, axis) for _, name, _ in snapshots]
+    frame_tasks = [{"idx": n, "dataset": snapshots[i][1], "time": t, "weight": w, "frb_a": frb_files[i],
+                    "frb_b": frb_files[i + 1] if w > 0 else None}
+                   for n, (t, i, w) in enumerate(interpolation.frame_times(
+                       [snapshot[0] * to_unit for snapshot in snapshots], time_interval))]
+    if not frame_tasks:
+        return {}, failed
+    print(f"Interpolated export: blending {len(frame_tasks)} frames from {len(snapshots)} snapshots ({mode})")
+    frame_params = {"render": render_params, "interpolation": mode, "time_unit": time_unit,
+                    "extent": extent, "axis_labels": list(axis_labels),
+                    # Frames of exports with other intervals share the directory
+                    "timing": export_manifest.params_hash([mode, time_interval, time_unit])[:8]}
+    results = _run_export_job(queue_dir, "main:render_interpolated_frame", render_interpolated_frame,
+                              frame_params, frame_tasks, export_dir)
+    frame_files = {}
+    for n in sorted(results):
+        result = results[n]
+        if result["status"] == "ok":
+            frame_files[n] = (result["dataset"], result["frame"])
+        else:
+            failed.append((n, result["dataset"], result["error"]))
+    return frame_files, failed
+
+def _run_export_job(queue_dir, renderer, render_fn, params, tasks, output_dir, frame_bytes=0, on_progress=None):
+    """
+    Render tasks through the render queue (see render_queue.py) into output_dir and
+    return {idx: result}. Workers on other nodes polling the same queue directory pick
+    up tasks too; if none are running, local worker processes are started (or the tasks
+    are rendered in this process). The queue job is removed afterwards; its output stays
+    in output_dir.
+    """
+    settings = get_settings()
+    os.makedirs(queue_dir, exist_ok=True)
+    job_id = render_queue.submit_job(queue_dir, renderer, params, tasks, output_dir=output_dir)
+    try:
+        remote_workers = render_queue.live_workers(queue_dir, 3 * render_queue.HEARTBEAT_INTERVAL)
+        n_local = min(settings.export_local_workers, len(tasks), os.cpu_count() or 1)
+        # Each worker process renders one task at a time: start no more than fit the memory budget
+        available = memory_budget.available()
+        if available is not None and frame_bytes > 0:
+            n_local = min(n_local, max(1, int(available // frame_bytes)))
+        local_workers = []
+        if remote_workers:
+            print(f"Export job {job_id}: {len(remote_workers)} queue workers available")
+        elif n_local >= 1:
+            print(f"Export job {job_id}: no queue workers found, starting {n_local} local workers")
+            local_workers = render_queue.start_local_workers(queue_dir, job_id, n_local,
+                                                             niceness=settings.export_worker_niceness)
+        else:
+            print(f"Export job {job_id}: rendering in the backend process")
+        
+        results = render_queue.wait_for_job(
+            queue_dir, job_id, len(tasks),
+            poll_interval=settings.render_queue_poll_interval,
+            task_timeout=settings.render_task_timeout,
+            local_workers=local_workers,
+            render_fn=render_fn,
+            on_progress=on_progress,
+        )
+        for p in local_workers:
+            p.join(timeout=5)
+        return results
+    finally:
+        render_queue.remove_job(queue_dir, job_id)
+
 @app.post("/api/export/animation")
 def export_animation(request: Request):
     """
@@ -1315,29 +2424,33 @@ def export_animation(request: Request):
         grey_opacity = body.get("grey_opacity", False)
         show_box_frame = body.get("show_box_frame", False)
         
+        # Interpolated frames at regular times between snapshots (see interpolation.py)
+        interpolation_mode = body.get("interpolation")
+        time_interval = body.get("time_interval")
+        time_unit = body.get("time_unit") or "code_time"
+        resolution = body.get("resolution")
+        if interpolation_mode is not None:
+            if interpolation_mode not in interpolation.INTERPOLATION_MODES:
+                raise HTTPException(status_code=400, detail=f"Unknown interpolation: {interpolation_mode}. "
+                                                            f"Use one of {interpolation.INTERPOLATION_MODES}")
+            if not isinstance(time_interval, (int, float)) or time_interval <= 0:
+                raise HTTPException(status_code=400, detail="Interpolated frames need a positive time_interval")
+            if resolution is not None and (not isinstance(resolution, int) or not 16 <= resolution <= 8192):
+                raise HTTPException(status_code=400, detail="resolution must be an integer from 16 to 8192")
+        
         # Validate DATA_DIR
         if not DATA_DIR or not os.path.exists(DATA_DIR):
             raise HTTPException(status_code=400, detail=f"Data directory does not exist: {DATA_DIR}")
         
-        # Load configuration
-        try:
-            config = load_config()
-            SHORT_SIZE = config.get("short_size", 3.6)
-            FONT_SIZE = config.get("font_size", 20)
-            SCALE_BAR_HEIGHT_FRACTION = config.get("scale_bar_height_fraction", 15)
-            COLORMAP_FRACTION = config.get("colormap_fraction", 0.1)
-            SHOW_AXES = config.get("show_axes", False)
-            DEFAULT_PARTICLE_SIZE = config.get("default_particle_size", 10)
-            USE_PERSPECTIVE_CAMERA = config.get("use_perspective_camera", True)
-        except Exception as e:
-            print(f"Warning: Could not load config, using defaults: {e}")
-            SHORT_SIZE = 3.6
-            FONT_SIZE = 20
-            SCALE_BAR_HEIGHT_FRACTION = 15
-            COLORMAP_FRACTION = 0.1
-            SHOW_AXES = False
-            DEFAULT_PARTICLE_SIZE = 10
-            USE_PERSPECTIVE_CAMERA = True
+        # Load configuration (falls back to defaults if config.yaml is invalid)
+        settings = get_settings()
+        SHORT_SIZE = settings.short_size
+        FONT_SIZE = settings.font_size
+        SCALE_BAR_HEIGHT_FRACTION = settings.scale_bar_height_fraction
+        COLORMAP_FRACTION = settings.colormap_fraction
+        SHOW_AXES = settings.show_axes
+        DEFAULT_PARTICLE_SIZE = settings.default_particle_size
+        USE_PERSPECTIVE_CAMERA = settings.use_perspective_camera
         
         # Use provided particle_size or default
         p_size = particle_size if particle_size is not None else DEFAULT_PARTICLE_SIZE
@@ -1356,92 +2469,157 @@ def export_animation(request: Request):
         generated_frames = []
         failed_frames = []
         
+        # Parameters shared by all frames (must be JSON-serializable for the task queue)
+        render_params = {
+            "kind": kind,
+            "axis": axis,
+            "field": field,
+            "weight_field": weight_field,
+            "vmin": vmin,
+            "vmax": vmax,
+            "show_colorbar": show_colorbar,
+            "log_scale": log_scale,
+            "colorbar_label": colorbar_label,
+            "colorbar_orientation": colorbar_orientation,
+            "cmap": cmap,
+            "dpi": dpi,
+            "show_scale_bar": show_scale_bar,
+            "scale_bar_size": scale_bar_size,
+            "scale_bar_unit": scale_bar_unit,
+            "width_value": width_value,
+            "width_unit": width_unit,
+            "particles": list(particle_list),
+            "particle_size": p_size,
+            "particle_color": particle_color,
+            "grids": grids,
+            "timestamp": timestamp_anno,
+            "top_left_text": top_left_text,
+            "top_right_text": top_right_text,
+            "short_size": SHORT_SIZE,
+            "font_size": FONT_SIZE,
+            "scale_bar_height_fraction": SCALE_BAR_HEIGHT_FRACTION,
+            "colormap_fraction": COLORMAP_FRACTION,
+            "show_axes": SHOW_AXES,
+            "field_unit": field_unit,
+            "camera_theta": camera_theta,
+            "camera_phi": camera_phi,
+            "n_layers": n_layers,
+            "alpha_min": alpha_min,
+            "alpha_max": alpha_max,
+            "grey_opacity": grey_opacity,
+            "preview": False,  # preview mode always False for export
+            "show_box_frame": show_box_frame,
+            "use_perspective_camera": USE_PERSPECTIVE_CAMERA,
+        }
+        
+        queue_dir = settings.queue_dir()
+        
+        # Frames persist in an export directory keyed on the render parameters, so an
+        # interrupted or repeated export only renders missing, new or changed snapshots
+        export_root = settings.export_dir()
+        export_manifest.prune_export_dirs(export_root, settings.export_cache_max_age_days)
+        export_key = render_params
+        if interpolation_mode is not None:
+            # Snapshot FRBs are shared by exports with any interpolation and interval
+            export_key = {**render_params, "interpolated": True, "resolution": resolution}
+        export_dir = os.path.join(export_root, f"{field}_{axis}_{export_manifest.params_hash(export_key)}")
+        os.makedirs(export_dir, exist_ok=True)
+        os.utime(export_dir, None)  # mark as recently used
+        manifest = export_manifest.FrameManifest(export_dir, render_params)
+        reused_frames = 0
+        
+        # GIF/MP4 are encoded while frames are being rendered (optional, won't fail if ffmpeg unavailable)
+        gif_path = None
+        mp4_path = None
+        ffmpeg_available = video_encoder.ffmpeg_available()
+        encoder = None
+        if not ffmpeg_available:
+            print("ffmpeg is not available, will export PNG frames only")
+        
         try:
-            # Generate PNG frames
-            print(f"Generating {len(datasets)} frames...")
+            # Build one task per valid dataset that has no up-to-date frame yet
+            tasks = []
+            frame_files = {}
+            interpolated_datasets = []
             for idx, dataset_name in enumerate(datasets):
-                try:
-                    # Validate dataset name
-                    if not dataset_name or not isinstance(dataset_name, str):
-                        print(f"Warning: Invalid dataset name at index {idx}: {dataset_name}")
-                        failed_frames.append((idx, dataset_name, "Invalid dataset name"))
-                        continue
-                    
-                    dataset_path = os.path.join(DATA_DIR, dataset_name)
-                    
-                    if not os.path.exists(dataset_path):
-                        print(f"Warning: Dataset not found: {dataset_path}")
-                        failed_frames.append((idx, dataset_name, "Dataset not found"))
-                        continue
-                    
-                    # Load dataset
-                    ds_temp = yt.load(dataset_path)
-                    _add_derived_fields(ds_temp)
-                    
-                    # Get coordinate
-                    coord = ds_temp.domain_center[ds_temp.coordinates.axis_id[axis]]
-                    coord = float(coord)
-                    
-                    # Generate image
-                    image_bytes = _generate_plot_image(
-                        dataset_path,
-                        kind,
-                        axis,
-                        field,
-                        weight_field,
-                        coord,
-                        vmin,
-                        vmax,
-                        show_colorbar,
-                        log_scale,
-                        colorbar_label,
-                        colorbar_orientation,
-                        cmap,
-                        dpi,
-                        show_scale_bar,
-                        scale_bar_size,
-                        scale_bar_unit,
-                        width_value,
-                        width_unit,
-                        particle_list,
-                        p_size,
-                        particle_color,
-                        grids,
-                        timestamp_anno,
-                        top_left_text,
-                        top_right_text,
-                        SHORT_SIZE,
-                        FONT_SIZE,
-                        SCALE_BAR_HEIGHT_FRACTION,
-                        COLORMAP_FRACTION,
-                        SHOW_AXES,
-                        field_unit,
-                        camera_theta,
-                        camera_phi,
-                        n_layers,
-                        alpha_min,
-                        alpha_max,
-                        grey_opacity,
-                        False,  # preview mode always False for export
-                        show_box_frame,
-                        USE_PERSPECTIVE_CAMERA,
-                        True  # use_cache=True for animation export (better performance)
-                    )
-                    
-                    # Save PNG frame
-                    frame_filename = f"frame_{idx:04d}_{dataset_name}_{field}_{axis}.png"
-                    frame_path = os.path.join(temp_dir, frame_filename)
-                    with open(frame_path, 'wb') as f:
-                        f.write(image_bytes)
-                    
-                    generated_frames.append(frame_filename)
-                    print(f"Generated frame {idx + 1}/{len(datasets)}: {frame_filename}")
-                    
-                except Exception as e:
-                    print(f"Error generating frame {idx} for dataset {dataset_name}: {e}")
-                    traceback.print_exc()
-                    failed_frames.append((idx, dataset_name, str(e)))
+                # Validate dataset name
+                if not dataset_name or not isinstance(dataset_name, str):
+                    print(f"Warning: Invalid dataset name at index {idx}: {dataset_name}")
+                    failed_frames.append((idx, dataset_name, "Invalid dataset name"))
+                    continue
+                
+                dataset_path = os.path.join(DATA_DIR, dataset_name)
+                
+                if not os.path.exists(dataset_path):
+                    print(f"Warning: Dataset not found: {dataset_path}")
+                    failed_frames.append((idx, dataset_name, "Dataset not found"))
                     continue
+                
+                if interpolation_mode is not None:
+                    interpolated_datasets.append((idx, dataset_name, dataset_path))
+                    continue
+                
+                frame_file = export_frame_filename(dataset_name, field, axis)
+                if manifest.is_current(frame_file, dataset_path):
+                    frame_files[idx] = (dataset_name, frame_file)
+                    reused_frames += 1
+                    continue
+                
+                tasks.append({"idx": idx, "dataset": dataset_name, "dataset_path": dataset_path,
+                              "client": _client_id(request)})
+            
+            if interpolated_datasets:
+                # Frames are blended from per-snapshot FRBs instead of rendered one by one
+                frame_files, interpolation_failures = _interpolated_export_frames(
+                    interpolated_datasets, render_params, interpolation_mode, time_interval, time_unit,
+                    resolution, export_dir, queue_dir, _client_id(request))
+                failed_frames.extend(interpolation_failures)
+            
+            n_frames = len(frame_files) + len(tasks)
+            if ffmpeg_available and n_frames > 1:
+                encoder = video_encoder.StreamingEncoder(
+                    list(frame_files) + [task["idx"] for task in tasks], fps,
+                    gif_path=os.path.join(temp_dir, f"animation_{field}_{axis}.gif"),
+                    mp4_path=os.path.join(temp_dir, f"animation_{field}_{axis}.mp4"),
+                )
+                for idx, (dataset_name, frame_file) in frame_files.items():
+                    encoder.add_frame(idx, os.path.join(export_dir, frame_file))
+            
+            encoded_results = set()
+            def report_progress(results, total):
+                print(f"Generated {len(results)}/{total} frames")
+                if encoder is None:
+                    return
+                for idx, result in results.items():
+                    if idx in encoded_results:
+                        continue
+                    encoded_results.add(idx)
+                    if result["status"] == "ok":
+                        encoder.add_frame(idx, os.path.join(export_dir, result["frame"]))
+                    else:
+                        encoder.skip_frame(idx)
+            
+            # Generate PNG frames through the render queue
+            print(f"Reusing {reused_frames} frames from {export_dir}, generating {len(tasks)} frames...")
+            if tasks:
+                frame_bytes = _memory_estimate(tasks[0]["dataset_path"], {**default_render_params(), **render_params})
+                results = _run_export_job(queue_dir, "main:render_export_frame", render_export_frame,
+                                          render_params, tasks, export_dir, frame_bytes, report_progress)
+                for idx in sorted(results):
+                    result = results[idx]
+                    if result["status"] == "ok":
+                        frame_files[idx] = (result["dataset"], result["frame"])
+                    else:
+                        print(f"Error generating frame {idx} for dataset {result['dataset']}: {result['error']}")
+                        failed_frames.append((idx, result["dataset"], result["error"]))
+                failed_frames.sort(key=lambda x: x[0])
+            
+            # Copy frames from the export directory, numbered in the requested order
+            for idx in sorted(frame_files):
+                dataset_name, frame_file = frame_files[idx]
+                frame_filename = f"frame_{idx:04d}_{frame_file}"
+                shutil.copyfile(os.path.join(export_dir, frame_file), os.path.join(temp_dir, frame_filename))
+                generated_frames.append(frame_filename)
             
             # Check if we have any frames
             if not generated_frames:
@@ -1456,103 +2634,22 @@ def export_animation(request: Request):
                 for idx, name, error in failed_frames:
                     print(f"  Frame {idx} ({name}): {error}")
             
-            # Try to create GIF and MP4 using ffmpeg (optional, won't fail if ffmpeg unavailable)
-            gif_path = None
-            mp4_path = None
-            ffmpeg_available = False
-            
-            # Check if ffmpeg is available
-            try:
-                result = subprocess.run(
-                    ["ffmpeg", "-version"], 
-                    capture_output=True, 
-                    check=True,
-                    timeout=5
-                )
-                ffmpeg_available = True
-                print("ffmpeg is available")
-            except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
-                print(f"ffmpeg is not available or failed: {e}")
-                print("Will export PNG frames only")
-            
-            if ffmpeg_available and len(generated_frames) > 1:
-                # Create GIF using ffmpeg
-                try:
-                    print("Creating animated GIF...")
-                    gif_filename = f"animation_{field}_{axis}.gif"
-                    gif_path = os.path.join(temp_dir, gif_filename)
-                    palette_path = os.path.join(temp_dir, "palette.png")
-                    
-                    # Generate palette for better quality GIF
-                    palette_cmd = [
-                        "ffmpeg", "-y",
-                        "-framerate", str(fps),
-                        "-pattern_type", "glob",
-                        "-i", os.path.join(temp_dir, "frame_*.png"),
-                        "-vf", "palettegen",
-                        palette_path
-                    ]
-                    result = subprocess.run(palette_cmd, capture_output=True, check=True, timeout=60)
-                    
-                    # Create GIF with palette
-                    gif_cmd = [
-                        "ffmpeg", "-y",
-                        "-framerate", str(fps),
-                        "-pattern_type", "glob",
-                        "-i", os.path.join(temp_dir, "frame_*.png"),
-                        "-i", palette_path,
-                        "-lavfi", "paletteuse",
-                        gif_path
-                    ]
-                    result = subprocess.run(gif_cmd, capture_output=True, check=True, timeout=120)
-                    
-                    if os.path.exists(gif_path) and os.path.getsize(gif_path) > 0:
-                        print(f"Created GIF: {gif_filename}")
-                    else:
-                        print("GIF creation failed: output file is empty or doesn't exist")
-                        gif_path = None
-                        
-                except subprocess.TimeoutExpired:
-                    print("GIF creation timed out")
-                    gif_path = None
-                except Exception as e:
-                    print(f"Error creating GIF: {e}")
-                    traceback.print_exc()
-                    gif_path = None
-                
-                # Create MP4 using ffmpeg
-                try:
-                    print("Creating MP4 video...")
-                    mp4_filename = f"animation_{field}_{axis}.mp4"
-                    mp4_path = os.path.join(temp_dir, mp4_filename)
-                    
-                    mp4_cmd = [
-                        "ffmpeg", "-y",
-                        "-framerate", str(fps),
-                        "-pattern_type", "glob",
-                        "-i", os.path.join(temp_dir, "frame_*.png"),
-                        "-c:v", "libx264",
-                        "-pix_fmt", "yuv420p",
-                        mp4_path
-                    ]
-                    result = subprocess.run(mp4_cmd, capture_output=True, check=True, timeout=120)
-                    
-                    if os.path.exists(mp4_path) and os.path.getsize(mp4_path) > 0:
-                        print(f"Created MP4: {mp4_filename}")
-                    else:
-                        print("MP4 creation failed: output file is empty or doesn't exist")
-                        mp4_path = None
-                        
-                except subprocess.TimeoutExpired:
-                    print("MP4 creation timed out")
-                    mp4_path = None
-                except Exception as e:
-                    print(f"Error creating MP4: {e}")
-                    traceback.print_exc()
-                    mp4_path = None
+            if encoder is not None:
+                print("Finishing GIF and MP4 encoding...")
+                timeout = settings.encoder_timeout_base + settings.encoder_timeout_per_frame * n_frames
+                gif_path, mp4_path = encoder.close(timeout)
+                n_encoded = encoder.n_encoded
+                encoder = None
+                if n_encoded <= 1:
+                    print("Skipping GIF and MP4: need at least 2 frames")
+                    gif_path = mp4_path = None
+                if gif_path:
+                    print(f"Created GIF: {os.path.basename(gif_path)}")
+                if mp4_path:
+                    print(f"Created MP4: {os.path.basename(mp4_path)}")
             elif not ffmpeg_available:
                 print("Skipping GIF and MP4 creation: ffmpeg not available")
-            elif len(generated_frames) <= 1:
+            else:
                 print("Skipping GIF and MP4 creation: need at least 2 frames")
             
             # Create ZIP file (always includes PNGs, optionally includes GIF/MP4)
@@ -1596,6 +2693,7 @@ DPI: {dpi}
 
 Total Datasets Requested: {len(datasets)}
 Successfully Generated Frames: {len(generated_frames)}
+Reused Frames: {reused_frames}
 Failed Frames: {len(failed_frames)}
 
 PNG Frames: {png_count}
@@ -1604,6 +2702,9 @@ MP4 Created: {'Yes' if mp4_path and os.path.exists(mp4_path) else 'No'}
 FFmpeg Available: {'Yes' if ffmpeg_available else 'No'}
 
 """
+                    if interpolation_mode is not None:
+                        readme_content += (f"Interpolation: {interpolation_mode}, one frame every "
+                                           f"{time_interval} {time_unit}\n")
                     if failed_frames:
                         readme_content += "\nFailed Frames:\n"
                         for idx, name, error in failed_frames:
@@ -1635,6 +2736,9 @@ FFmpeg Available: {'Yes' if ffmpeg_available else 'No'}
             )
             
         finally:
+            # Stop the encoder if the export failed before it was finished
+            if encoder is not None:
+                encoder.close(timeout=5)
             # Clean up temporary directory
             if temp_dir and os.path.exists(temp_dir):
                 print(f"Cleaning up temporary directory: {temp_dir}")
@@ -0,0 +1,71 @@
+"""
+Geometry for off-axis slices and projections (axis="off").
+
+The view direction comes from the same camera angles as volume rendering
+(camera_theta: polar angle, camera_phi: azimuth, in degrees). Angles are snapped
+to a grid of ``step`` degrees, so small rotations map to the same plane, and
+cutting planes are kept in an LRU cache per dataset: a yt cutting plane keeps the
+list of grids it intersects and the field values it has read, so re-rendering a
+cached plane (another field limit, colormap, annotation or a nearby angle) does not
+go back to disk.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from export_manifest import source_mtime
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def snap_angles(theta, phi, step):
+    """Round angles to multiples of step degrees (step <= 0 leaves them unchanged)"""
+    if step > 0:
+        theta = round(theta / step) * step
+        phi = round(phi / step) * step
+    return float(min(max(theta, 0.0), 180.0)), float(phi % 360.0)
+
+
+def view_vectors(theta, phi):
+    """Unit normal (view direction) and north vector for camera angles in degrees"""
+    theta_rad = np.radians(theta)
+    phi_rad = np.radians(phi)
+    normal = np.array([np.sin(theta_rad) * np.cos(phi_rad),
+                       np.sin(theta_rad) * np.sin(phi_rad),
+                       np.cos(theta_rad)])
+    norm = np.linalg.norm(normal)
+    normal = normal / norm if norm > 0 else np.array([1.0, 0.0, 0.0])
+    north = np.array([0.0, 1.0, 0.0]) if abs(normal[2]) > 0.9 else np.array([0.0, 0.0, 1.0])
+    return normal, north
+
+
+def get_cutting_plane(ds, dataset_path, normal, north, max_entries):
+    """Cached cutting plane through the domain center of ds"""
+    key = (os.path.abspath(dataset_path), source_mtime(dataset_path),
+           tuple(np.round(normal, 12)), tuple(north))
+    with _lock:
+        cut = _cache.get(key)
+        if cut is not None:
+            _cache.move_to_end(key)
+            return cut
+    cut = ds.cutting(normal, ds.domain_center, north_vector=north)
+    if max_entries > 0:
+        with _lock:
+            _cache[key] = cut
+            while len(_cache) > max_entries:
+                _cache.popitem(last=False)
+    return cut
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+def plane_slab(positions, center, normal, half_depth):
+    """Boolean mask of positions (N, 3) within half_depth of the plane through center"""
+    return np.abs((positions - center) @ normal) <= half_depth
@@ -0,0 +1,124 @@
+"""
+Per-snapshot particle cache for plot overlays.
+
+Particle positions are read once per (snapshot, particle type) and kept in memory
+together with a sort order along each axis (built on first use), so selecting the
+particles in the slab around a slice plane is a binary search instead of a re-read
+of every particle file on each render. Other per-particle fields (e.g. masses for
+particle images) are read on first use and cached alongside. Entries are keyed on
+the plotfile path and its Header mtime, so a rewritten snapshot is read again.
+
+Positions and fields can be kept in float32 (field_precision in config.yaml), which
+halves the cache; float32 positions are good to ~1e-7 of the domain, well below a
+pixel, and deposits convert each chunk back to float64 before accumulating.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from export_manifest import source_mtime
+
+
+def particle_count(ds, ptype):
+    """
+    Number of ptype particles from ds['particle_info'] (no particle data is read).
+    Returns None if the particle type is not listed.
+    """
+    if 'particles' not in ds.parameters or ptype not in ds['particle_info'].keys():
+        return None
+    return ds['particle_info'][ptype]['num_particles']
+
+
+class ParticleIndex:
+    """Positions of one particle type in code_length, shape (N, 3)"""
+
+    def __init__(self, ptype, positions):
+        self.ptype = ptype
+        self.positions = positions
+        self._sorted = {}  # axis -> (sort order, sorted coordinates)
+        self._fields = {}  # field name -> (values in cgs, units)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.positions)
+
+    @property
+    def nbytes(self):
+        return (self.positions.nbytes
+                + sum(o.nbytes + c.nbytes for o, c in self._sorted.values())
+                + sum(values.nbytes for values, _ in self._fields.values()))
+
+    def _axis_order(self, axis):
+        with self._lock:
+            if axis not in self._sorted:
+                order = np.argsort(self.positions[:, axis], kind="stable")
+                self._sorted[axis] = (order, self.positions[order, axis])
+            return self._sorted[axis]
+
+    def slab(self, axis, lo, hi):
+        """Positions with lo <= position[axis] <= hi"""
+        order, coords = self._axis_order(axis)
+        i0 = np.searchsorted(coords, lo, side="left")
+        i1 = np.searchsorted(coords, hi, side="right")
+        return self.positions[order[i0:i1]]
+
+    def has_field(self, ds, name):
+        return (self.ptype, name) in ds.field_list
+
+    def field(self, ds, name):
+        """Values of the particle field name in cgs units, as (array, units string)"""
+        with self._lock:
+            if name not in self._fields:
+                ad = ds.all_data()
+                values = ad[(self.ptype, name)].in_cgs()
+                ad.clear_data()
+                self._fields[name] = (values.d.astype(self.positions.dtype, copy=False), str(values.units))
+            return self._fields[name]
+
+
+def _read_positions(ds, ptype, dtype):
+    fields = [(ptype, f"particle_position_{ax}") for ax in "xyz"]
+    ad = ds.all_data()
+    ad.get_data(fields)  # one pass over the particle files for all three components
+    positions = np.empty((ad[fields[0]].size, 3), dtype=dtype)
+    for i, f in enumerate(fields):
+        positions[:, i] = ad[f].to("code_length").d
+    ad.clear_data()
+    return positions
+
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # (plotfile path, Header mtime, ptype, dtype) -> ParticleIndex
+
+
+def _evict(max_bytes):
+    # Least recently used first; the newest entry is always kept
+    total = sum(index.nbytes for index in _cache.values())
+    while len(_cache) > 1 and total > max_bytes:
+        _, index = _cache.popitem(last=False)
+        total -= index.nbytes
+
+
+def get_particle_index(ds, dataset_path, ptype, max_mb, dtype="float64"):
+    """
+    Return the ParticleIndex of ptype in the snapshot at dataset_path, reading it from
+    ds on a cache miss, with positions and fields stored as dtype. Cached entries are
+    limited to max_mb megabytes in total.
+    """
+    key = (os.path.abspath(dataset_path), source_mtime(dataset_path), ptype, np.dtype(dtype).name)
+    with _lock:
+        index = _cache.get(key)
+        if index is not None:
+            _cache.move_to_end(key)
+            _evict(max_mb * 1024 ** 2)  # sort orders may have been added since the last check
+            return index
+
+    index = ParticleIndex(ptype, _read_positions(ds, ptype, dtype))
+    with _lock:
+        if max_mb > 0:
+            _cache[key] = index
+            _evict(max_mb * 1024 ** 2)
+    return index
@@ -0,0 +1,173 @@
+"""
+Detection of newly written AMReX plotfiles in running simulations.
+
+A plotfile is complete once its Header parses, every level's Cell_H lists all of
+the level's boxes, the data files and particle Headers they refer to exist, and
+nothing in it has been modified for `settle` seconds (particles are written after
+the mesh data, so structure alone is not enough).
+
+PlotfileWatcher reports each complete plotfile of the watched run directories once.
+New plotfile directories are noticed through inotify on Linux, so the run
+directory is listed only once at startup; on filesystems where inotify does not
+see writes from other nodes (Lustre, NFS) or without inotify, the directories are
+listed every poll interval instead.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import struct
+import time
+
+import amrex_header
+
+# inotify(7)
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = os.O_NONBLOCK
+_EVENT = struct.Struct("iIII")
+
+
+def _read_lines(path):
+    with open(path) as f:
+        return [line.strip() for line in f]
+
+
+def _newest_mtime(paths):
+    return max(os.stat(path).st_mtime for path in paths)
+
+
+def is_complete(plotfile_dir, settle=0.0):
+    """True if plotfile_dir is a fully written plotfile left unmodified for settle seconds"""
+    try:
+        header_path = os.path.join(plotfile_dir, "Header")
+        info = amrex_header.parse_header(_read_lines(header_path))
+        paths = [plotfile_dir, header_path]
+        for level, n_boxes in enumerate(info["boxes_per_level"]):
+            level_dir = os.path.join(plotfile_dir, f"Level_{level}")
+            cell_header = os.path.join(level_dir, "Cell_H")
+            fabs = [line.split()[1] for line in _read_lines(cell_header) if line.startswith("FabOnDisk:")]
+            if len(fabs) != n_boxes:
+                return False
+            data_files = set(fabs)
+            paths += [level_dir, cell_header] + [os.path.join(level_dir, name) for name in data_files]
+        for entry in os.listdir(plotfile_dir):
+            entry_path = os.path.join(plotfile_dir, entry)
+            if not entry.startswith("Level_") and os.path.isdir(entry_path):
+                # particle data: its Header is written last
+                paths += [entry_path, os.path.join(entry_path, "Header")]
+        newest = _newest_mtime(paths)
+    except (OSError, ValueError, IndexError):
+        return False
+    return time.time() - newest >= settle
+
+
+class _Inotify:
+    """Creation and rename events of entries in a set of directories"""
+
+    def __init__(self, directories):
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CREATE | IN_MOVED_TO)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self.directories[wd] = directory
+
+    def read(self, timeout):
+        """Paths created in or moved into the watched directories within timeout seconds"""
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            buf = os.read(self.fd, 65536)
+        except BlockingIOError:
+            return []
+        paths = []
+        offset = 0
+        while offset + _EVENT.size <= len(buf):
+            wd, _, _, length = _EVENT.unpack_from(buf, offset)
+            name = buf[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+            if wd in self.directories and name:
+                paths.append(os.path.join(self.directories[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PlotfileWatcher:
+    """
+    Reports complete plotfiles (named <prefix><digits>) appearing in directories,
+    including the ones already there when the watcher starts.
+    """
+
+    def __init__(self, directories, prefix="plt", poll_interval=5.0, settle=5.0, use_inotify=True):
+        self.directories = [os.path.abspath(d) for d in directories]
+        self.name_re = re.compile(rf"^{re.escape(prefix)}\d+$")
+        self.poll_interval = poll_interval
+        self.settle = settle
+        self.reported = set()
+        self.pending = set()
+        self.inotify = None
+        if use_inotify:
+            try:
+                self.inotify = _Inotify(self.directories)
+            except (OSError, AttributeError) as e:
+                print(f"inotify not available ({e}); polling every {poll_interval} s")
+        self._scan()
+
+    def _add(self, path):
+        if self.name_re.match(os.path.basename(path)) and path not in self.reported:
+            self.pending.add(path)
+
+    def _scan(self):
+        for directory in self.directories:
+            try:
+                names = os.listdir(directory)
+            except OSError as e:
+                print(f"Warning: Could not list {directory}: {e}")
+                continue
+            for name in names:
+                self._add(os.path.join(directory, name))
+
+    def _completed(self):
+        done = sorted(path for path in self.pending if is_complete(path, self.settle))
+        self.pending.difference_update(done)
+        self.reported.update(done)
+        return done
+
+    def wait(self, timeout=None):
+        """
+        Newly completed plotfiles, sorted by path. Blocks until there is at least one or
+        timeout seconds (None: forever) have passed, then returns [].
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            done = self._completed()
+            if done:
+                return done
+            remaining = None if deadline is None else deadline - time.time()
+            if remaining is not None and remaining <= 0:
+                return []
+            # Incomplete plotfiles are checked again every second
+            wait = min(self.poll_interval, 1.0) if self.pending else self.poll_interval
+            if remaining is not None:
+                wait = min(wait, remaining)
+            if self.inotify is not None:
+                for path in self.inotify.read(wait):
+                    self._add(path)
+            else:
+                time.sleep(wait)
+                self._scan()
+
+    def close(self):
+        if self.inotify is not None:
+            self.inotify.close()
+            self.inotify = None
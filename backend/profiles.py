@@ -0,0 +1,244 @@
+"""
+Binned reductions for radial profiles and phase plots.
+
+Cells are binned in a single streaming pass over the grids (yt "io" chunks) with
+vectorized np.bincount, and only the binned sums are kept. A binned result is small,
+so callers can cache it and re-plot it with another colormap or range without
+reading the data again. Default bin ranges come from field extrema stored in the
+metadata catalog (as "min:<field>" / "max:<field>", shared with timeseries.py).
+"""
+
+import io
+
+import numpy as np
+from matplotlib.colors import LogNorm, Normalize
+from matplotlib.figure import Figure
+from matplotlib.ticker import NullFormatter
+
+
+def bin_edges(lo, hi, n_bins, log):
+    if log:
+        if lo <= 0:
+            raise ValueError(f"Log bins need a positive range, got [{lo:g}, {hi:g}]")
+        return np.geomspace(lo, hi, n_bins + 1)
+    return np.linspace(lo, hi, n_bins + 1)
+
+
+def _bin_index(values, edges):
+    """Bin index of each value (-1 outside the edges; the upper edge is inclusive)"""
+    idx = np.searchsorted(edges, values, side="right") - 1
+    idx[values == edges[-1]] = len(edges) - 2
+    idx[(values < edges[0]) | (values > edges[-1]) | ~np.isfinite(values)] = -1
+    return idx
+
+
+def field_extrema(ds, fields, catalog=None, plotfile_dir=None, data_source=None):
+    """
+    {field name: (min, max, units)} for yt field tuples keyed by name, taken from the
+    catalog when available and otherwise computed in one pass over the grids (of
+    data_source only, if given; extrema of a region are not stored in the catalog).
+    """
+    names = {f[1]: f for f in fields}
+    quantities = [f"{op}:{name}" for name in names for op in ("min", "max")]
+    cached = {}
+    if data_source is not None:
+        catalog = None
+    if catalog is not None:
+        _, cached = catalog.get_quantities(plotfile_dir, quantities)
+    missing = [name for name in names if f"min:{name}" not in cached or f"max:{name}" not in cached]
+    if missing:
+        lo = {name: np.inf for name in missing}
+        hi = {name: -np.inf for name in missing}
+        units = {}
+        for chunk in (data_source or ds.all_data()).chunks([], "io"):
+            for name in missing:
+                values = chunk[names[name]]
+                if len(values) == 0:
+                    continue
+                units.setdefault(name, values.units)
+                values = values.to(units[name]).d
+                lo[name] = min(lo[name], np.nanmin(values))
+                hi[name] = max(hi[name], np.nanmax(values))
+        for name in missing:
+            cached[f"min:{name}"] = (float(lo[name]), str(units.get(name, "")))
+            cached[f"max:{name}"] = (float(hi[name]), str(units.get(name, "")))
+        if catalog is not None:
+            catalog.put_quantities(plotfile_dir, float(ds.current_time.in_cgs().d),
+                                   {q: cached[q] for q in quantities})
+    return {name: (cached[f"min:{name}"][0], cached[f"max:{name}"][0], cached[f"max:{name}"][1])
+            for name in names}
+
+
+def _values(chunk, field, units):
+    values = chunk[field]
+    return values.to(units).d if units else values.d
+
+
+def radial_profile(ds, field, weight, center, n_bins, log_bins):
+    """
+    Weighted average of field in radial bins around center (code_length).
+    weight=None sums the field in each bin instead.
+    """
+    center = np.asarray(center, dtype=float)
+    left = ds.domain_left_edge.to("code_length").d
+    right = ds.domain_right_edge.to("code_length").d
+    corners = np.array([[l if i == 0 else r for i, l, r in zip(bits, left, right)]
+                        for bits in np.ndindex(2, 2, 2)])
+    r_max = np.sqrt(((corners - center) ** 2).sum(axis=1)).max()
+    r_min = 0.5 * float(ds.index.get_smallest_dx().to("code_length").d) if log_bins else 0.0
+    edges = bin_edges(r_min, r_max, n_bins, log_bins)
+
+    sum_w = np.zeros(n_bins)
+    sum_wz = np.zeros(n_bins)
+    units = None
+    for chunk in ds.all_data().chunks([], "io"):
+        z = chunk[field]
+        if len(z) == 0:
+            continue
+        units = units or str(z.units)
+        z = z.to(units).d
+        r = np.sqrt(sum((chunk[("index", ax)].to("code_length").d - c) ** 2 for ax, c in zip("xyz", center)))
+        idx = _bin_index(r, edges)
+        keep = idx >= 0
+        w = chunk[weight].in_cgs().d[keep] if weight is not None else np.ones(keep.sum())
+        sum_w += np.bincount(idx[keep], weights=w, minlength=n_bins)
+        sum_wz += np.bincount(idx[keep], weights=w * z[keep], minlength=n_bins)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        profile = sum_wz / sum_w if weight is not None else np.where(sum_w > 0, sum_wz, np.nan)
+    return {
+        "kind": "profile",
+        "field": field[1],
+        "weight_field": weight[1] if weight is not None else None,
+        "units": units or "",
+        "radius_edges": edges,  # code_length
+        "center": center.tolist(),
+        "values": profile,
+        "weight_sum": sum_w,
+    }
+
+
+def phase(ds, x_field, y_field, z_field, weight, x_range, y_range, n_bins, x_log, y_log):
+    """
+    2D binned z_field over (x_field, y_field): the sum of z in each bin, or its
+    weighted average if weight is given. Ranges are (lo, hi, units).
+    """
+    x_edges = bin_edges(x_range[0], x_range[1], n_bins, x_log)
+    y_edges = bin_edges(y_range[0], y_range[1], n_bins, y_log)
+    n_cells = n_bins * n_bins
+    sum_w = np.zeros(n_cells)
+    sum_wz = np.zeros(n_cells)
+    z_units = None
+    for chunk in ds.all_data().chunks([], "io"):
+        x = _values(chunk, x_field, x_range[2])
+        if len(x) == 0:
+            continue
+        y = _values(chunk, y_field, y_range[2])
+        z = chunk[z_field]
+        z_units = z_units or str(z.units)
+        z = z.to(z_units).d
+        ix = _bin_index(x, x_edges)
+        iy = _bin_index(y, y_edges)
+        keep = (ix >= 0) & (iy >= 0)
+        idx = ix[keep] * n_bins + iy[keep]
+        w = chunk[weight].in_cgs().d[keep] if weight is not None else np.ones(keep.sum())
+        sum_w += np.bincount(idx, weights=w, minlength=n_cells)
+        sum_wz += np.bincount(idx, weights=w * z[keep], minlength=n_cells)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        values = sum_wz / sum_w if weight is not None else np.where(sum_w > 0, sum_wz, np.nan)
+    return {
+        "kind": "phase",
+        "x_field": x_field[1],
+        "y_field": y_field[1],
+        "z_field": z_field[1],
+        "weight_field": weight[1] if weight is not None else None,
+        "x_units": x_range[2],
+        "y_units": y_range[2],
+        "z_units": z_units or "",
+        "x_edges": x_edges,
+        "y_edges": y_edges,
+        "x_log": x_log,
+        "y_log": y_log,
+        "values": values.reshape(n_bins, n_bins),  # [x bin, y bin]
+    }
+
+
+def to_json(binned, radius_scale=1.0, radius_unit="code_length"):
+    """Plain lists (NaN -> None) for the JSON API; radius_scale converts code_length to radius_unit"""
+    out = {}
+    for key, value in binned.items():
+        if isinstance(value, np.ndarray):
+            if key == "radius_edges":
+                value = value * radius_scale
+            value = np.where(np.isfinite(value), value, None).tolist()
+        out[key] = value
+    if "radius_edges" in out:
+        out["radius_unit"] = radius_unit
+    return out
+
+
+def _hide_minor_labels(ax):
+    # Log axes spanning less than a decade label minor ticks, which overlap
+    ax.xaxis.set_minor_formatter(NullFormatter())
+    ax.yaxis.set_minor_formatter(NullFormatter())
+
+
+def _label(name, units):
+    return f"{name} ({units})" if units and units != "dimensionless" else name
+
+
+def plot_profile(binned, radius_scale, radius_unit, log_scale=True, vmin=None, vmax=None,
+                 font_size=12, dpi=150):
+    """PNG bytes of a radial profile. radius_scale converts code_length to radius_unit."""
+    radii = binned["radius_edges"] * radius_scale
+    centers = np.sqrt(radii[1:] * radii[:-1]) if radii[0] > 0 else 0.5 * (radii[1:] + radii[:-1])
+    fig = Figure(figsize=(6, 4.5))
+    ax = fig.add_subplot()
+    ax.plot(centers, binned["values"], drawstyle="steps-mid")
+    if radii[0] > 0:
+        ax.set_xscale("log")
+    if log_scale:
+        ax.set_yscale("log")
+    _hide_minor_labels(ax)
+    ax.set_ylim(vmin, vmax)
+    ax.set_xlabel(_label("radius", radius_unit), fontsize=font_size)
+    ylabel = _label(binned["field"], binned["units"])
+    if binned["weight_field"]:
+        ylabel = f"{ylabel}, {binned['weight_field']}-weighted"
+    ax.set_ylabel(ylabel, fontsize=font_size)
+    ax.tick_params(labelsize=font_size * 0.8)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight", pad_inches=0.05)
+    return buf.getvalue()
+
+
+def plot_phase(binned, cmap="viridis", log_scale=True, vmin=None, vmax=None, show_colorbar=True,
+               font_size=12, dpi=150):
+    """PNG bytes of a phase plot"""
+    values = np.ma.masked_invalid(binned["values"])
+    if log_scale:
+        values = np.ma.masked_less_equal(values, 0)
+        norm = LogNorm(vmin=vmin, vmax=vmax)
+    else:
+        norm = Normalize(vmin=vmin, vmax=vmax)
+    fig = Figure(figsize=(6, 5))
+    ax = fig.add_subplot()
+    mesh = ax.pcolormesh(binned["x_edges"], binned["y_edges"], values.T, cmap=cmap, norm=norm)
+    if binned["x_log"]:
+        ax.set_xscale("log")
+    if binned["y_log"]:
+        ax.set_yscale("log")
+    _hide_minor_labels(ax)
+    ax.set_xlabel(_label(binned["x_field"], binned["x_units"]), fontsize=font_size)
+    ax.set_ylabel(_label(binned["y_field"], binned["y_units"]), fontsize=font_size)
+    ax.tick_params(labelsize=font_size * 0.8)
+    if show_colorbar:
+        cbar = fig.colorbar(mesh, ax=ax)
+        zlabel = _label(binned["z_field"], binned["z_units"])
+        if binned["weight_field"]:
+            zlabel = f"{zlabel}, {binned['weight_field']}-weighted"
+        cbar.set_label(zlabel, fontsize=font_size)
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi, bbox_inches="tight", pad_inches=0.05)
+    return buf.getvalue()
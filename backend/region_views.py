@@ -0,0 +1,102 @@
+"""
+Data sources restricted to the viewed region for zoomed views (width_value/width_unit set).
+
+A zoomed axis-aligned slice or projection only needs the grids that overlap the
+visible window. Its data source is a box spanning the window plus a margin
+(``margin`` times the width on each side, so small pans stay inside) in the image
+plane, and the whole domain along the line of sight. The yt objects built on it (the
+slice, or the projection quadtree) keep the values they have read. They are kept in an
+LRU cache per dataset, and a view whose window lies inside the box of a cached object
+is re-pixelized from that object, so zooming further in reads nothing.
+
+Volume renderings with a plane-parallel lens see a cube of the camera width around
+the focus, so their data source is the (margin-padded) cube around the center.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from export_manifest import source_mtime
+
+_cache = OrderedDict()
+_lock = threading.Lock()
+
+
+def window(ds, axis, center, width):
+    """(left, right) code_length edges of the window of a view along axis, clipped to the domain"""
+    axis_id = ds.coordinates.axis_id[axis]
+    half = 0.5 * ds.quan(*width).to("code_length").d
+    left = ds.domain_left_edge.to("code_length").d.copy()
+    right = ds.domain_right_edge.to("code_length").d.copy()
+    for ax in (ds.coordinates.x_axis[axis_id], ds.coordinates.y_axis[axis_id]):
+        left[ax] = max(left[ax], center[ax] - half)
+        right[ax] = min(right[ax], center[ax] + half)
+    return left, right
+
+
+def _pad(ds, left, right, axes, margin):
+    domain_left = ds.domain_left_edge.to("code_length").d
+    domain_right = ds.domain_right_edge.to("code_length").d
+    left, right = left.copy(), right.copy()
+    for ax in axes:
+        pad = margin * (right[ax] - left[ax])
+        left[ax] = max(domain_left[ax], left[ax] - pad)
+        right[ax] = min(domain_right[ax], right[ax] + pad)
+    return left, right
+
+
+def get_view(ds, dataset_path, kind, axis, field, weight, width, margin, max_entries):
+    """
+    Slice (kind "slc") or projection ("prj") of field along axis through the domain
+    center, restricted to a box covering the window of the given width. Reuses a
+    cached object whose box contains the window.
+    """
+    center = ds.domain_center.to("code_length").d
+    left, right = window(ds, axis, center, width)
+    # Slices read any field on demand; projections are computed per field
+    key = (os.path.abspath(dataset_path), source_mtime(dataset_path), kind, axis,
+           None if kind == "slc" else (field, weight))
+    with _lock:
+        best = None
+        for entry, view in _cache.items():
+            entry_key, box_left, box_right = entry[0], np.array(entry[1]), np.array(entry[2])
+            if entry_key != key or np.any(box_left > left) or np.any(box_right < right):
+                continue
+            volume = np.prod(box_right - box_left)
+            if best is None or volume < best[0]:
+                best = (volume, entry, view)
+        if best is not None:
+            _cache.move_to_end(best[1])
+            return best[2]
+
+    axis_id = ds.coordinates.axis_id[axis]
+    box_left, box_right = _pad(ds, left, right,
+                               (ds.coordinates.x_axis[axis_id], ds.coordinates.y_axis[axis_id]), margin)
+    box = ds.box(ds.arr(box_left, "code_length"), ds.arr(box_right, "code_length"))
+    if kind == "slc":
+        view = ds.slice(axis, center[axis_id], data_source=box)
+    else:
+        view = ds.proj(field, axis, weight_field=weight, data_source=box)
+    if max_entries > 0:
+        with _lock:
+            _cache[(key, tuple(box_left), tuple(box_right))] = view
+            while len(_cache) > max_entries:
+                _cache.popitem(last=False)
+    return view
+
+
+def view_cube(ds, center, width, margin):
+    """Box of side width (padded by margin on each side) around center, clipped to the domain"""
+    center = np.asarray(center.to("code_length").d if hasattr(center, "to") else center)
+    half = 0.5 * (1 + 2 * margin) * ds.quan(*width).to("code_length").d
+    left = np.maximum(ds.domain_left_edge.to("code_length").d, center - half)
+    right = np.minimum(ds.domain_right_edge.to("code_length").d, center + half)
+    return ds.box(ds.arr(left, "code_length"), ds.arr(right, "code_length"))
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
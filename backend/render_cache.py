@@ -0,0 +1,112 @@
+"""
+Rendered images shared across processes and runs.
+
+Images are stored as files named by a hash of the render parameters (canonical
+JSON, sorted keys) and the identity of the snapshot (absolute path and Header
+mtime, see export_manifest.source_mtime), so a rewritten snapshot never hits an old
+image. The web backend (/api/slice, /api/export/current_frame, animation export
+workers) and `quick_plot --engine web` render through the same function with the
+same parameters, so a frame rendered by any of them is read back by the others.
+
+The directory is trimmed to a size limit, removing the least recently used images
+first.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from export_manifest import source_mtime
+
+# Bump when the renderer changes its output for the same parameters (2: drops images
+# stored under the loaded snapshot while another one was being rendered)
+RENDER_CACHE_VERSION = 2
+
+_puts_since_prune = 0
+_prune_lock = threading.Lock()
+PRUNE_EVERY = 64
+
+
+def render_key(params, plotfile_dir):
+    """Hex key of an image of plotfile_dir rendered with params (a JSON-serializable dict)"""
+    identity = {
+        "version": RENDER_CACHE_VERSION,
+        "source": os.path.abspath(plotfile_dir),
+        "source_mtime": source_mtime(plotfile_dir),
+        "params": params,
+    }
+    text = json.dumps(identity, sort_keys=True, separators=(",", ":"), default=list)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _path(directory, key):
+    return os.path.join(directory, key[:2], f"{key}.png")
+
+
+def get(directory, key):
+    """Image bytes stored under key, or None"""
+    path = _path(directory, key)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    try:
+        os.utime(path, None)  # mark as recently used
+    except OSError:
+        pass
+    return data
+
+
+def put(directory, key, data, max_mb):
+    """Store image bytes under key (atomically); trims the directory to max_mb now and then"""
+    global _puts_since_prune
+    path = _path(directory, key)
+    tmp_path = None
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A temp file of its own per call: threads of one process may store the same key at once
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{key}.", suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Warning: Could not write to the render cache {directory}: {e}")
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return
+    with _prune_lock:
+        _puts_since_prune += 1
+        due = _puts_since_prune >= PRUNE_EVERY
+        if due:
+            _puts_since_prune = 0
+    if due:
+        prune(directory, max_mb)
+
+
+def prune(directory, max_mb):
+    """Remove the least recently used images until the directory holds at most max_mb"""
+    entries = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if name.endswith(".tmp") and st.st_mtime > time.time() - 3600:
+                continue  # being written
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    limit = max_mb * 1024 * 1024
+    for _, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            continue
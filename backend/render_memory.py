@@ -0,0 +1,258 @@
+"""
+Memory admission control for renders.
+
+Before a render starts, its peak memory is estimated from the snapshot's header
+files (domain dimensions, cells and boxes per AMR level, particle counts, see
+amrex_header.py) and the render parameters:
+
+    slc   cells of the grids crossing the plane, at every level
+    prj   cells of the largest level (grids are read chunk by chunk) plus the
+          projected quadtree
+    vol   every cell of the traversed levels, cell- and vertex-centered, plus the
+          image buffers of the ray-casting threads
+    part  positions and weights of the deposited particles
+
+plus the figure (fixed-resolution buffer, RGBA canvas, PNG) and particle overlays.
+Cell data is counted as float64 values of the stored fields a field is derived
+from (yt reads and pixelizes in float64), times an allowance for yt's selection
+masks and temporaries; the particle cache's copy counts cache_value_bytes per value
+(4 with field_precision float32).
+
+A MemoryBudget admits renders in arrival order while the sum of their estimates
+fits the budget, and makes the others wait; a render estimated above the whole
+budget waits until it can run alone. While renders run, the process RSS is
+sampled, and each render's peak above its starting RSS is kept next to its
+estimate, so the model can be checked against real renders (GET /api/memory).
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+MB = 1024 * 1024
+
+BYTES_PER_VALUE = 8
+# Selection masks, unit conversions and temporaries made by yt per value read
+CELL_OVERHEAD = 2.0
+# FRB, mask, RGBA canvas and Agg buffers per figure pixel
+BYTES_PER_PIXEL = 40
+# Figure, fonts and colormap tables
+BASE_BYTES = 64 * MB
+# Stored fields read per cell for the derived fields (see main._add_derived_fields)
+DERIVED_INPUTS = {"temperature": 8, "velocity_magnitude": 6, "number_density": 2}
+
+# Process RSS sampling while renders run
+SAMPLE_INTERVAL = 0.05  # seconds
+HISTORY = 200
+
+
+def rss_bytes():
+    """Current resident set size of this process (peak RSS where that is not available)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _field_inputs(info, field):
+    if field in info["fields"]:
+        return 1
+    if field == "cell_volume":
+        return 1
+    # ("gas", name) aliases of stored fields come with a converted copy
+    return DERIVED_INPUTS.get(field, 2)
+
+
+def _level_dims(info, level):
+    dims = list(info["domain_dimensions"] or [1])
+    factor = 1
+    for ratio in info["refine_by"][:level]:
+        factor *= ratio
+    return [d * factor for d in dims]
+
+
+def _box_length(info, level):
+    # Side of a typical box of a level, in cells
+    cells = info["cells_per_level"][level]
+    boxes = max(info["boxes_per_level"][level], 1)
+    return (cells / boxes) ** (1.0 / max(info["dimensionality"], 1))
+
+
+def _depth(info, axis, level):
+    # Cells along the line of sight at a level
+    dims = _level_dims(info, level)
+    if axis in ("x", "y", "z") and "xyz".index(axis) < len(dims):
+        return dims["xyz".index(axis)]
+    return sum(dims) / len(dims)
+
+
+def _particle_count(info, ptypes):
+    return sum(info["particles"].get(p, {}).get("count", 0) for p in ptypes)
+
+
+def figure_pixels(params):
+    """Pixels of the rendered figure (short side short_size * dpi, long side up to 1.5x)"""
+    n_short = params["short_size"] * params["dpi"]
+    return int(n_short * n_short * 1.5)
+
+
+def cells_read(info, params, max_level=None):
+    """Cells whose values a render holds in memory at its peak"""
+    levels = range(info["max_level"] + 1 if max_level is None else min(max_level, info["max_level"]) + 1)
+    kind = params["kind"]
+    if kind == "slc":
+        return sum(info["cells_per_level"][l] * min(1.0, _box_length(info, l) / _depth(info, params["axis"], l))
+                   for l in levels)
+    if kind == "prj":
+        plane = sum(info["cells_per_level"][l] / _depth(info, params["axis"], l) for l in levels)
+        return max(info["cells_per_level"][l] for l in levels) + 5 * plane
+    if kind == "vol":
+        # Vertex-centered copies of the bricks: (n + 1)^3 values per n^3 cells
+        return sum(info["cells_per_level"][l] * (1 + ((_box_length(info, l) + 1) / _box_length(info, l)) ** 3)
+                   for l in levels)
+    return 0
+
+
+def estimate_bytes(info, params, max_level=None, volume_workers=1, cache_value_bytes=BYTES_PER_VALUE):
+    """
+    Estimated peak memory of a render of a snapshot with header info (see
+    amrex_header.read_plotfile) and render params (keys as in main.default_render_params),
+    traversing AMR levels up to max_level (None: all), with cached particle data stored
+    at cache_value_bytes per value
+    """
+    kind = params["kind"]
+    inputs = _field_inputs(info, params["field"])
+    weight = params.get("weight_field")
+    if kind == "prj" and weight not in (None, "None"):
+        inputs += _field_inputs(info, weight)
+    total = BASE_BYTES + figure_pixels(params) * BYTES_PER_PIXEL
+    total += cells_read(info, params, max_level) * inputs * BYTES_PER_VALUE * CELL_OVERHEAD
+    if kind == "vol":
+        # Final pass at 2 * short_size * dpi pixels, RGBA float64 per ray-casting thread
+        resolution = 512 if params["preview"] else 2 * params["short_size"] * params["dpi"]
+        total += resolution ** 2 * 32 * (volume_workers + 1)
+    if kind == "part":
+        ptypes = params["particles"] or list(info["particles"])
+        # Positions and weight, plus the cache's copy
+        total += _particle_count(info, ptypes) * 4 * (BYTES_PER_VALUE + cache_value_bytes)
+    elif params["particles"]:
+        total += _particle_count(info, params["particles"]) * 3 * (BYTES_PER_VALUE + cache_value_bytes)
+    return int(total)
+
+
+class MemoryBudget:
+    """Admission of renders against a memory budget in bytes (None or 0: no limit)"""
+
+    def __init__(self, budget_bytes=None):
+        self.budget = budget_bytes or None
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._queue = deque()  # tickets waiting, in arrival order
+        self._reserved = 0
+        self._active = {}
+        self._history = deque(maxlen=HISTORY)
+        self._sampler = None
+
+    def fits(self, nbytes):
+        """True if a render estimated at nbytes fits the budget on its own"""
+        return self.budget is None or nbytes <= self.budget
+
+    def max_level(self, info, params, volume_workers=1, cache_value_bytes=BYTES_PER_VALUE):
+        """
+        Deepest AMR level a render may traverse to fit the budget on its own (None:
+        all levels fit, or no budget); at least level 0
+        """
+        if self.fits(estimate_bytes(info, params, None, volume_workers, cache_value_bytes)):
+            return None
+        level = info["max_level"] - 1
+        while level > 0 and not self.fits(estimate_bytes(info, params, level, volume_workers, cache_value_bytes)):
+            level -= 1
+        return max(level, 0)
+
+    @contextmanager
+    def reserve(self, nbytes, label=""):
+        """
+        Hold nbytes of the budget for the duration of the with-block, waiting for
+        renders ahead in line to finish first if it does not fit
+        """
+        amount = min(nbytes, self.budget) if self.budget else 0
+        with self._cond:
+            ticket = next(self._seq)
+            self._queue.append(ticket)
+            try:
+                while self._queue[0] != ticket or (self.budget and self._reserved + amount > self.budget):
+                    self._cond.wait()
+            finally:
+                self._queue.remove(ticket)
+                self._cond.notify_all()
+            self._reserved += amount
+            rss = rss_bytes()
+            record = {"label": label, "estimate_mb": nbytes / MB, "start_rss": rss, "peak_rss": rss,
+                      "started": time.time(), "concurrent": len(self._active)}
+            for other in self._active.values():
+                other["concurrent"] += 1
+            self._active[ticket] = record
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample, daemon=True)
+                self._sampler.start()
+        try:
+            yield
+        finally:
+            rss = rss_bytes()
+            with self._cond:
+                self._reserved -= amount
+                del self._active[ticket]
+                self._history.append({
+                    "label": record["label"],
+                    "estimate_mb": record["estimate_mb"],
+                    "peak_mb": (max(record["peak_rss"], rss) - record["start_rss"]) / MB,
+                    "seconds": time.time() - record["started"],
+                    "concurrent": record["concurrent"],
+                })
+                self._cond.notify_all()
+
+    def _sample(self):
+        while True:
+            rss = rss_bytes()
+            with self._cond:
+                if not self._active:
+                    self._sampler = None
+                    return
+                for record in self._active.values():
+                    record["peak_rss"] = max(record["peak_rss"], rss)
+            time.sleep(SAMPLE_INTERVAL)
+
+    def available(self):
+        """Bytes of the budget not reserved by running renders (None: no limit)"""
+        with self._cond:
+            return None if self.budget is None else self.budget - self._reserved
+
+    def stats(self):
+        """Budget, reservations, waiting renders and recent estimates next to measured peaks"""
+        with self._cond:
+            history = list(self._history)
+            # Renders that ran alone measure their own peak
+            ratios = sorted(r["peak_mb"] / r["estimate_mb"] for r in history
+                            if not r["concurrent"] and r["estimate_mb"] > 0)
+            return {
+                "budget_mb": None if self.budget is None else self.budget / MB,
+                "reserved_mb": self._reserved / MB,
+                "rss_mb": rss_bytes() / MB,
+                "running": len(self._active),
+                "waiting": len(self._queue),
+                "peak_to_estimate_median": ratios[len(ratios) // 2] if ratios else None,
+                "recent": history[-50:],
+            }
+
+
+def default_budget_bytes(fraction=0.5):
+    """fraction of the physical memory, or None if it cannot be determined"""
+    try:
+        return int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") * fraction)
+    except (OSError, ValueError, AttributeError):
+        return None
@@ -0,0 +1,381 @@
+#!/usr/bin/env python
+"""
+File-based task queue for distributing animation frame renders.
+
+A job is a directory under the queue root:
+
+    <queue_dir>/jobs/<job_id>/
+        job.json        parameters shared by all frames and the renderer to use
+        tasks/          pending frame tasks, one JSON file per frame
+        claimed/        tasks taken by a worker (moved here with an atomic rename)
+        done/           one JSON result per finished frame
+        frames/         rendered frames (shared output directory)
+    <queue_dir>/workers/<worker_id>     heartbeat files of running workers
+
+Any process that can see <queue_dir> can work on the queue, so putting the queue on
+a shared filesystem spreads one export over several nodes. No broker process or
+external service is needed: claiming a task is a single os.rename(), which is atomic
+on POSIX filesystems.
+
+Start workers on another node with:
+    python render_queue.py worker --queue-dir /shared/scratch/quokka-queue -j 8
+"""
+
+import argparse
+import importlib
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import threading
+import time
+import traceback
+import uuid
+
+HEARTBEAT_INTERVAL = 5.0  # seconds between worker heartbeat updates
+
+
+def _write_json(path, data):
+    """Write JSON atomically so readers never see a partial file"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _job_dir(queue_dir, job_id):
+    return os.path.join(queue_dir, "jobs", job_id)
+
+
+def _task_filename(idx):
+    return f"{idx:06d}.json"
+
+
+def frames_dir(queue_dir, job_id):
+    return os.path.join(_job_dir(queue_dir, job_id), "frames")
+
+
+def submit_job(queue_dir, renderer, params, tasks, output_dir=None):
+    """
+    Create a job with one task per frame.
+
+    renderer is a "module:function" string. Workers import it and call
+    render(params, task, frames_dir), which must write the frame into frames_dir
+    and return its file name. frames_dir is output_dir if given (it must then be
+    visible to all workers), otherwise the job's own frames/ directory.
+    Every task must have a unique integer "idx".
+    """
+    job_id = f"{time.strftime('%Y%m%d_%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    job_dir = _job_dir(queue_dir, job_id)
+    for sub in ("tasks", "claimed", "done", "frames"):
+        os.makedirs(os.path.join(job_dir, sub), exist_ok=True)
+    _write_json(os.path.join(job_dir, "job.json"),
+                {"renderer": renderer, "params": params, "output_dir": output_dir})
+    for task in tasks:
+        _write_json(os.path.join(job_dir, "tasks", _task_filename(task["idx"])), task)
+    return job_id
+
+
+def remove_job(queue_dir, job_id):
+    shutil.rmtree(_job_dir(queue_dir, job_id), ignore_errors=True)
+
+
+def _list_jobs(queue_dir):
+    jobs_root = os.path.join(queue_dir, "jobs")
+    if not os.path.isdir(jobs_root):
+        return []
+    return sorted(os.listdir(jobs_root))
+
+
+def claim_task(queue_dir, job_id=None):
+    """
+    Claim the next pending task, oldest job first.
+    Returns (job_id, task) or None if nothing is pending.
+    """
+    for jid in ([job_id] if job_id else _list_jobs(queue_dir)):
+        tasks_dir = os.path.join(_job_dir(queue_dir, jid), "tasks")
+        try:
+            names = sorted(os.listdir(tasks_dir))
+        except FileNotFoundError:
+            continue
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            claimed_path = os.path.join(_job_dir(queue_dir, jid), "claimed", name)
+            try:
+                os.rename(os.path.join(tasks_dir, name), claimed_path)
+            except (FileNotFoundError, OSError):
+                # Another worker got there first
+                continue
+            # Touch so that stale-claim detection measures from the claim time
+            os.utime(claimed_path, None)
+            return jid, _read_json(claimed_path)
+    return None
+
+
+def finish_task(queue_dir, job_id, task, status, frame=None, error=None,
+                worker_id=None, elapsed=None):
+    """Record the result of a task and release its claim"""
+    job_dir = _job_dir(queue_dir, job_id)
+    name = _task_filename(task["idx"])
+    _write_json(os.path.join(job_dir, "done", name), {
+        "idx": task["idx"],
+        "dataset": task.get("dataset"),
+        "status": status,
+        "frame": frame,
+        "error": error,
+        "worker": worker_id,
+        "elapsed": elapsed,
+    })
+    try:
+        os.unlink(os.path.join(job_dir, "claimed", name))
+    except FileNotFoundError:
+        pass
+
+
+def requeue_stale_tasks(queue_dir, job_id, timeout):
+    """Move claims older than timeout seconds back to the pending tasks (their worker died)"""
+    job_dir = _job_dir(queue_dir, job_id)
+    claimed_dir = os.path.join(job_dir, "claimed")
+    now = time.time()
+    requeued = 0
+    try:
+        names = os.listdir(claimed_dir)
+    except FileNotFoundError:
+        return 0
+    for name in names:
+        path = os.path.join(claimed_dir, name)
+        try:
+            if now - os.path.getmtime(path) > timeout and \
+                    not os.path.exists(os.path.join(job_dir, "done", name)):
+                os.rename(path, os.path.join(job_dir, "tasks", name))
+                requeued += 1
+        except FileNotFoundError:
+            continue
+    if requeued:
+        print(f"Requeued {requeued} stale tasks of job {job_id}")
+    return requeued
+
+
+def job_results(queue_dir, job_id):
+    """Return {idx: result} for all finished tasks of a job"""
+    done_dir = os.path.join(_job_dir(queue_dir, job_id), "done")
+    results = {}
+    for name in os.listdir(done_dir):
+        if name.endswith(".json"):
+            try:
+                result = _read_json(os.path.join(done_dir, name))
+            except (FileNotFoundError, ValueError):
+                continue
+            results[result["idx"]] = result
+    return results
+
+
+def pending_count(queue_dir, job_id):
+    tasks_dir = os.path.join(_job_dir(queue_dir, job_id), "tasks")
+    try:
+        return sum(1 for name in os.listdir(tasks_dir) if name.endswith(".json"))
+    except FileNotFoundError:
+        return 0
+
+
+def live_workers(queue_dir, max_age):
+    """Return ids of workers whose heartbeat is younger than max_age seconds"""
+    workers_dir = os.path.join(queue_dir, "workers")
+    if not os.path.isdir(workers_dir):
+        return []
+    now = time.time()
+    alive = []
+    for name in os.listdir(workers_dir):
+        try:
+            if now - os.path.getmtime(os.path.join(workers_dir, name)) < max_age:
+                alive.append(name)
+        except FileNotFoundError:
+            continue
+    return alive
+
+
+def _load_renderer(spec):
+    module_name, func_name = spec.split(":")
+    return getattr(importlib.import_module(module_name), func_name)
+
+
+def run_task(queue_dir, job_id, task, worker_id, render_fn=None):
+    """Render one claimed task and record the result. Never raises."""
+    job_dir = _job_dir(queue_dir, job_id)
+    t0 = time.time()
+    try:
+        job = _read_json(os.path.join(job_dir, "job.json"))
+        if render_fn is None:
+            render_fn = _load_renderer(job["renderer"])
+        output_dir = job.get("output_dir") or os.path.join(job_dir, "frames")
+        frame = render_fn(job["params"], task, output_dir)
+        finish_task(queue_dir, job_id, task, "ok", frame=frame,
+                    worker_id=worker_id, elapsed=time.time() - t0)
+    except Exception as e:
+        if not os.path.isdir(job_dir):
+            # Job was cancelled and removed while we were working on it
+            return
+        traceback.print_exc()
+        try:
+            finish_task(queue_dir, job_id, task, "error", error=str(e),
+                        worker_id=worker_id, elapsed=time.time() - t0)
+        except OSError:
+            pass
+
+
+def _heartbeat_loop(path, stop_event):
+    while not stop_event.is_set():
+        try:
+            with open(path, "a"):
+                os.utime(path, None)
+        except OSError:
+            pass
+        stop_event.wait(HEARTBEAT_INTERVAL)
+
+
+def run_worker(queue_dir, job_id=None, exit_when_idle=False, poll_interval=1.0,
+               worker_id=None):
+    """
+    Pull and render tasks until stopped.
+
+    With job_id set, only tasks of that job are taken. With exit_when_idle the
+    worker returns as soon as no pending task is left (used for the local
+    fallback workers started by the backend).
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    workers_dir = os.path.join(queue_dir, "workers")
+    os.makedirs(workers_dir, exist_ok=True)
+    heartbeat_path = os.path.join(workers_dir, worker_id)
+    stop_event = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(heartbeat_path, stop_event), daemon=True)
+    heartbeat.start()
+    print(f"Worker {worker_id} polling {queue_dir}")
+    n_done = 0
+    try:
+        while True:
+            claimed = claim_task(queue_dir, job_id)
+            if claimed is None:
+                if exit_when_idle:
+                    break
+                time.sleep(poll_interval)
+                continue
+            jid, task = claimed
+            run_task(queue_dir, jid, task, worker_id)
+            n_done += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_event.set()
+        try:
+            os.unlink(heartbeat_path)
+        except FileNotFoundError:
+            pass
+    print(f"Worker {worker_id} finished after {n_done} tasks")
+    return n_done
+
+
+def _run_local_worker(niceness=0, **kwargs):
+    if niceness:
+        try:
+            os.nice(niceness)
+        except OSError as e:
+            print(f"Warning: Could not lower the priority of export worker {os.getpid()}: {e}")
+    run_worker(**kwargs)
+
+
+def start_local_workers(queue_dir, job_id, n_workers, niceness=0):
+    """
+    Start n_workers fresh processes that work on job_id and exit once it is drained.
+    The processes run with their nice value raised by niceness, so they yield CPU to
+    interactive renders in the backend process.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    processes = []
+    for i in range(n_workers):
+        p = ctx.Process(
+            target=_run_local_worker,
+            kwargs={"queue_dir": queue_dir, "job_id": job_id, "exit_when_idle": True, "niceness": niceness,
+                    "worker_id": f"{socket.gethostname()}-{os.getpid()}-local{i}"},
+            daemon=True,
+        )
+        p.start()
+        processes.append(p)
+    return processes
+
+
+def wait_for_job(queue_dir, job_id, n_tasks, poll_interval=1.0, task_timeout=1800.0,
+                 local_workers=(), render_fn=None, on_progress=None):
+    """
+    Block until all n_tasks of a job have a result and return {idx: result}.
+    on_progress(results, n_tasks) is called whenever new results have arrived.
+
+    Stale claims are requeued. If no worker is left alive (local processes exited
+    or crashed and no remote worker is polling), the calling process renders the
+    remaining tasks itself with render_fn, so a job always completes.
+    """
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-inline"
+    n_reported = -1
+    while True:
+        results = job_results(queue_dir, job_id)
+        if len(results) != n_reported:
+            n_reported = len(results)
+            if on_progress is not None:
+                on_progress(results, n_tasks)
+        if n_reported >= n_tasks:
+            return results
+        requeue_stale_tasks(queue_dir, job_id, task_timeout)
+        local_alive = any(p.is_alive() for p in local_workers)
+        if not local_alive and pending_count(queue_dir, job_id) > 0 and \
+                not live_workers(queue_dir, 3 * HEARTBEAT_INTERVAL):
+            claimed = claim_task(queue_dir, job_id)
+            if claimed is not None:
+                run_task(queue_dir, job_id, claimed[1], worker_id, render_fn=render_fn)
+                continue
+        time.sleep(poll_interval)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Render queue worker for QUOKKA Viz Tool exports")
+    sub = parser.add_subparsers(dest="command", required=True)
+    worker = sub.add_parser("worker", help="Pull and render frame tasks from a shared queue directory")
+    worker.add_argument("--queue-dir", type=str, default=None,
+                        help="Queue directory shared with the backend. Default: render_queue_dir from config.yaml")
+    worker.add_argument("-j", "--n_processes", type=int, default=1,
+                        help="Number of worker processes to run on this node. Default: 1")
+    worker.add_argument("--poll_interval", type=float, default=1.0,
+                        help="Seconds between polls when the queue is empty. Default: 1.0")
+    return parser.parse_args()
+
+
+def main(args):
+    queue_dir = args.queue_dir
+    if queue_dir is None:
+        from settings import get_settings
+        queue_dir = get_settings().queue_dir()
+    os.makedirs(queue_dir, exist_ok=True)
+    if args.n_processes == 1:
+        run_worker(queue_dir, poll_interval=args.poll_interval)
+        return
+    ctx = multiprocessing.get_context("spawn")
+    processes = [ctx.Process(target=run_worker, args=(queue_dir,),
+                             kwargs={"poll_interval": args.poll_interval})
+                 for _ in range(args.n_processes)]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        for p in processes:
+            p.join()
+
+
+if __name__ == "__main__":
+    main(parse_args())
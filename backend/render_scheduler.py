@@ -0,0 +1,139 @@
+"""
+Priority scheduling of renders in the backend process.
+
+Every render takes a slot from a RenderScheduler for its duration. There are
+`slots` slots; when one frees up, it goes to the highest waiting priority class
+
+    INTERACTIVE  views requested by the user (/api/slice, current-frame export)
+    PREFETCH     frames requested ahead of time (/api/slice?prefetch=true)
+    BATCH        animation export frames
+
+and, within a class, to the client with the fewest renders running in that class
+(then the longest waiting request), so one client's long export cannot starve
+other clients. Batch work takes one slot per frame, so it yields to interactive
+requests between frames, and it never holds more than `batch_slots` slots at once,
+leaving room for interactive renders to start right away. Each class has a bounded
+queue: requests beyond it are refused with QueueFull instead of piling up.
+
+Running renders are not interrupted: a slow render keeps its slot until it finishes.
+"""
+
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+INTERACTIVE, PREFETCH, BATCH = 0, 1, 2
+CLASS_NAMES = ("interactive", "prefetch", "batch")
+
+# Recent wait times kept per class for the statistics
+WAIT_HISTORY = 200
+
+
+class QueueFull(Exception):
+    """The queue of a priority class is full"""
+
+
+class _Ticket:
+    __slots__ = ("priority", "client", "seq", "enqueued")
+
+    def __init__(self, priority, client, seq):
+        self.priority = priority
+        self.client = client
+        self.seq = seq
+        self.enqueued = time.time()
+
+
+class RenderScheduler:
+
+    def __init__(self, slots=2, max_queued=64, batch_slots=None):
+        self.slots = max(1, slots)
+        # By default batch work leaves one slot free for interactive requests
+        self.batch_slots = batch_slots if batch_slots is not None else max(1, self.slots - 1)
+        self.max_queued = max_queued
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting = [[] for _ in CLASS_NAMES]  # tickets in arrival order
+        self._running = [{} for _ in CLASS_NAMES]  # client -> number of running renders
+        self._waits = [deque(maxlen=WAIT_HISTORY) for _ in CLASS_NAMES]
+        self._granted = [0 for _ in CLASS_NAMES]
+        self._rejected = [0 for _ in CLASS_NAMES]
+
+    def _n_running(self, priority=None):
+        classes = self._running if priority is None else [self._running[priority]]
+        return sum(sum(clients.values()) for clients in classes)
+
+    def _next(self):
+        # Ticket that gets the next free slot, or None if nothing may start now
+        if self._n_running() >= self.slots:
+            return None
+        for priority, waiting in enumerate(self._waiting):
+            if not waiting:
+                continue
+            if priority == BATCH and self._n_running(BATCH) >= self.batch_slots:
+                return None
+            running = self._running[priority]
+            return min(waiting, key=lambda t: (running.get(t.client, 0), t.seq))
+        return None
+
+    @contextmanager
+    def slot(self, priority=INTERACTIVE, client="local"):
+        """Hold a render slot for the duration of the with-block (QueueFull if the class queue is full)"""
+        with self._cond:
+            waiting = self._waiting[priority]
+            if self.max_queued and len(waiting) >= self.max_queued:
+                self._rejected[priority] += 1
+                raise QueueFull(f"Too many {CLASS_NAMES[priority]} renders queued ({len(waiting)}); try again later")
+            ticket = _Ticket(priority, client, next(self._seq))
+            waiting.append(ticket)
+            try:
+                while self._next() is not ticket:
+                    self._cond.wait()
+            except BaseException:
+                waiting.remove(ticket)
+                self._cond.notify_all()
+                raise
+            waiting.remove(ticket)
+            running = self._running[priority]
+            running[client] = running.get(client, 0) + 1
+            self._granted[priority] += 1
+            self._waits[priority].append(time.time() - ticket.enqueued)
+            # Another slot may still be free for the next ticket
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                running[client] -= 1
+                if not running[client]:
+                    del running[client]
+                self._cond.notify_all()
+
+    def stats(self):
+        """Queue depths, running renders and recent wait times per class and per client"""
+        now = time.time()
+        with self._cond:
+            classes = {}
+            clients = {}
+            for priority, name in enumerate(CLASS_NAMES):
+                waits = sorted(self._waits[priority])
+                waiting = self._waiting[priority]
+                classes[name] = {
+                    "running": self._n_running(priority),
+                    "queued": len(waiting),
+                    "oldest_queued_s": max((now - t.enqueued for t in waiting), default=0.0),
+                    "granted": self._granted[priority],
+                    "rejected": self._rejected[priority],
+                    "wait_mean_s": sum(waits) / len(waits) if waits else 0.0,
+                    "wait_p95_s": waits[int(0.95 * (len(waits) - 1))] if waits else 0.0,
+                    "wait_max_s": waits[-1] if waits else 0.0,
+                }
+                for client, n in self._running[priority].items():
+                    clients.setdefault(client, {c: {"running": 0, "queued": 0} for c in CLASS_NAMES})
+                    clients[client][name]["running"] += n
+                for ticket in waiting:
+                    clients.setdefault(ticket.client, {c: {"running": 0, "queued": 0} for c in CLASS_NAMES})
+                    clients[ticket.client][name]["queued"] += 1
+            return {"slots": self.slots, "batch_slots": self.batch_slots, "max_queued": self.max_queued,
+                    "classes": classes, "clients": clients}
@@ -0,0 +1,202 @@
+"""
+Backend settings loaded from config.yaml.
+
+config.yaml is parsed once and validated against the ``Settings`` schema.
+Afterwards the file is only stat'ed (at most once every
+``config_check_interval`` seconds) and re-parsed when its modification time
+changes, so request handlers can call ``get_settings()`` as often as they like
+without touching the (possibly network) filesystem on every call.
+
+Settings that size process-wide structures at import time (e.g.
+``cache_max_size``) only take effect after a backend restart.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from typing import List, Literal, Optional
+
+import yaml
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.yaml")
+
+
+class Settings(BaseModel):
+    """Typed view of config.yaml. Every key is optional and falls back to the default below."""
+
+    model_config = ConfigDict(frozen=True, extra="ignore")
+
+    # Figure appearance
+    short_size: float = Field(3.6, gt=0)
+    font_size: int = Field(20, gt=0)
+    scale_bar_height_fraction: float = Field(15, gt=0)
+    colormap_fraction: float = Field(0.1, gt=0)
+    default_dpi: int = Field(300, gt=0, le=1000)
+    show_axes: bool = False
+
+    # Volume rendering
+    use_perspective_camera: bool = True
+
+    # Particles
+    particle_types: List[str] = ["Rad", "CIC", "CICRad", "StochasticStellarPop", "Sink"]
+    default_particle_size: int = Field(10, gt=0)
+
+    # Particle images (kind="part", see particle_deposit.py)
+    particle_deposit_method: Literal["ngp", "cic"] = "ngp"  # 2D histogram or cloud-in-cell
+    particle_deposit_chunk_size: int = Field(4_000_000, gt=0)  # particles binned at a time
+
+    # Caches
+    cache_max_size: int = Field(32, ge=0)  # in-memory rendered images (restart required)
+    particle_cache_max_mb: float = Field(1024.0, ge=0)  # particle positions for overlays (0 = no caching)
+    profile_cache_size: int = Field(64, ge=0)  # binned profiles/phase plots kept in memory (restart required)
+    frb_cache_size: int = Field(32, ge=0)  # fixed-resolution buffers for comparisons (restart required)
+    compare_dataset_cache_size: int = Field(4, ge=0)  # datasets kept open for comparisons and other snapshots' renders (restart required)
+    off_axis_plane_cache_size: int = Field(8, ge=0)  # cutting planes (with their field values) for off-axis slices
+    transfer_function_cache_size: int = Field(32, ge=0)  # volume-rendering transfer functions (see lut_registry.py)
+    render_cache_max_mb: float = Field(2048.0, ge=0)  # rendered images on disk, shared with quick_plot (0 = off)
+    render_cache_dir: Optional[str] = None  # default: ~/.cache/quokka-vis-tool/renders
+    field_precision: Literal["float64", "float32"] = "float64"  # dtype of cached FRBs and particle data (yt reads stay float64)
+
+    # Animation export task queue (see render_queue.py)
+    render_queue_dir: Optional[str] = None  # shared directory; default: <system tmp>/quokka-vis-tool-queue
+    export_local_workers: int = Field(4, ge=0)  # local worker processes when no remote worker is polling (0 = in the backend process)
+    render_queue_poll_interval: float = Field(0.5, gt=0)  # seconds
+    render_task_timeout: float = Field(1800.0, gt=0)  # seconds before a claimed frame is handed to another worker
+
+    # Render scheduling (see render_scheduler.py)
+    render_slots: int = Field(2, ge=1)  # renders running at once in the backend process (restart required)
+    render_max_queued: int = Field(64, ge=0)  # waiting renders per priority class before 503 (0 = unbounded, restart required)
+    export_worker_niceness: int = Field(10, ge=0)  # added to the nice value of local export worker processes
+
+    # Memory admission control (see render_memory.py)
+    render_memory_budget_mb: Optional[float] = Field(None, ge=0)  # default: half of physical memory; 0 = no limit (restart required)
+    render_memory_downgrade: bool = True  # interactive volume renders above the budget are rendered as previews
+
+    # Persistent animation exports (see export_manifest.py)
+    export_cache_dir: Optional[str] = None  # default: ~/.cache/quokka-vis-tool/exports
+    export_cache_max_age_days: float = Field(30.0, ge=0)  # remove exports unused for this long (0 = keep forever)
+
+    # GIF/MP4 encoding for animation exports (see video_encoder.py)
+    encoder_timeout_base: float = Field(60.0, gt=0)  # seconds
+    encoder_timeout_per_frame: float = Field(2.0, ge=0)  # additional seconds per frame
+
+    # Zoomed views (width_value/width_unit set, see region_views.py)
+    region_margin: float = Field(0.25, ge=0)  # fraction of the width read beyond each side of the window
+    region_view_cache_size: int = Field(8, ge=0)  # zoomed slices/projections kept with the data they have read
+
+    # Off-axis slices and projections (axis="off", see offaxis.py)
+    off_axis_angle_step: float = Field(2.0, ge=0)  # degrees; camera angles are snapped to this grid (0 = exact)
+
+    # Volume rendering (see volume_quality.py, parallel_volume.py)
+    volume_latency_budget: float = Field(1.0, gt=0)  # seconds for interactive (preview) renders
+    volume_render_workers: int = Field(0, ge=0)  # ray-casting threads per render (0 = all cores, 1 = serial)
+    transfer_function_dir: Optional[str] = None  # saved custom transfer functions; default: ~/.cache/quokka-vis-tool/transfer_functions
+
+    # Snapshot comparison (/api/compare, see compare.py)
+    compare_resolution: int = Field(800, ge=16)  # FRB pixels along the long side
+
+    # Interpolated animation frames (see interpolation.py)
+    interpolation_resolution: int = Field(1024, ge=16)  # FRB pixels along the long side of blended frames
+
+    # Metadata catalog and time series (see catalog.py, timeseries.py)
+    catalog_path: Optional[str] = None  # SQLite file; default: ~/.cache/quokka-vis-tool/catalog.sqlite
+    timeseries_processes: int = Field(4, ge=1)  # worker processes for reducing snapshots
+
+    # Persisted grid indexes (see index_cache.py)
+    index_cache: bool = True  # reuse the grid hierarchy of plotfiles loaded before (picked up at startup)
+    index_cache_dir: Optional[str] = None  # sidecar files; default: ~/.cache/quokka-vis-tool/index
+    index_cache_min_grids: int = Field(1000, ge=0)  # only plotfiles with at least this many grids get a sidecar
+
+    # Lite snapshots for previews and thumbnails (see lite_snapshot.py)
+    lite_dir: Optional[str] = None  # coarsened float32 copies; default: ~/.cache/quokka-vis-tool/lite
+    lite_fields: List[str] = ["density", "temperature"]  # fields kept in lite copies
+    lite_max_cells: int = Field(256, ge=8)  # cells along the longest side of a lite copy
+    lite_max_level: Optional[int] = Field(None, ge=0)  # finest AMR level used (None = as fine as max_cells allows)
+    lite_previews: bool = True  # render previews from lite copies when available
+    lite_cache_size: int = Field(4, ge=0)  # lite copies kept in memory (restart required)
+    lite_processes: int = Field(2, ge=1)  # worker processes writing lite copies from /api/lite
+
+    # Config reloading
+    config_check_interval: float = Field(2.0, ge=0)  # seconds between mtime checks
+
+    def queue_dir(self) -> str:
+        if self.render_queue_dir:
+            return os.path.expanduser(self.render_queue_dir)
+        return os.path.join(tempfile.gettempdir(), "quokka-vis-tool-queue")
+
+    def export_dir(self) -> str:
+        return os.path.expanduser(self.export_cache_dir or "~/.cache/quokka-vis-tool/exports")
+
+    def transfer_functions_dir(self) -> str:
+        return os.path.expanduser(self.transfer_function_dir or "~/.cache/quokka-vis-tool/transfer_functions")
+
+    def render_cache_path(self) -> str:
+        return os.path.expanduser(self.render_cache_dir or "~/.cache/quokka-vis-tool/renders")
+
+    def lite_snapshot_dir(self) -> str:
+        return os.path.expanduser(self.lite_dir or "~/.cache/quokka-vis-tool/lite")
+
+    def index_dir(self) -> str:
+        return os.path.expanduser(self.index_cache_dir or "~/.cache/quokka-vis-tool/index")
+
+    def catalog_file(self) -> str:
+        return os.path.expanduser(self.catalog_path or "~/.cache/quokka-vis-tool/catalog.sqlite")
+
+
+_lock = threading.Lock()
+_settings: Optional[Settings] = None
+_mtime: Optional[float] = None
+_last_check = 0.0
+
+
+def _read_settings(path):
+    with open(path, "r") as f:
+        data = yaml.safe_load(f) or {}
+    if not isinstance(data, dict):
+        raise ValueError(f"{path} must contain a mapping, got {type(data).__name__}")
+    unknown = sorted(set(data) - set(Settings.model_fields))
+    if unknown:
+        print(f"Warning: Unknown keys in {path} are ignored: {unknown}")
+    return Settings(**data)
+
+
+def get_settings(path: str = CONFIG_PATH) -> Settings:
+    """
+    Return the current settings, re-reading config.yaml only if it changed.
+
+    An invalid or unreadable config file never raises: the last valid settings
+    (or the built-in defaults on first load) are kept and a warning is printed.
+    """
+    global _settings, _mtime, _last_check
+
+    now = time.monotonic()
+    if _settings is not None and now - _last_check < _settings.config_check_interval:
+        return _settings
+
+    with _lock:
+        _last_check = now
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError as e:
+            if _settings is None:
+                print(f"Warning: Could not read {path}, using defaults: {e}")
+                _settings = Settings()
+            return _settings
+
+        if _settings is not None and mtime == _mtime:
+            return _settings
+
+        try:
+            new_settings = _read_settings(path)
+        except (OSError, yaml.YAMLError, ValueError, ValidationError) as e:
+            print(f"Warning: Invalid config {path}, keeping previous settings: {e}")
+            if _settings is None:
+                _settings = Settings()
+        else:
+            if _settings is not None:
+                print(f"Reloaded config from {path}")
+            _settings = new_settings
+        _mtime = mtime
+        return _settings
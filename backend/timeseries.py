@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""
+Scalar reductions over a range of snapshots (time series).
+
+A quantity is "<op>:<field>" with op one of
+    max, min        extrema over all leaf cells
+    integral        volume integral, e.g. integral:density is the total mass
+    mean            volume-weighted average
+    mass_mean       mass-weighted average
+or one of the names in PRESETS (e.g. max_density, total_mass, mass_weighted_temperature).
+
+Each snapshot is reduced in a single streaming pass over its grids (yt "io"
+chunks), computing all requested quantities at once, and snapshots are spread
+over a process pool. Results are stored in the metadata catalog (catalog.py) as
+they arrive, so a later call only computes quantities of new or rewritten
+snapshots.
+
+Command line:
+    python timeseries.py plt* -q max_density total_mass -j 8 --csv ts.csv --plot ts.png
+"""
+
+import argparse
+import csv
+import io
+import multiprocessing
+import os
+import traceback
+
+import numpy as np
+
+from catalog import Catalog
+from export_manifest import source_mtime
+import index_cache
+
+OPS = ("max", "min", "integral", "mean", "mass_mean")
+
+PRESETS = {
+    "max_density": "max:density",
+    "min_density": "min:density",
+    "total_mass": "integral:density",
+    "max_temperature": "max:temperature",
+    "mass_weighted_temperature": "mass_mean:temperature",
+    "volume_weighted_temperature": "mean:temperature",
+}
+
+TIME_UNIT = "Myr"
+
+
+def parse_quantity(quantity):
+    """Return (op, field name) for a quantity name or "<op>:<field>" spec"""
+    spec = PRESETS.get(quantity, quantity)
+    op, sep, field = spec.partition(":")
+    if not sep or op not in OPS or not field:
+        raise ValueError(f"Unknown quantity: {quantity}. Use one of {sorted(PRESETS)} or '<op>:<field>' "
+                         f"with op in {OPS}")
+    return op, field
+
+
+def _field_tuple(field):
+    if field == "cell_volume":
+        return ("index", "cell_volume")
+    return ("gas", field)
+
+
+def reduce_snapshot(plotfile_dir, quantities, setup_fields=None):
+    """
+    Compute quantities for one snapshot in a single pass over its grids.
+    Returns (current_time in s, {quantity: (value, units)}).
+    setup_fields(ds) is called after loading, e.g. to add derived fields.
+    """
+    import yt
+
+    ds = yt.load(plotfile_dir)
+    if setup_fields is not None:
+        setup_fields(ds)
+    parsed = {q: parse_quantity(q) for q in quantities}
+    fields = sorted({f for _, f in parsed.values()})
+    need_volume = any(op in ("integral", "mean") for op, _ in parsed.values())
+    need_mass = any(op == "mass_mean" for op, _ in parsed.values())
+
+    # Running reductions: max/min, sum(f * V), sum(f * m), sum(V), sum(m)
+    acc = {q: (-np.inf if op == "max" else np.inf if op == "min" else 0.0) for q, (op, _) in parsed.items()}
+    units = {}
+    total_volume = total_mass = 0.0
+    volume_units = None
+    ad = ds.all_data()
+    for chunk in ad.chunks([], "io"):
+        values = {f: chunk[_field_tuple(f)] for f in fields}
+        if any(len(v) == 0 for v in values.values()):
+            continue
+        if need_volume or need_mass:
+            volume = chunk[("index", "cell_volume")].in_cgs()
+            volume_units = volume.units
+            volume = volume.d
+            total_volume += volume.sum()
+        if need_mass:
+            mass = chunk[("gas", "density")].in_cgs().d * volume
+            total_mass += mass.sum()
+        for q, (op, f) in parsed.items():
+            v = values[f]
+            units.setdefault(f, v.units)
+            v = v.to(units[f]).d
+            if op == "max":
+                acc[q] = max(acc[q], v.max())
+            elif op == "min":
+                acc[q] = min(acc[q], v.min())
+            elif op in ("integral", "mean"):
+                acc[q] += (v * volume).sum()
+            else:
+                acc[q] += (v * mass).sum()
+
+    results = {}
+    for q, (op, f) in parsed.items():
+        value = acc[q]
+        unit = str(units.get(f, ""))
+        if op == "integral":
+            unit = str(units[f] * volume_units) if f in units else ""
+        elif op == "mean":
+            value = value / total_volume if total_volume else float("nan")
+        elif op == "mass_mean":
+            value = value / total_mass if total_mass else float("nan")
+        results[q] = (float(value), unit)
+    return float(ds.current_time.in_cgs().d), results
+
+
+def _reduce_task(task):
+    # Runs in pool workers; errors are returned so one bad snapshot doesn't stop the series
+    plotfile_dir, quantities, mtime, setup_fields = task
+    try:
+        current_time, values = reduce_snapshot(plotfile_dir, quantities, setup_fields)
+        return plotfile_dir, mtime, current_time, values, None
+    except Exception as e:
+        traceback.print_exc()
+        return plotfile_dir, mtime, None, {}, str(e)
+
+
+def compute_timeseries(plotfile_dirs, quantities, catalog, n_processes=1, setup_fields=None,
+                       refresh=False, on_result=None):
+    """
+    Time series of quantities over plotfile_dirs, using and filling the catalog.
+
+    Returns (rows, info): one row per snapshot with "dataset", "time" (s) and a
+    (value, units) pair per quantity, sorted by time; info counts computed and cached
+    snapshots and lists errors. on_result(plotfile_dir) is called as snapshots finish.
+    """
+    for q in quantities:
+        parse_quantity(q)
+
+    rows = {}
+    tasks = []
+    for plotfile_dir in plotfile_dirs:
+        current_time, cached = (None, {}) if refresh else catalog.get_quantities(plotfile_dir, quantities)
+        missing = [q for q in quantities if q not in cached]
+        if current_time is not None and not missing:
+            rows[plotfile_dir] = (current_time, cached)
+        else:
+            # The snapshot is read anyway, so recompute everything for it
+            tasks.append((plotfile_dir, list(quantities), source_mtime(plotfile_dir), setup_fields))
+    n_cached = len(rows)
+
+    errors = {}
+
+    def collect(result):
+        plotfile_dir, mtime, current_time, values, error = result
+        if error is not None:
+            errors[os.path.basename(plotfile_dir)] = error
+        else:
+            catalog.put_quantities(plotfile_dir, current_time, values, mtime=mtime)
+            rows[plotfile_dir] = (current_time, values)
+        if on_result is not None:
+            on_result(plotfile_dir)
+
+    n_processes = min(n_processes, len(tasks))
+    if n_processes > 1:
+        # spawn: safe to start from the threaded web server
+        with multiprocessing.get_context("spawn").Pool(n_processes, initializer=index_cache.install_from_settings) as pool:
+            for result in pool.imap_unordered(_reduce_task, tasks):
+                collect(result)
+    else:
+        for task in tasks:
+            collect(_reduce_task(task))
+
+    series = []
+    for plotfile_dir, (current_time, values) in sorted(rows.items(), key=lambda item: item[1][0]):
+        row = {"dataset": os.path.basename(plotfile_dir), "time": current_time}
+        row.update({q: values.get(q, (None, None)) for q in quantities})
+        series.append(row)
+    return series, {"computed": len(tasks) - len(errors), "cached": n_cached, "errors": errors}
+
+
+def _time_in(seconds, time_unit):
+    import unyt
+    return float(unyt.unyt_quantity(seconds, "s").to(time_unit).d)
+
+
+def to_records(series, quantities, time_unit=TIME_UNIT):
+    """JSON-friendly rows with plain values; units are returned separately"""
+    records = []
+    units = {}
+    for row in series:
+        record = {"dataset": row["dataset"], "time": _time_in(row["time"], time_unit)}
+        for q in quantities:
+            value, unit = row[q]
+            record[q] = value
+            if unit is not None:
+                units[q] = unit
+        records.append(record)
+    return records, units
+
+
+def to_csv(series, quantities, time_unit=TIME_UNIT):
+    records, units = to_records(series, quantities, time_unit)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(["dataset", f"time [{time_unit}]"] + [f"{q} [{units.get(q, '')}]" for q in quantities])
+    for record in records:
+        writer.writerow([record["dataset"], record["time"]] + [record[q] for q in quantities])
+    return buf.getvalue()
+
+
+def plot_timeseries(series, quantities, time_unit=TIME_UNIT, dpi=150):
+    """PNG bytes with one panel per quantity"""
+    from matplotlib.figure import Figure
+
+    records, units = to_records(series, quantities, time_unit)
+    times = [r["time"] for r in records]
+    fig = Figure(figsize=(6, 2.2 * len(quantities)))
+    axes = fig.subplots(len(quantities), 1, sharex=True, squeeze=False)[:, 0]
+    for ax, q in zip(axes, quantities):
+        values = np.array([np.nan if r[q] is None else r[q] for r in records], dtype=float)
+        ax.plot(times, values, marker="o", markersize=3)
+        positive = values[np.isfinite(values)]
+        if len(positive) and positive.min() > 0 and positive.max() / positive.min() > 1e3:
+            ax.set_yscale("log")
+        ax.set_ylabel(f"{q}\n[{units.get(q, '')}]")
+    axes[-1].set_xlabel(f"time [{time_unit}]")
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=dpi)
+    return buf.getvalue()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Time series of scalar reductions over QUOKKA snapshots")
+    parser.add_argument("pltdirs", type=str, nargs="+",
+                        help="Plotfile directories, e.g. plt*. Files with .old. in the name will be ignored.")
+    parser.add_argument("-q", "--quantities", type=str, nargs="+", default=["max_density", "total_mass"],
+                        help=f"Quantities: {', '.join(sorted(PRESETS))}, or <op>:<field> with op in "
+                             f"{', '.join(OPS)}. Default: max_density total_mass")
+    parser.add_argument("-j", "--n_processes", type=int, default=1,
+                        help="Number of processes. Default: 1")
+    parser.add_argument("--csv", type=str, default=None, help="Write the series to this CSV file")
+    parser.add_argument("--plot", type=str, default=None, help="Save a plot of the series to this PNG file")
+    parser.add_argument("--time_unit", type=str, default=TIME_UNIT, help=f"Default: {TIME_UNIT}")
+    parser.add_argument("--catalog", type=str, default=None,
+                        help="Catalog database. Default: catalog_path from config.yaml")
+    parser.add_argument("--refresh", action="store_true", help="Recompute cached values")
+    return parser.parse_args()
+
+
+def main(args):
+    from settings import get_settings
+    from main import _add_derived_fields
+
+    pltdirs = sorted(p for p in args.pltdirs if os.path.isdir(p) and ".old." not in os.path.basename(p))
+    catalog = Catalog(args.catalog or get_settings().catalog_file())
+    done = []
+    series, info = compute_timeseries(
+        pltdirs, args.quantities, catalog, n_processes=args.n_processes,
+        setup_fields=_add_derived_fields, refresh=args.refresh,
+        on_result=lambda p: done.append(p) or print(f"[{len(done)}] reduced {os.path.basename(p)}"),
+    )
+    print(f"{info['computed']} snapshots computed, {info['cached']} from the catalog")
+    for name, error in info["errors"].items():
+        print(f"  {name}: {error}")
+    text = to_csv(series, args.quantities, args.time_unit)
+    if args.csv:
+        with open(args.csv, "w") as f:
+            f.write(text)
+        print(f"Saved {args.csv}")
+    else:
+        print(text, end="")
+    if args.plot:
+        with open(args.plot, "wb") as f:
+            f.write(plot_timeseries(series, args.quantities, args.time_unit))
+        print(f"Saved {args.plot}")
+
+
+if __name__ == "__main__":
+    main(parse_args())
@@ -0,0 +1,161 @@
+"""
+Streaming GIF/MP4 encoding for animation exports.
+
+Frames are decoded once and piped as raw RGB into a single long-running ffmpeg
+process that writes the GIF and the MP4 in one pass, while the remaining frames are
+still being rendered. Frames may be handed in out of order (e.g. from several queue
+workers); they are buffered and written in frame order.
+"""
+
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import traceback
+
+from PIL import Image
+
+
+def ffmpeg_available(ffmpeg="ffmpeg"):
+    return shutil.which(ffmpeg) is not None
+
+
+class StreamingEncoder:
+    """
+    Feed frames with add_frame(idx, png_path) / skip_frame(idx) for every index in
+    frame_indices, then call close() to wait for the encoder.
+
+    All frames are padded (or cropped) to the size of the first frame, since
+    bbox_inches="tight" can change the image size by a pixel or two between frames.
+    """
+
+    def __init__(self, frame_indices, fps, gif_path=None, mp4_path=None, ffmpeg="ffmpeg"):
+        self.pending_indices = sorted(frame_indices)
+        self.fps = fps
+        self.gif_path = gif_path
+        self.mp4_path = mp4_path
+        self.ffmpeg = ffmpeg
+        self.n_encoded = 0
+        self.error = None
+        self._ready = {}  # idx -> png path (None for skipped frames)
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._process = None
+        self._size = None
+        self._log = tempfile.TemporaryFile()
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+
+    def add_frame(self, idx, png_path):
+        self._push(idx, png_path)
+
+    def skip_frame(self, idx):
+        self._push(idx, None)
+
+    def _push(self, idx, png_path):
+        # Release frames to the writer thread in order
+        with self._lock:
+            self._ready[idx] = png_path
+            while self.pending_indices and self.pending_indices[0] in self._ready:
+                next_idx = self.pending_indices.pop(0)
+                path = self._ready.pop(next_idx)
+                if path is not None:
+                    self._queue.put(path)
+
+    def _start(self, width, height):
+        filters = []
+        outputs = []
+        if self.gif_path and self.mp4_path:
+            filters.append("[0:v]split=2[g][m]")
+            gif_in, mp4_in = "[g]", "[m]"
+        else:
+            gif_in = mp4_in = "[0:v]"
+        if self.gif_path:
+            # One palette per frame keeps the GIF streaming (a global palette would
+            # make ffmpeg buffer every frame before writing the first one)
+            filters.append(f"{gif_in}split[g1][g2];[g1]palettegen=stats_mode=single[p];"
+                           "[g2][p]paletteuse=new=1[gif]")
+            outputs += ["-map", "[gif]", self.gif_path]
+        if self.mp4_path:
+            # libx264 with yuv420p needs even dimensions
+            filters.append(f"{mp4_in}pad=ceil(iw/2)*2:ceil(ih/2)*2[mp4]")
+            outputs += ["-map", "[mp4]", "-c:v", "libx264", "-pix_fmt", "yuv420p", self.mp4_path]
+        cmd = [
+            self.ffmpeg, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{width}x{height}",
+            "-framerate", str(self.fps), "-i", "pipe:0",
+            "-filter_complex", ";".join(filters),
+        ] + outputs
+        self._process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                                         stderr=self._log)
+
+    def _to_rgb(self, png_path):
+        image = Image.open(png_path).convert("RGB")
+        if self._size is None:
+            self._size = image.size
+        elif image.size != self._size:
+            canvas = Image.new("RGB", self._size, (255, 255, 255))
+            canvas.paste(image, (0, 0))
+            image = canvas
+        return image
+
+    def _writer_loop(self):
+        while True:
+            png_path = self._queue.get()
+            if png_path is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                image = self._to_rgb(png_path)
+                if self._process is None:
+                    self._start(*image.size)
+                self._process.stdin.write(image.tobytes())
+                self.n_encoded += 1
+            except Exception as e:
+                traceback.print_exc()
+                self.error = f"Encoding failed: {e}"
+
+    def close(self, timeout):
+        """
+        Wait up to timeout seconds for the encoder to finish.
+        Returns (gif_path, mp4_path) with None for outputs that were not created.
+        """
+        deadline = time.monotonic() + timeout
+        # Frames that never arrived are treated as skipped
+        self._flush_remaining()
+        self._queue.put(None)
+        self._thread.join(timeout)
+        if self._process is None:
+            return None, None
+        try:
+            self._process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self._process.wait(timeout=max(deadline - time.monotonic(), 1.0))
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+            self.error = f"ffmpeg timed out after {timeout:.0f} s"
+        if self._process.returncode not in (0, None) and self.error is None:
+            self._log.seek(0)
+            self.error = f"ffmpeg failed: {self._log.read().decode(errors='replace')[-2000:]}"
+        self._log.close()
+        if self.error is not None:
+            print(self.error)
+        return tuple(
+            path if path and self.error is None and os.path.exists(path) and os.path.getsize(path) > 0 else None
+            for path in (self.gif_path, self.mp4_path)
+        )
+
+    def _flush_remaining(self):
+        with self._lock:
+            while self.pending_indices:
+                next_idx = self.pending_indices.pop(0)
+                path = self._ready.pop(next_idx, None)
+                if path is not None:
+                    self._queue.put(path)
@@ -0,0 +1,78 @@
+"""
+Quality ladder for volume rendering.
+
+Interactive renders (preview=True, e.g. while the camera is being moved) pick the
+best rung of RUNGS whose predicted render time fits the latency budget; the final
+pass always renders at full quality. Each rung lowers the image size, the number of
+samples per cell, the number of transfer-function layers and the deepest AMR level
+that is traversed.
+
+Render time is predicted from a per-dataset throughput (seconds per unit of work,
+work = pixels * samples per cell * cells crossed by a ray), measured from previous
+renders and smoothed with an exponential moving average. Until a dataset has been
+timed, the cheapest rung is used.
+"""
+
+import os
+import threading
+
+# (image size in pixels, samples per cell, max transfer-function layers, AMR levels below the finest)
+RUNGS = (
+    (128, 1, 3, 2),
+    (256, 2, 4, 1),
+    (384, 4, 6, 1),
+    (512, 6, None, 0),
+)
+
+FINAL_SAMPLES = 10  # yt's default samples per cell
+
+_seconds_per_work = {}
+_lock = threading.Lock()
+
+
+def _work(ds, resolution, num_samples, max_level):
+    # Cells crossed by a ray through the longest side at the deepest level used
+    level = ds.index.max_level if max_level is None else max_level
+    cells = int(max(ds.domain_dimensions)) * int(ds.refine_by) ** level
+    return float(resolution) ** 2 * num_samples * cells
+
+
+def choose(ds, dataset_path, preview, final_resolution, n_layers, budget, max_level_cap=None):
+    """
+    Render parameters {resolution, num_samples, n_layers, max_level} for a volume
+    rendering (max_level None = all levels). Interactive renders traverse no level
+    deeper than max_level_cap (None = no cap).
+    """
+    if not preview:
+        return {"resolution": final_resolution, "num_samples": FINAL_SAMPLES,
+                "n_layers": n_layers, "max_level": None}
+    finest = ds.index.max_level
+    with _lock:
+        rate = _seconds_per_work.get(os.path.abspath(dataset_path))
+    chosen = RUNGS[0]
+    if rate is not None:
+        for rung in reversed(RUNGS):
+            resolution, num_samples, _, levels_below = rung
+            if rate * _work(ds, min(resolution, final_resolution), num_samples,
+                            max(finest - levels_below, 0)) <= budget:
+                chosen = rung
+                break
+    resolution, num_samples, max_layers, levels_below = chosen
+    max_level = max(finest - levels_below, 0) if levels_below else None
+    if max_level_cap is not None and (max_level is None or max_level > max_level_cap):
+        max_level = max_level_cap
+    return {
+        "resolution": min(resolution, final_resolution),
+        "num_samples": num_samples,
+        "n_layers": n_layers if max_layers is None else min(n_layers, max_layers),
+        "max_level": max_level,
+    }
+
+
+def record(ds, dataset_path, params, seconds):
+    """Update the throughput estimate of a dataset after a render took seconds"""
+    rate = seconds / _work(ds, params["resolution"], params["num_samples"], params["max_level"])
+    key = os.path.abspath(dataset_path)
+    with _lock:
+        previous = _seconds_per_work.get(key)
+        _seconds_per_work[key] = rate if previous is None else 0.5 * previous + 0.5 * rate
@@ -48,12 +48,16 @@ function App() {
   const [fieldUnit, setFieldUnit] = useState('');
   const [particles, setParticles] = useState([]);  // Changed to array
   const [particleTypes, setParticleTypes] = useState([]);  // Available particle types
+  const [transferFunctions, setTransferFunctions] = useState([]);  // Saved custom transfer functions
   const [particleSize, setParticleSize] = useState(10);  // Particle marker size
   const [particleColor, setParticleColor] = useState('red');  // Particle color
   const [grids, setGrids] = useState(false);
   const [timestamp, setTimestamp] = useState(false);
   const [topLeftText, setTopLeftText] = useState('');
   const [topRightText, setTopRightText] = useState('');
+  // Compare mode: dataset to compare the current one with ('' = off)
+  const [compareDataset, setCompareDataset] = useState('');
+  const [compareMode, setCompareMode] = useState('side');
 
   // 3D Rendering state
   const [cameraTheta, setCameraTheta] = useState(0.0);
@@ -96,6 +100,7 @@ function App() {
     fetchServerInfo();
     fetchDatasets();
     fetchParticleTypes();
+    fetchTransferFunctions();
   }, []);
 
   const fetchServerInfo = async () => {
@@ -125,6 +130,17 @@ function App() {
     }
   };
 
+  const fetchTransferFunctions = async () => {
+    try {
+      const res = await fetch('/api/transfer_functions');
+      const data = await res.json();
+      setTransferFunctions(data.transfer_functions || []);
+    } catch (err) {
+      console.error("Failed to fetch transfer functions:", err);
+      setTransferFunctions([]);
+    }
+  };
+
   const testPath = async (pathToTest) => {
     console.log("========================================");
     console.log("Testing path:", pathToTest);
@@ -338,7 +354,7 @@ function App() {
       setExportProgress('Exporting current frame...');
 
       // Build URL with all current settings
-      let url = `/api/export/current_frame?axis=${axis}&field=${field}&kind=${appliedPlotType}&log_scale=${logScale}&cmap=${cmap}&dpi=${appliedDpi || 300}&show_colorbar=${showColorbar}&show_scale_bar=${showScaleBar}`;
+      let url = `/api/export/current_frame?axis=${axis}&field=${field}&kind=${appliedPlotType}&log_scale=${logScale}&cmap=${encodeURIComponent(cmap)}&dpi=${appliedDpi || 300}&show_colorbar=${showColorbar}&show_scale_bar=${showScaleBar}`;
       
       if (appliedWeightField && appliedWeightField !== 'None') url += `&weight_field=${appliedWeightField}`;
       if (appliedVmin) url += `&vmin=${appliedVmin}`;
@@ -364,6 +380,8 @@ function App() {
         url += `&n_layers=${appliedNLayers}&alpha_min=${appliedAlphaMin}&alpha_max=${appliedAlphaMax}`;
         url += `&grey_opacity=${appliedGreyOpacity}`;
         url += `&show_box_frame=${appliedShowBoxFrame}`;
+      } else if (axis === 'off') {
+        url += `&camera_theta=${appliedCameraTheta}&camera_phi=${appliedCameraPhi}`;
       }
 
       const response = await fetch(url);
@@ -567,7 +585,14 @@ Full details in browser console (F12)`;
               <button onClick={fetchDatasets} style={{ padding: '0.3rem 0.6rem', fontSize: '0.85rem' }}>Filter</button>
             </div>
           </div>
-          {datasetInfo && <span className="dataset-info">Loaded: {currentDataset}</span>}
+          {datasetInfo && (
+            <span className="dataset-info">
+              Loaded: {currentDataset}
+              {datasetInfo.time !== undefined && ` | t = ${Number(datasetInfo.time).toExponential(3)}`}
+              {datasetInfo.domain_dimensions && ` | ${datasetInfo.domain_dimensions.join('x')}`}
+              {datasetInfo.boxes_per_level && ` | ${datasetInfo.boxes_per_level.length} levels, ${datasetInfo.boxes_per_level.reduce((a, b) => a + b, 0)} boxes`}
+            </span>
+          )}
         </div>
         <Controls 
           axis={axis} setAxis={setAxis}
@@ -596,6 +621,7 @@ Full details in browser console (F12)`;
           setColorbarOrientation={setColorbarOrientation}
           cmap={cmap}
           setCmap={setCmap}
+          transferFunctions={transferFunctions}
           dpi={dpi}
           setDpi={setDpi}
           showScaleBar={showScaleBar}
@@ -618,6 +644,8 @@ Full details in browser console (F12)`;
           timestamp={timestamp} setTimestamp={setTimestamp}
           topLeftText={topLeftText} setTopLeftText={setTopLeftText}
           topRightText={topRightText} setTopRightText={setTopRightText}
+          compareDataset={compareDataset} setCompareDataset={setCompareDataset}
+          compareMode={compareMode} setCompareMode={setCompareMode}
           // 3D props
           cameraTheta={cameraTheta} setCameraTheta={setCameraTheta}
           cameraPhi={cameraPhi} setCameraPhi={setCameraPhi}
@@ -667,6 +695,8 @@ Full details in browser console (F12)`;
           timestamp={timestamp}
           topLeftText={appliedTopLeftText}
           topRightText={appliedTopRightText}
+          compareDataset={compareDataset}
+          compareMode={compareMode}
           // 3D props
           cameraTheta={appliedCameraTheta}
           cameraPhi={appliedCameraPhi}
@@ -677,6 +707,7 @@ Full details in browser console (F12)`;
           previewMode={appliedPreviewMode}
           showBoxFrame={appliedShowBoxFrame}
           useCache={useCache}
+          dataset={currentDataset}
         />
       </div>
     </div>
@@ -16,6 +16,7 @@ function Controls({
   colorbarLabel, setColorbarLabel,
   colorbarOrientation, setColorbarOrientation,
   cmap, setCmap,
+  transferFunctions,
   dpi, setDpi, 
   showScaleBar, setShowScaleBar,
   scaleBarSize, setScaleBarSize,
@@ -34,6 +35,8 @@ function Controls({
   timestamp, setTimestamp,
   topLeftText, setTopLeftText,
   topRightText, setTopRightText,
+  compareDataset, setCompareDataset,
+  compareMode, setCompareMode,
   // 3D props
   cameraTheta, setCameraTheta,
   cameraPhi, setCameraPhi,
@@ -101,6 +104,7 @@ function Controls({
           <option value="slc">Slice</option>
           <option value="prj">Projection</option>
           <option value="vol">Volume Rendering</option>
+          <option value="part">Particles</option>
         </select>
       </div>
 
@@ -156,7 +160,7 @@ function Controls({
                 onChange={(e) => setPreviewMode(e.target.checked)} 
                 style={{ width: 'auto', marginRight: '0.5rem' }} 
               />
-              Preview Mode (Low Res)
+              Preview Only (skip full-quality pass)
             </label>
           </div>
           
@@ -186,15 +190,77 @@ function Controls({
         </div>
       )}
 
+      {(plotType === 'slc' || plotType === 'prj') && (
+        <div className="control-group compact">
+          <label>Compare with:</label>
+          <select value={compareDataset} onChange={(e) => setCompareDataset(e.target.value)}>
+            <option value="">None</option>
+            {datasets.map(d => (
+              <option key={d} value={d}>{d}</option>
+            ))}
+          </select>
+        </div>
+      )}
+
+      {(plotType === 'slc' || plotType === 'prj') && compareDataset && (
+        <div className="control-group compact">
+          <label>Compare Mode:</label>
+          <select value={compareMode} onChange={(e) => setCompareMode(e.target.value)}>
+            <option value="side">Side by Side</option>
+            <option value="diff">Difference (A - B)</option>
+            <option value="ratio">Ratio (A / B)</option>
+          </select>
+        </div>
+      )}
+
+      {plotType === 'part' && (
+        <div className="control-group compact">
+          <label>Weight:</label>
+          <select value={weightField} onChange={(e) => setWeightField(e.target.value)}>
+            <option value="None">Mass</option>
+            <option value="luminosity">Luminosity</option>
+            <option value="count">Number</option>
+          </select>
+        </div>
+      )}
+
       <div className="control-group compact">
         <label>Axis:</label>
         <select value={axis} onChange={(e) => setAxis(e.target.value)}>
           <option value="x">X</option>
           <option value="y">Y</option>
           <option value="z">Z</option>
+          <option value="off">Off-axis</option>
         </select>
       </div>
 
+      {axis === 'off' && (plotType === 'slc' || plotType === 'prj') && (
+        <div className="control-group">
+          <label style={{marginBottom: '0.5rem', display: 'block', fontWeight: 'bold', fontSize: '0.9rem'}}>View Direction:</label>
+          <div style={{ display: 'flex', gap: '0.5rem' }}>
+            <div style={{ flex: 1 }}>
+              <label style={{fontSize: '0.8rem', display: 'block'}}>Theta (Polar)</label>
+              <input type="number" value={cameraTheta} onChange={(e) => setCameraTheta(Number(e.target.value))} min="0" max="180" step="5" style={{width: '100%'}} />
+            </div>
+            <div style={{ flex: 1 }}>
+              <label style={{fontSize: '0.8rem', display: 'block'}}>Phi (Azimuth)</label>
+              <input type="number" value={cameraPhi} onChange={(e) => setCameraPhi(Number(e.target.value))} min="0" max="360" step="5" style={{width: '100%'}} />
+            </div>
+          </div>
+          <div style={{ marginTop: '0.5rem' }}>
+            <label style={{ fontWeight: 'normal', fontSize: '0.9rem', display: 'flex', alignItems: 'center', cursor: 'pointer' }}>
+              <input 
+                type="checkbox" 
+                checked={previewMode} 
+                onChange={(e) => setPreviewMode(e.target.checked)} 
+                style={{ width: 'auto', marginRight: '0.5rem' }} 
+              />
+              Preview Mode (Low Res)
+            </label>
+          </div>
+        </div>
+      )}
+
       <div className="control-group compact">
         <label>Field:</label>
         <select value={field} onChange={(e) => setField(e.target.value)}>
@@ -229,6 +295,13 @@ function Controls({
           <option value="jet">Jet</option>
           <option value="hot">Hot</option>
           <option value="gray">Gray</option>
+          {transferFunctions && transferFunctions.length > 0 && (
+            <optgroup label="Saved transfer functions">
+              {transferFunctions.map(name => (
+                <option key={name} value={`tf:${name}`}>{name}</option>
+              ))}
+            </optgroup>
+          )}
         </select>
       </div>
 
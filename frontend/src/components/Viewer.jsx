@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 
 function Viewer({ 
   axis, field, coord, refreshTrigger, 
@@ -7,12 +7,17 @@ function Viewer({
   dpi,
   // New props
   plotType, weightField, widthValue, widthUnit, fieldUnit, particles, particleSize, particleColor, grids, timestamp, topLeftText, topRightText,
+  compareDataset, compareMode,
   // 3D props
   cameraTheta, cameraPhi, nLayers, alphaMin, alphaMax, greyOpacity, previewMode, showBoxFrame,
-  useCache
+  useCache, dataset
 }) {
   const [imageUrl, setImageUrl] = useState(null);
   const [error, setError] = useState(null);
+  const [refining, setRefining] = useState(false);
+  // Latest request id and the pending full-quality volume render (aborted when the view changes)
+  const requestRef = useRef(0);
+  const refineRef = useRef(null);
 
   useEffect(() => {
     if (field) {
@@ -23,14 +28,54 @@ function Viewer({
     showColorbar, vmin, vmax, logScale, colorbarLabel, colorbarOrientation, cmap,
     showScaleBar, scaleBarSize, scaleBarUnit, dpi,
     plotType, weightField, widthValue, widthUnit, fieldUnit, particles, particleSize, particleColor, grids, timestamp, topLeftText, topRightText,
+    compareDataset, compareMode,
     cameraTheta, cameraPhi, nLayers, alphaMin, alphaMax, greyOpacity, previewMode, showBoxFrame,
     useCache
   ]);
 
+  // Compare mode: both datasets resampled by /api/compare (slices and projections only)
+  const compareUrl = () => {
+    let url = `/api/compare?dataset_b=${encodeURIComponent(compareDataset)}&mode=${compareMode}&axis=${axis}&field=${field}&kind=${plotType}&refreshTrigger=${refreshTrigger}&show_colorbar=${showColorbar}&log_scale=${logScale}&cmap=${encodeURIComponent(cmap)}&dpi=${dpi || 300}`;
+    if (coord !== null) url += `&coord=${coord}`;
+    if (vmin) url += `&vmin=${vmin}`;
+    if (vmax) url += `&vmax=${vmax}`;
+    if (weightField && weightField !== 'None') url += `&weight_field=${weightField}`;
+    if (widthValue) url += `&width_value=${widthValue}`;
+    if (widthUnit) url += `&width_unit=${widthUnit}`;
+    return url;
+  };
+
+  const loadImage = async (url, signal) => {
+    const response = await fetch(url, { signal });
+    if (!response.ok) {
+      throw new Error('Failed to fetch slice');
+    }
+    const blob = await response.blob();
+    return URL.createObjectURL(blob);
+  };
+
   const fetchImage = async () => {
     setError(null);
+    const requestId = ++requestRef.current;
+    if (refineRef.current) {
+      refineRef.current.abort();
+      refineRef.current = null;
+      setRefining(false);
+    }
     try {
-      let url = `/api/slice?axis=${axis}&field=${field}&refreshTrigger=${refreshTrigger}&show_colorbar=${showColorbar}&log_scale=${logScale}&cmap=${cmap}&dpi=${dpi || 300}&show_scale_bar=${showScaleBar}`;
+      if (compareDataset && (plotType === 'slc' || plotType === 'prj')) {
+        const response = await fetch(compareUrl());
+        if (!response.ok) {
+          throw new Error('Failed to fetch comparison');
+        }
+        const blob = await response.blob();
+        setImageUrl(URL.createObjectURL(blob));
+        return;
+      }
+
+      // The dataset name keeps one browser-cache entry per snapshot; the backend's ETag
+      // (render parameters + snapshot identity) turns repeated requests into 304s
+      let url = `/api/slice?dataset=${encodeURIComponent(dataset || '')}&axis=${axis}&field=${field}&show_colorbar=${showColorbar}&log_scale=${logScale}&cmap=${encodeURIComponent(cmap)}&dpi=${dpi || 300}&show_scale_bar=${showScaleBar}`;
       if (coord !== null) {
         url += `&coord=${coord}`;
       }
@@ -73,14 +118,42 @@ function Viewer({
         url += `&camera_theta=${cameraTheta}&camera_phi=${cameraPhi}`;
         url += `&n_layers=${nLayers}&alpha_min=${alphaMin}&alpha_max=${alphaMax}`;
         if (greyOpacity) url += `&grey_opacity=true`;
-        if (previewMode) url += `&preview=true`;
         if (showBoxFrame) url += `&show_box_frame=true`;
+      } else if (axis === 'off') {
+        url += `&camera_theta=${cameraTheta}&camera_phi=${cameraPhi}`;
+        if (previewMode) url += `&preview=true`;
       }
       
       // Cache control
       url += `&use_cache=${useCache}`;
       
       console.log('DEBUG Viewer: Final URL:', url);
+
+      if (plotType === 'vol') {
+        // Quality ladder: a fast interactive render first, then (unless preview mode is on)
+        // the full-quality pass once the view has stopped changing for a moment
+        const previewUrl = await loadImage(url + '&preview=true');
+        if (requestId !== requestRef.current) return;
+        setImageUrl(previewUrl);
+        if (previewMode) return;
+        await new Promise(resolve => setTimeout(resolve, 500));
+        if (requestId !== requestRef.current) return;
+        const controller = new AbortController();
+        refineRef.current = controller;
+        setRefining(true);
+        try {
+          const finalUrl = await loadImage(url, controller.signal);
+          if (requestId === requestRef.current) setImageUrl(finalUrl);
+        } catch (err) {
+          if (err.name !== 'AbortError') throw err;
+        } finally {
+          if (requestId === requestRef.current) {
+            refineRef.current = null;
+            setRefining(false);
+          }
+        }
+        return;
+      }
       
       const response = await fetch(url);
       if (!response.ok) {
@@ -98,6 +171,20 @@ function Viewer({
   return (
     <div className="viewer-container" style={{ position: 'relative' }}>
       {imageUrl && <img src={imageUrl} alt="Slice" className="slice-image" />}
+      {refining && (
+        <div style={{
+          position: 'absolute',
+          bottom: '12px',
+          right: '12px',
+          backgroundColor: 'rgba(0, 0, 0, 0.6)',
+          color: 'white',
+          padding: '4px 10px',
+          borderRadius: '4px',
+          fontSize: '12px'
+        }}>
+          Refining...
+        </div>
+      )}
       {error && (
         <div style={{
           position: 'absolute',